@@ -0,0 +1,325 @@
+"""Bulk grading of answer sheets against a test's answer key.
+
+A test's key is compiled once into NumPy arrays: the correct option and
+the section of every question. A batch of answer sheets becomes one int8
+matrix of chosen options (students x questions) that is scored in a
+single vectorized pass, together with classical item statistics:
+difficulty (the share of students answering correctly) and
+discrimination (the correlation between an item and the rest of the
+test).
+
+Sheets are CSV, JSONL, Excel or Parquet files as OMR software exports
+them: one row per student, a student id column and one column per
+question (``Q1``, ``Q2``, ... or ``1``, ``2``, ...) holding the marked
+letter. Blank cells are unanswered; anything other than a single letter
+(a double mark, say) is counted as invalid and scores like a blank.
+
+Command line, grading against a paper in the question bank::
+
+    python answer_grading.py sheets.csv --source paper.pdf -o results/ --penalty 0.25
+
+``--source`` takes the PDF's file name. Different PDFs imported under the
+same name are separate sources ("paper.pdf [1a2b3c4d5e]"); the command then
+lists them, and the full source name picks one.
+"""
+import argparse
+import os
+import re
+import sys
+
+from question_bank import DEFAULT_BANK_PATH, QuestionBank, source_label
+from question_import import LETTER_INDEX, READERS, detect_format
+from question_model import index_to_letter
+
+BLANK = -1
+INVALID = -2
+GRADING_CHUNK_ROWS = 50000
+
+# Accepted student id headers, after lower-casing, in order of preference
+STUDENT_ID_COLUMNS = ('student_id', 'student', 'roll_no', 'roll', 'candidate', 'id', 'name')
+QUESTION_COLUMN = re.compile(r'^(?:q(?:uestion)?[\s_.-]*)?(\d+)$', re.IGNORECASE)
+
+
+def _choice(value):
+    text = str(value).strip().upper()
+    if not text:
+        return BLANK
+    return LETTER_INDEX.get(text, INVALID)
+
+
+def letters_to_choices(values):
+    """Marked letters (an array of cells) -> int8 option indexes, BLANK or INVALID"""
+    import numpy as np
+    import pandas as pd
+
+    values = np.asarray(values, dtype=object)
+    # A sheet has a handful of distinct cell values; normalise those, not every cell
+    codes, uniques = pd.factorize(values.ravel())
+    lookup = np.array([_choice(value) for value in uniques] + [BLANK], dtype=np.int8)
+    return lookup[codes].reshape(values.shape)
+
+
+class AnswerKey:
+    """A test's answers and sections as arrays, compiled once and reused for every batch"""
+
+    def __init__(self, correct, sections=None, question_ids=None):
+        import numpy as np
+
+        self.correct = np.asarray(correct, dtype=np.int8)
+        count = len(self.correct)
+        sections = list(sections) if sections is not None else ['All'] * count
+        self.section_labels = list(dict.fromkeys(sections))
+        codes = {label: code for code, label in enumerate(self.section_labels)}
+        self.section_codes = np.fromiter((codes[section] for section in sections), dtype=np.intp, count=count)
+        self.question_ids = list(question_ids) if question_ids is not None else list(range(1, count + 1))
+        # Questions without a known answer are left out of every score
+        self.gradable = self.correct >= 0
+        # Questions x sections indicator: one matrix product sums every student's marks per section
+        self.section_matrix = np.zeros((count, len(self.section_labels)), dtype=np.float32)
+        self.section_matrix[np.arange(count), self.section_codes] = self.gradable
+
+    @classmethod
+    def from_questions(cls, questions, sections=None):
+        """Key for Question objects in paper order; sections default to their topics"""
+        questions = list(questions)
+        return cls([q.correct_index for q in questions],
+                   sections if sections is not None else [q.topic for q in questions],
+                   [q.id for q in questions])
+
+    @classmethod
+    def from_letters(cls, letters, sections=None):
+        """Key from answer letters such as 'BADC' or ['B', 'A', ...]; anything else is ungraded"""
+        return cls([max(_choice(letter), BLANK) for letter in letters], sections)
+
+    def __len__(self):
+        return len(self.correct)
+
+
+def find_source(bank, name):
+    """The bank source a paper name refers to: a full source name, or a file name shared by one source"""
+    sources = [source for source in bank.facet_counts('source') if source]
+    if name in sources:
+        return name
+    candidates = sorted(source for source in sources if source_label(source) == name)
+    if not candidates:
+        raise ValueError(f"no questions from source {name!r} in {bank.path}")
+    if len(candidates) > 1:
+        raise ValueError(f"{name!r} names {len(candidates)} papers; pass one of: "
+                         + ", ".join(repr(source) for source in candidates))
+    return candidates[0]
+
+
+def bank_answer_key(bank, source):
+    """Key for one paper in the bank: its questions in id order, sectioned by topic"""
+    return AnswerKey.from_questions(bank.iter_questions(source=source))
+
+
+class Grades:
+    """Scores for a batch of answer sheets, per student and per question"""
+
+    def __init__(self, key, choices, student_ids=None, marks=1.0, penalty=0.0):
+        import numpy as np
+
+        choices = np.asarray(choices, dtype=np.int8)
+        if choices.ndim != 2 or choices.shape[1] != len(key):
+            raise ValueError(f"Expected a students x {len(key)} matrix of choices, got shape {choices.shape}")
+        count = len(choices)
+        self.key = key
+        self.student_ids = list(student_ids) if student_ids is not None else list(range(1, count + 1))
+        self.marks = marks
+        self.penalty = penalty
+
+        answered = choices >= 0
+        correct = (choices == key.correct) & key.gradable
+        wrong = answered & ~correct & key.gradable
+        correct_f = correct.astype(np.float32)
+        # Counts up to 2**24 are exact in float32; scores are kept in float64
+        self.section_correct = (correct_f @ key.section_matrix).astype(np.int64)
+        self.section_wrong = (wrong.astype(np.float32) @ key.section_matrix).astype(np.int64)
+        self.section_scores = marks * self.section_correct - penalty * self.section_wrong
+        self.scores = self.section_scores.sum(axis=1)
+        self.correct_counts = correct.sum(axis=1)
+        self.wrong_counts = wrong.sum(axis=1)
+        self.blank_counts = (choices == BLANK).sum(axis=1)
+        self.invalid_counts = (choices == INVALID).sum(axis=1)
+        self.max_score = marks * float(key.gradable.sum())
+
+        # Item statistics over the number-correct totals
+        totals = correct_f.sum(axis=1, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = correct_f.sum(axis=0, dtype=np.float64) / count
+            item_var = p * (1 - p)
+            total_mean, total_var = (totals.mean(), totals.var()) if count else (np.nan, np.nan)
+            item_total_cov = (correct_f.T @ totals.astype(np.float32)) / count - p * total_mean
+            # Correlation with the rest of the test, so an item is not correlated with itself
+            rest_cov = item_total_cov - item_var
+            rest_var = total_var - 2 * item_total_cov + item_var
+            discrimination = rest_cov / np.sqrt(item_var * rest_var)
+        self.difficulty = np.where(key.gradable, p, np.nan)
+        self.discrimination = np.where(key.gradable & np.isfinite(discrimination), discrimination, np.nan)
+
+        # How often each option was marked, for distractor analysis
+        width = int(max(choices.max(initial=-1), key.correct.max(initial=-1))) + 1
+        columns = np.broadcast_to(np.arange(len(key)), choices.shape)[answered]
+        self.option_counts = np.bincount(columns * width + choices[answered], minlength=len(key) * width
+                                         ).reshape(len(key), width) if width else np.zeros((len(key), 0), np.int64)
+        self.item_blank = (choices == BLANK).sum(axis=0)
+        self.item_invalid = (choices == INVALID).sum(axis=0)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def summary(self):
+        import numpy as np
+
+        count = len(self)
+        return {
+            'students': count,
+            'questions': len(self.key),
+            'graded_questions': int(self.key.gradable.sum()),
+            'max_score': self.max_score,
+            'mean_score': float(self.scores.mean()) if count else None,
+            'median_score': float(np.median(self.scores)) if count else None,
+            'top_score': float(self.scores.max()) if count else None,
+        }
+
+    def student_frame(self):
+        """One row per student: totals, section scores and rank"""
+        import pandas as pd
+
+        frame = pd.DataFrame({
+            'student': self.student_ids,
+            'score': self.scores,
+            'correct': self.correct_counts,
+            'wrong': self.wrong_counts,
+            'blank': self.blank_counts,
+            'invalid': self.invalid_counts,
+        })
+        frame['percent'] = (100 * frame['score'] / self.max_score).round(1) if self.max_score else None
+        frame['rank'] = frame['score'].rank(method='min', ascending=False).astype(int)
+        for code, label in enumerate(self.key.section_labels):
+            frame[f"section: {label}"] = self.section_scores[:, code]
+        return frame
+
+    def item_frame(self):
+        """One row per question: answer, difficulty, discrimination and the most popular wrong option"""
+        import numpy as np
+        import pandas as pd
+
+        counts = self.option_counts.copy()
+        gradable = self.key.gradable
+        if counts.shape[1]:
+            counts[np.flatnonzero(gradable), self.key.correct[gradable]] = -1
+            distractor = counts.argmax(axis=1)
+            has_distractor = counts.max(axis=1) > 0
+        else:
+            distractor = has_distractor = np.zeros(len(self.key), dtype=bool)
+        return pd.DataFrame({
+            'question': np.arange(1, len(self.key) + 1),
+            'question_id': self.key.question_ids,
+            'section': [self.key.section_labels[code] for code in self.key.section_codes],
+            'answer': [index_to_letter(int(index)) for index in self.key.correct],
+            'difficulty': self.difficulty.round(3),
+            'discrimination': self.discrimination.round(3),
+            'blank': self.item_blank,
+            'invalid': self.item_invalid,
+            'top_distractor': [index_to_letter(int(index)) if has else None
+                               for index, has in zip(distractor, has_distractor)],
+        })
+
+
+def sheet_choices(frame, question_count):
+    """(student ids, choices matrix) for one chunk of an answer-sheet file"""
+    import numpy as np
+
+    student_column = None
+    headers = {str(column).strip().lower(): column for column in frame.columns}
+    for alias in STUDENT_ID_COLUMNS:
+        if alias in headers:
+            student_column = headers[alias]
+            break
+    positions, columns = [], []
+    for column in frame.columns:
+        match = QUESTION_COLUMN.match(str(column).strip())
+        if match and column is not student_column:
+            positions.append(int(match.group(1)) - 1)
+            columns.append(column)
+    if not columns:
+        raise ValueError("Answer sheet has no question columns (Q1, Q2, ... or 1, 2, ...)")
+    if max(positions) >= question_count or min(positions) < 0:
+        raise ValueError(f"Answer sheet has a column for question {max(positions) + 1}, "
+                         f"but the key has {question_count} questions")
+    choices = np.full((len(frame), question_count), BLANK, dtype=np.int8)
+    choices[:, positions] = letters_to_choices(frame[columns].to_numpy(dtype=object))
+    student_ids = frame[student_column].astype(str).tolist() if student_column is not None else None
+    return student_ids, choices
+
+
+def read_answer_sheets(source, file_name, question_count, chunk_rows=GRADING_CHUNK_ROWS):
+    """(student ids, choices matrix) from an answer-sheet file; rows without an id are numbered"""
+    import numpy as np
+
+    student_ids, blocks = [], []
+    for raw in READERS[detect_format(file_name)](source, chunk_rows):
+        ids, choices = sheet_choices(raw, question_count)
+        first = len(student_ids) + 1
+        student_ids.extend(ids if ids is not None else (str(n) for n in range(first, first + len(choices))))
+        blocks.append(choices)
+    if not blocks:
+        return [], np.empty((0, question_count), dtype=np.int8)
+    return student_ids, np.concatenate(blocks)
+
+
+def grade_files(key, paths, marks=1.0, penalty=0.0):
+    """Grade every student in one or more sheet files together"""
+    import numpy as np
+
+    student_ids, blocks = [], []
+    for path in paths:
+        ids, choices = read_answer_sheets(path, path, len(key))
+        student_ids.extend(ids)
+        blocks.append(choices)
+    choices = np.concatenate(blocks) if blocks else np.empty((0, len(key)), dtype=np.int8)
+    return Grades(key, choices, student_ids, marks, penalty)
+
+
+# Command line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade answer-sheet files against a test's answer key.")
+    parser.add_argument("sheets", nargs="+", help="CSV, JSONL, Excel or Parquet answer sheets")
+    key_group = parser.add_mutually_exclusive_group(required=True)
+    key_group.add_argument("--source", help="Grade against this paper (source) in the question bank")
+    key_group.add_argument("--key", help="Answer letters in question order, e.g. BADC...")
+    parser.add_argument("--bank", default=DEFAULT_BANK_PATH, help="Question bank file used with --source")
+    parser.add_argument("-o", "--output-dir", required=True)
+    parser.add_argument("--marks", type=float, default=1.0, help="Marks per correct answer")
+    parser.add_argument("--penalty", type=float, default=0.0, help="Marks taken off per wrong answer")
+    args = parser.parse_args(argv)
+
+    if args.source:
+        bank = QuestionBank(args.bank)
+        try:
+            key = bank_answer_key(bank, find_source(bank, args.source))
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        key = AnswerKey.from_letters(args.key.replace(",", ""))
+    try:
+        grades = grade_files(key, args.sheets, args.marks, args.penalty)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    grades.student_frame().to_csv(os.path.join(args.output_dir, "students.csv"), index=False)
+    grades.item_frame().to_csv(os.path.join(args.output_dir, "items.csv"), index=False)
+    summary = grades.summary()
+    print(f"Graded {summary['students']} students on {summary['graded_questions']} of {summary['questions']} "
+          f"questions: mean {summary['mean_score'] or 0:.2f}, top {summary['top_score'] or 0:.2f} "
+          f"of {summary['max_score']:.2f}. Results in {args.output_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,23 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+from streamlit.errors import StreamlitAPIException
 from datetime import datetime, timedelta
 import time
 import json
-import base64
-from fpdf import FPDF
-import os
-import pdfplumber
-import PyPDF2
-import re
-import io
+from pdf_engine import DEFAULT_WORKERS, BACKENDS
+from extraction_cache import ExtractionCache
+from quiz_converter import PDFQuizConverter
+from question_bank import QuestionBank, pdf_source, source_label
+from shared_bank import SharedQuestionStore, SessionOverlay
+from exam_engine import ExamSession, parse_duration
+from question_export import EXPORT_FORMATS, export_bytes
+from question_import import import_questions
+from ingest_jobs import IngestQueue, ACTIVE_STATUSES
+from practice_report import ReportRenderer, report_filename
+from practice_history import PracticeHistoryStore
+from search_index import BankSearch
+
+# pandas, plotly, fpdf and the PDF libraries take most of a cold start, so
+# they are imported inside the pages that use them rather than up here.
 
 # Page Configuration
 st.set_page_config(
@@ -90,105 +97,147 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class PDFQuizConverter:
-    def __init__(self):
-        self.question_patterns = [
-            r'(?:Q\.?\s*\d+[\.\)]|Question\s*\d+|\d+\.\s*|\(\d+\))\s*(.*?)(?=(?:Q\.?\s*\d+[\.\)]|Question\s*\d+|\d+\.\s*|\(\d+\)|$))'
-        ]
-    
-    def extract_text_from_pdf(self, pdf_file):
-        """Extract text from searchable PDF"""
-        text = ""
-        try:
-            with pdfplumber.open(pdf_file) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-        except Exception as e:
-            st.error(f"PDF processing error: {e}")
-        return text
-    
-    def parse_question_block(self, block):
-        """Parse individual question block in your specific format"""
-        lines = [line.strip() for line in block.split('\n') if line.strip()]
-        
-        if len(lines) < 3:
-            return None
-        
-        question_data = {
-            'question': '',
-            'options': [],
-            'correct_answer': None,
-            'explanation': 'Auto-extracted from PDF'
-        }
-        
-        # First line is question
-        question_data['question'] = lines[0]
-        
-        # Parse options (lines starting with A., B., C., D.)
-        option_lines = []
-        answer_line = None
-        
-        for line in lines[1:]:
-            if re.match(r'^[A-D]\.', line, re.IGNORECASE):
-                option_lines.append(line)
-            elif 'answer' in line.lower():
-                answer_line = line
-            elif re.match(r'^[A-D]\.', line[:3], re.IGNORECASE):
-                option_lines.append(line)
-        
-        question_data['options'] = option_lines
-        
-        # Extract correct answer
-        if answer_line:
-            answer_match = re.search(r'[A-D]', answer_line, re.IGNORECASE)
-            if answer_match:
-                question_data['correct_answer'] = answer_match.group().upper()
-        
-        return question_data if question_data['question'] and len(question_data['options']) >= 2 else None
-    
-    def smart_question_parser(self, text):
-        """Advanced parser for your specific PDF format"""
-        questions = []
-        
-        # Split text into blocks (questions are separated by blank lines or question patterns)
-        blocks = re.split(r'\n\s*\n', text)
-        
-        for block in blocks:
-            if not block.strip():
-                continue
-            
-            lines = block.strip().split('\n')
-            if len(lines) < 3:  # Need at least question + 2 options
-                continue
-            
-            # Check if this looks like a question block
-            first_line = lines[0].strip()
-            if not (re.match(r'^(?:Q\.?|Question|\d+\.|\(?\d+\)?)', first_line, re.IGNORECASE) or 
-                   '?' in first_line or 'which' in first_line.lower()):
-                continue
-            
-            question_data = self.parse_question_block(block)
-            if question_data:
-                questions.append(question_data)
-        
-        return questions
+def rerun_fragment():
+    """Rerun just the calling fragment, or the whole app outside a fragment rerun"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def elapsed_ms(start):
+    return int((datetime.now() - start).total_seconds() * 1000)
+
+# Questions shown while a PDF is still being processed
+STREAM_PREVIEW_COUNT = 5
+
+@st.cache_resource
+def get_extraction_cache():
+    # One cache per server process, shared by every session
+    return ExtractionCache()
+
+@st.cache_resource
+def get_question_bank():
+    bank = QuestionBank()
+    # Banks from before near-duplicate detection are signed off the script thread
+    bank.sign_in_background()
+    return bank
+
+@st.cache_resource
+def get_report_renderer():
+    # Worker threads and finished PDFs are shared by every session
+    return ReportRenderer()
+
+@st.cache_resource
+def get_history_store():
+    # Practice attempts of every session go to one SQLite file
+    return PracticeHistoryStore()
+
+@st.cache_resource
+def get_question_selector():
+    # Per-user selection weights over the whole bank, shared by all of a user's sessions
+    from question_selector import QuestionSelector
+    return QuestionSelector(get_question_bank(), get_history_store())
+
+@st.cache_resource(max_entries=16)
+def get_answer_key(source, bank_revision):
+    # Compiled once per paper; a write to the bank changes the revision and so the cache key
+    from answer_grading import bank_answer_key
+    return bank_answer_key(get_question_bank(), source)
+
+@st.cache_resource
+def get_shared_store():
+    # Read-only question objects shared by every session in this process
+    return SharedQuestionStore(get_question_bank())
+
+@st.cache_resource
+def get_bank_search():
+    # The vocabulary index behind fuzzy search is built once per process
+    return BankSearch(get_question_bank())
+
+@st.cache_resource
+def get_ingest_queue():
+    # One queue and worker pool per server process; jobs persist across restarts
+    return IngestQueue(get_question_bank(), get_extraction_cache(), on_replace=get_shared_store().drop_source)
+
+TOPICS = ["General", "Math", "Reasoning", "English", "GK"]
+# There are no accounts yet; every session practices as the demo user
+DEFAULT_USER_ID = "demo"
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+EDITOR_PAGE_SIZES = [25, 50, 100]
+SEARCH_PAGE_SIZE = 20
+PALETTE_PAGE_SIZE = 20
+PALETTE_COLUMNS = 10
+EXAM_STATUS_ICONS = {
+    'not_visited': "⚪",
+    'not_answered': "🔴",
+    'answered': "🟢",
+    'marked': "🟣",
+    'answered_marked': "🟡",
+}
+INGEST_STATUS_ICONS = {
+    'queued': "⏳",
+    'running': "⚙️",
+    'done': "✅",
+    'failed': "❌",
+    'cancelled': "🚫",
+}
+INGEST_JOBS_SHOWN = 50
+EXAM_STATUS_LEGEND = {
+    'answered': "Answered",
+    'not_answered': "Not answered",
+    'marked': "Marked for review",
+    'answered_marked': "Answered & marked for review",
+    'not_visited': "Not visited",
+}
+# Exam subjects map onto bank topics
+SUBJECT_TOPICS = {"Mathematics": "Math", "Reasoning": "Reasoning", "English": "English", "General Awareness": "GK"}
+REMOVED_QUESTION_WARNING = ("⚠️ This question was removed from the question bank after the session started. "
+                            "It scores no marks.")
+
+# No ids: they get content ids when interned, like any question from outside the bank
+SAMPLE_QUESTIONS = [
+    {
+        'question': 'What is 15% of 200?',
+        'options': ['15', '30', '25', '20'],
+        'correct_answer': 'B',
+        'explanation': '15% of 200 = (15/100) × 200 = 30'
+    },
+    {
+        'question': 'Which is a prime number?',
+        'options': ['4', '9', '11', '15'],
+        'correct_answer': 'C',
+        'explanation': '11 is only divisible by 1 and itself'
+    }
+]
 
 class MockTestApp:
     def __init__(self):
         self.pdf_converter = PDFQuizConverter()
+        self.extraction_cache = get_extraction_cache()
+        self.question_bank = get_question_bank()
+        self.shared_store = get_shared_store()
+        self.report_renderer = get_report_renderer()
+        self.history_store = get_history_store()
+        self.ingest_queue = get_ingest_queue()
         self.initialize_session_state()
+        self.overlay = st.session_state.overlay
     
     def initialize_session_state(self):
         defaults = {
-            'bookmarks': [],
             'test_history': [],
-            'practice_history': [],
             'progress': {},
             'current_test': None,
             'current_practice': None,
+            'last_practice_result': None,
+            'last_exam_result': None,
+            'practice_analytics': None,
+            'report_zip': None,
             'converted_questions': [],
+            'converted_edits': {},
+            'converted_edits_key': None,
+            'duplicate_review': None,
+            'pdf_cache_keys': {},
+            'user_id': DEFAULT_USER_ID,
             'language': 'English',
             'admin_mode': False
         }
@@ -196,6 +245,10 @@ class MockTestApp:
         for key, value in defaults.items():
             if key not in st.session_state:
                 st.session_state[key] = value
+        
+        # Per-session edits and bookmarks over the shared question store
+        if 'overlay' not in st.session_state:
+            st.session_state.overlay = SessionOverlay(self.shared_store)
 
     def main(self):
         st.markdown('<div class="main-header">📚 MockTest Pro - Exam Preparation Platform</div>', unsafe_allow_html=True)
@@ -236,112 +289,347 @@ class MockTestApp:
     def pdf_to_quiz_converter(self):
         st.markdown('<div class="section-header">🔄 PDF to Quiz Converter</div>', unsafe_allow_html=True)
         
+        single_tab, batch_tab = st.tabs(["📄 Single PDF", "📦 Batch Queue"])
+        with single_tab:
+            self.convert_single_pdf()
+        with batch_tab:
+            self.batch_ingestion_panel()
+
+    def convert_single_pdf(self):
         st.info("📄 **Upload Searchable PDF** - Supports format: 'Q1. Question text\\nA. Option1\\nB. Option2\\nC. Option3\\nD. Option4\\nAnswer C'")
         
         uploaded_pdf = st.file_uploader("Choose a PDF file", type=['pdf'], key="pdf_uploader")
         
+        with st.expander("⚙️ Extraction Settings"):
+            workers = st.number_input("Extraction workers", min_value=1, max_value=32,
+                                      value=DEFAULT_WORKERS, key="pdf_workers")
+            backend = st.selectbox("Extraction engine", list(BACKENDS), key="pdf_backend")
+            use_fallback = st.checkbox("Re-read empty or garbled pages with pdfplumber", value=True,
+                                       key="pdf_fallback")
+        extractor = self.pdf_converter.extractor
+        extractor.workers = int(workers)
+        extractor.backend = backend
+        extractor.fallback = 'pdfplumber' if use_fallback and backend != 'pdfplumber' else None
+        
         if uploaded_pdf:
             file_size = uploaded_pdf.size / 1024
             st.success(f"✅ PDF Uploaded! Size: {file_size:.1f} KB")
             
-            with st.spinner("🔍 Extracting questions from PDF..."):
-                pdf_text = self.pdf_converter.extract_text_from_pdf(uploaded_pdf)
-                
-                if not pdf_text:
-                    st.error("❌ No text extracted. Ensure it's searchable PDF.")
-                    return
-                
-                with st.expander("📖 View Extracted Text"):
-                    st.text_area("Extracted Content", pdf_text[:2000] + "..." if len(pdf_text) > 2000 else pdf_text, height=200)
-                
-                questions = self.pdf_converter.smart_question_parser(pdf_text)
-                
-                if questions:
-                    st.session_state.converted_questions = questions
-                    st.success(f"🎉 Extracted {len(questions)} questions!")
-                    self.display_converted_questions(questions)
-                    self.export_questions_options(questions)
+            questions, pdf_text, pages, cache_key = self.load_pdf_questions(uploaded_pdf)
+            # Keyed on the content too, so another paper with the same file name isn't replaced
+            source = pdf_source(uploaded_pdf.name, ExtractionCache.content_digest(cache_key))
+            
+            if not pdf_text:
+                st.error("❌ No text extracted. Ensure it's searchable PDF.")
+                return
+            
+            with st.expander("📖 View Extracted Text"):
+                st.text_area("Extracted Content", pdf_text[:2000] + "..." if len(pdf_text) > 2000 else pdf_text, height=200)
+            
+            if pages:
+                self.display_extraction_report(pages)
+            
+            if questions:
+                st.session_state.converted_questions = questions
+                st.success(f"🎉 Extracted {len(questions)} questions!")
+                self.display_converted_questions(questions, source_key=uploaded_pdf.file_id)
+                skipped = self.review_near_duplicates(questions, source=source, source_key=uploaded_pdf.file_id)
+                self.export_questions_options(questions, source=source, skipped=skipped)
+            else:
+                st.warning("⚠️ No questions detected.")
+
+    def batch_ingestion_panel(self):
+        st.info("📦 **Queue many PDFs at once** - they are converted in the background, so you can "
+                "leave this page or close the tab and collect the questions later.")
+        uploads = st.file_uploader("Choose PDF files", type=['pdf'], accept_multiple_files=True,
+                                   key="batch_pdf_uploader")
+        auto_collect = st.checkbox("Add questions to the bank as each PDF finishes", key="batch_auto_collect")
+        if uploads and st.button(f"🚀 Queue {len(uploads)} PDFs", key="batch_queue"):
+            for upload in uploads:
+                self.ingest_queue.submit(upload.name, upload.getvalue(), auto_collect=auto_collect)
+            st.success(f"✅ {len(uploads)} PDFs queued")
+        
+        # Poll for progress only while there is something to watch
+        active = any(self.ingest_queue.status_counts().get(status) for status in ACTIVE_STATUSES)
+        st.fragment(self.render_ingest_jobs, run_every=2 if active else None)(polling=active)
+
+    def render_ingest_jobs(self, polling):
+        queue = self.ingest_queue
+        counts = queue.status_counts()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Queued", counts.get('queued', 0))
+        with col2:
+            st.metric("Running", counts.get('running', 0))
+        with col3:
+            st.metric("Done", counts.get('done', 0))
+        with col4:
+            st.metric("Failed / Cancelled", counts.get('failed', 0) + counts.get('cancelled', 0))
+        
+        jobs = queue.jobs()
+        if not jobs:
+            st.caption("No ingestion jobs yet.")
+        for job in jobs[:INGEST_JOBS_SHOWN]:
+            name_col, progress_col, action_col = st.columns([3, 4, 1])
+            with name_col:
+                st.write(f"{INGEST_STATUS_ICONS[job['status']]} **{job['file_name']}**")
+            with progress_col:
+                if job['status'] == 'running' and job['pages_total']:
+                    st.progress(job['pages_done'] / job['pages_total'],
+                                text=f"{job['pages_done']}/{job['pages_total']} pages")
+                elif job['status'] == 'done':
+                    collected = "in bank" if job['collected'] is not None else "ready to collect"
+                    st.caption(f"{job['question_count']} questions, {job['pages_total']} pages - {collected}")
+                elif job['status'] == 'failed':
+                    st.caption(f"❌ {job['error']}")
                 else:
-                    st.warning("⚠️ No questions detected.")
+                    st.caption(job['status'].capitalize())
+            with action_col:
+                if job['status'] in ACTIVE_STATUSES and st.button("✖", key=f"cancel_job_{job['id']}",
+                                                                    help="Cancel"):
+                    queue.cancel(job['id'])
+                    rerun_fragment()
+        
+        ready = [job for job in jobs if job['status'] == 'done' and job['collected'] is None]
+        col1, col2 = st.columns(2)
+        with col1:
+            if ready and st.button(f"📥 Collect {sum(job['question_count'] for job in ready)} questions "
+                                   f"from {len(ready)} PDFs into Bank", key="collect_jobs"):
+                added = queue.collect([job['id'] for job in ready])
+                st.success(f"✅ {added} questions added to the bank")
+        with col2:
+            if jobs and st.button("🧹 Clear finished jobs", key="clear_jobs"):
+                queue.clear_finished()
+                rerun_fragment()
+        
+        # Everything finished: one full rerun turns polling off
+        if polling and not any(counts.get(status) for status in ACTIVE_STATUSES):
+            st.rerun()
+
+    def load_pdf_questions(self, uploaded_pdf):
+        """Return (questions, text, page report, cache key) for an upload, from cache when possible"""
+        # Hash each upload once per session and backend setup; reruns reuse the key
+        cache_keys = st.session_state.pdf_cache_keys
+        version = self.pdf_converter.cache_version()
+        cache_key = cache_keys.get((uploaded_pdf.file_id, version))
+        if cache_key is None:
+            cache_key = ExtractionCache.make_key(uploaded_pdf.getvalue(), version)
+            cache_keys[(uploaded_pdf.file_id, version)] = cache_key
+        
+        cached = self.extraction_cache.get(cache_key)
+        if cached is not None:
+            return cached['questions'], cached['text'], cached.get('pages', []), cache_key
+        
+        with st.spinner("🔍 Extracting questions from PDF..."):
+            progress_bar = st.progress(0.0, text="Reading pages...")
+            status = st.empty()
+            preview_box = st.empty()
+            preview = preview_box.container()
+            
+            def report_progress(done, total):
+                progress_bar.progress(done / total, text=f"Reading pages... {done}/{total}")
+            
+            page_texts = []
+            
+            def collect_pages():
+                for _, page_text in self.pdf_converter.iter_pdf_pages(uploaded_pdf, progress=report_progress):
+                    page_texts.append(page_text)
+                    yield page_text
+            
+            questions = []
+            last_update = 0.0
+            try:
+                for question in self.pdf_converter.smart_question_parser(collect_pages()):
+                    questions.append(question)
+                    if len(questions) <= STREAM_PREVIEW_COUNT:
+                        preview.markdown(f"**Q{len(questions)}.** {question['question']}")
+                    # Throttle count updates so huge files don't flood the frontend
+                    if time.monotonic() - last_update > 0.25:
+                        status.caption(f"📝 {len(questions)} questions found so far...")
+                        last_update = time.monotonic()
+            except Exception as e:
+                st.error(f"PDF processing error: {e}")
+                return [], "", [], cache_key
+            finally:
+                progress_bar.empty()
+                status.empty()
+            preview_box.empty()
+            
+            pdf_text = "".join(page_text + "\n" for page_text in page_texts if page_text)
+            if not pdf_text:
+                return [], pdf_text, [], cache_key
+        
+        pages = self.pdf_converter.extractor.page_report()
+        self.extraction_cache.put(cache_key, pdf_text, questions, pages)
+        return questions, pdf_text, pages, cache_key
 
-    def display_converted_questions(self, questions):
+    def display_extraction_report(self, pages):
+        import pandas as pd
+        with st.expander("⏱️ Extraction Report"):
+            report_df = pd.DataFrame(pages)
+            summary = report_df.groupby('backend').agg(pages=('page', 'count'), total_ms=('ms', 'sum'))
+            st.dataframe(summary, use_container_width=True)
+            st.dataframe(report_df, hide_index=True, use_container_width=True)
+
+    def display_converted_questions(self, questions, source_key=None):
+        import pandas as pd
         st.markdown("### 📋 Extracted Questions")
         
-        for i, question in enumerate(questions[:10]):
-            with st.expander(f"Q{i+1}: {question['question'][:100]}...", expanded=i<2):
-                col1, col2 = st.columns([3, 1])
-                
-                with col1:
-                    edited_question = st.text_area("Question", value=question['question'], key=f"q_{i}")
-                    st.write("**Options:**")
-                    edited_options = []
-                    for j, opt in enumerate(question['options']):
-                        edited_opt = st.text_input(f"Option {chr(65+j)}", value=opt, key=f"q_{i}_opt_{j}")
-                        edited_options.append(edited_opt)
-                
-                with col2:
-                    correct_ans = st.selectbox("Correct Answer", ['A','B','C','D','Not Set'], 
-                                             index=0 if question['correct_answer'] else 4, key=f"q_{i}_ans")
-                    topic = st.selectbox("Topic", ["General","Math","Reasoning","English","GK"], key=f"q_{i}_topic")
-                    difficulty = st.selectbox("Difficulty", ["Easy","Medium","Hard"], key=f"q_{i}_diff")
-                
-                questions[i].update({
-                    'question': edited_question,
-                    'options': edited_options,
-                    'correct_answer': correct_ans if correct_ans != 'Not Set' else None,
-                    'topic': topic,
-                    'difficulty': difficulty
-                })
-
-    def export_questions_options(self, questions):
+        # Edits are kept per upload as {question index: changed fields}
+        if st.session_state.converted_edits_key != source_key:
+            st.session_state.converted_edits_key = source_key
+            st.session_state.converted_edits = {}
+        edits = st.session_state.converted_edits
+        for index, changes in edits.items():
+            if index < len(questions):
+                questions[index].update(changes)
+        
+        col1, col2, col3 = st.columns([1, 1, 2])
+        with col1:
+            page_size = st.selectbox("Rows per page", EDITOR_PAGE_SIZES, key="editor_page_size")
+        page_count = max(1, -(-len(questions) // page_size))
+        with col2:
+            page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1,
+                                   key="editor_page")
+        with col3:
+            st.caption(f"{len(questions)} questions | ✏️ {len(edits)} edited")
+        
+        # Only the visible page is turned into a frame, so reruns cost the same at any bank size
+        start = (page - 1) * page_size
+        page_questions = questions[start:start + page_size]
+        option_count = max([4] + [len(q['options']) for q in page_questions])
+        letters = [chr(65 + j) for j in range(option_count)]
+        page_df = pd.DataFrame({
+            'Question': [q['question'] for q in page_questions],
+            **{letter: [q['options'][j] if j < len(q['options']) else '' for q in page_questions]
+               for j, letter in enumerate(letters)},
+            'Answer': [q['correct_answer'] for q in page_questions],
+            'Topic': [q.get('topic') or 'General' for q in page_questions],
+            'Difficulty': [q.get('difficulty') or 'Medium' for q in page_questions],
+        }, index=pd.RangeIndex(start + 1, start + 1 + len(page_questions), name='Q'))
+        
+        editor_key = f"editor_{source_key}_{page}_{page_size}"
+        edited_df = st.data_editor(
+            page_df,
+            key=editor_key,
+            num_rows="fixed",
+            use_container_width=True,
+            column_config={
+                'Question': st.column_config.TextColumn(width="large", required=True),
+                'Answer': st.column_config.SelectboxColumn(options=letters),
+                'Topic': st.column_config.SelectboxColumn(options=TOPICS, required=True),
+                'Difficulty': st.column_config.SelectboxColumn(options=DIFFICULTIES, required=True),
+            },
+        )
+        
+        # Write back only the rows the editor reports as changed
+        for position in st.session_state[editor_key]['edited_rows']:
+            row = edited_df.iloc[int(position)]
+            # Cleared cells come back as None/NaN rather than ''
+            cells = {column: value if isinstance(value, str) else '' for column, value in row.items()}
+            changes = {
+                'question': cells['Question'],
+                'options': [cells[letter] for letter in letters if cells[letter].strip()],
+                'correct_answer': cells['Answer'] or None,
+                'topic': cells['Topic'] or 'General',
+                'difficulty': cells['Difficulty'] or 'Medium',
+            }
+            edits[start + int(position)] = changes
+            questions[start + int(position)].update(changes)
+
+    def review_near_duplicates(self, questions, source=None, source_key=None):
+        """List questions that look like ones already in the bank; returns the positions to skip"""
+        import pandas as pd
+        from near_duplicates import DEFAULT_THRESHOLD, find_near_duplicates
+        
+        st.markdown("### 🔁 Likely Duplicates")
+        threshold = st.slider("Similarity threshold", 0.5, 1.0, DEFAULT_THRESHOLD, 0.05, key="duplicate_threshold",
+                              help="Estimated share of shared wording at which a question is flagged")
+        # Questions from bulk imports and older banks are indexed on a background thread
+        pending = self.question_bank.unsigned_count()
+        if pending:
+            self.question_bank.sign_in_background()
+            st.caption(f"⏳ {pending:,} bank questions are still being indexed and are not checked yet.")
+        # The check reruns only when the upload, its edits, the bank or the threshold change
+        review_key = (source_key, repr(st.session_state.converted_edits), self.question_bank.revision, pending,
+                      threshold)
+        review = st.session_state.duplicate_review
+        if review is None or review[0] != review_key:
+            review = st.session_state.duplicate_review = (
+                review_key, find_near_duplicates(self.question_bank, questions, threshold, source=source))
+        flagged = review[1]
+        if not flagged:
+            st.caption("No likely duplicates of bank questions or of other questions in this file.")
+            return set()
+        
+        st.caption(f"{len(flagged)} questions look like ones already seen. Ticked rows are left out "
+                   f"when saving to the bank.")
+        review_df = pd.DataFrame({
+            'Skip': [True] * len(flagged),
+            'Question': [item['question'] for item in flagged],
+            'Similarity': [item['similarity'] for item in flagged],
+            'Matches': [item['match'] for item in flagged],
+            'Matched Question': [item['match_question'] for item in flagged],
+        }, index=pd.Index([item['position'] + 1 for item in flagged], name='Q'))
+        reviewed = st.data_editor(
+            review_df,
+            key=f"duplicates_{source_key}_{threshold}",
+            num_rows="fixed",
+            use_container_width=True,
+            disabled=['Question', 'Similarity', 'Matches', 'Matched Question'],
+            column_config={
+                'Skip': st.column_config.CheckboxColumn(),
+                'Similarity': st.column_config.ProgressColumn(format="%.2f", min_value=0.0, max_value=1.0),
+            },
+        )
+        return {position - 1 for position in reviewed.index[reviewed['Skip']].tolist()}
+
+    def export_questions_options(self, questions, source=None, skipped=()):
         st.markdown("### 💾 Export Options")
         col1, col2, col3 = st.columns(3)
         
         with col1:
             if st.button("📥 Save to Bank", use_container_width=True):
                 st.session_state.converted_questions = questions
-                st.success(f"✅ {len(questions)} questions saved!")
+                self.save_to_bank([q for i, q in enumerate(questions) if i not in skipped], source,
+                                  skipped=len(skipped))
         
         with col2:
-            if st.button("📄 Export CSV", use_container_width=True):
-                self.export_to_csv(questions)
+            fmt = st.selectbox("Export format", list(EXPORT_FORMATS), key="export_format",
+                               label_visibility="collapsed")
+            if st.button("📄 Export", use_container_width=True):
+                self.offer_download(export_bytes(questions, fmt), fmt, "questions")
         
         with col3:
             if st.button("🎯 Create Test", use_container_width=True):
                 st.session_state.current_test = self.create_test_from_questions(questions)
                 st.rerun()
 
-    def export_to_csv(self, questions):
-        csv_data = []
-        for i, q in enumerate(questions):
-            csv_data.append({
-                'ID': i+1, 'Question': q['question'],
-                'A': q['options'][0] if len(q['options']) > 0 else '',
-                'B': q['options'][1] if len(q['options']) > 1 else '',
-                'C': q['options'][2] if len(q['options']) > 2 else '',
-                'D': q['options'][3] if len(q['options']) > 3 else '',
-                'Answer': q['correct_answer'], 'Topic': q.get('topic','General'),
-                'Difficulty': q.get('difficulty','Medium')
-            })
-        
-        df = pd.DataFrame(csv_data)
-        csv = df.to_csv(index=False)
-        b64 = base64.b64encode(csv.encode()).decode()
-        href = f'<a href="data:file/csv;base64,{b64}" download="questions.csv">📥 Download CSV</a>'
-        st.markdown(href, unsafe_allow_html=True)
+    def save_to_bank(self, questions, source, skipped=0):
+        # Saving the same PDF again replaces its questions with the edited ones
+        replaced = self.question_bank.delete_source(source) if source else 0
+        if replaced:
+            self.shared_store.drop_source(source)
+        self.question_bank.add_questions(questions, source=source)
+        notes = []
+        if replaced:
+            notes.append(f"replaced {replaced} from earlier import")
+        if skipped:
+            notes.append(f"skipped {skipped} likely duplicates")
+        st.success(f"✅ {len(questions)} questions saved!" + (f" ({'; '.join(notes)})" if notes else ""))
+
+    def offer_download(self, data, fmt, file_stem, key=None):
+        """Serve exported bytes through Streamlit's download endpoint"""
+        mime, extension = EXPORT_FORMATS[fmt]
+        st.download_button(f"📥 Download {extension.upper()} ({len(data) / 1024:.0f} KB)", data,
+                           file_name=f"{file_stem}.{extension}", mime=mime, key=key,
+                           on_click="ignore", use_container_width=True)
 
     def create_test_from_questions(self, questions):
-        return {
-            'subject': 'PDF Import',
-            'questions': questions,
-            'total_questions': len(questions),
-            'start_time': datetime.now(),
-            'answers': {},
-            'question_times': {},
-            'current_question': 0,
-            'marked_review': set(),
-            'mode': 'exam'
-        }
+        question_ids = [q.id for q in self.shared_store.intern_many(questions)]
+        self.overlay.use('exam', question_ids)
+        # One minute per question
+        return ExamSession(question_ids, len(question_ids) * 60, subject='PDF Import')
 
     # NEW: PRACTICE MODE WITH STOPWATCH
     def practice_mode(self):
@@ -350,58 +638,75 @@ class MockTestApp:
         # Practice session controls
         col1, col2, col3 = st.columns(3)
         with col1:
-            questions_source = st.selectbox("Questions From", ["PDF Import", "Sample Bank", "Bookmarked"])
+            questions_source = st.selectbox("Questions From", ["Question Bank", "PDF Import", "Sample Bank", "Bookmarked"])
         with col2:
             question_count = st.slider("Number of Questions", 5, 50, 10)
+        
+        topic = difficulty = None
+        if questions_source == "Question Bank":
+            filter_col1, filter_col2 = st.columns(2)
+            with filter_col1:
+                topic = st.selectbox("Topic", ["All"] + TOPICS, key="practice_topic")
+            with filter_col2:
+                difficulty = st.selectbox("Difficulty", ["All"] + DIFFICULTIES, key="practice_difficulty")
+            topic = None if topic == "All" else topic
+            difficulty = None if difficulty == "All" else difficulty
+        
         with col3:
             if st.button("🚀 Start Practice Session", use_container_width=True):
-                self.start_practice_session(question_count, questions_source)
+                self.start_practice_session(question_count, questions_source, topic, difficulty)
         
         # Active practice session
         if st.session_state.current_practice:
             self.render_practice_interface()
+        elif st.session_state.last_practice_result:
+            st.success("🏁 Practice Session Completed!")
+            self.show_practice_results(st.session_state.last_practice_result)
         
         # Practice history
-        if st.session_state.practice_history:
+        recent_sessions = self.history_store.sessions(st.session_state.user_id, limit=5)
+        if recent_sessions:
             st.markdown("### 📈 Recent Practice Sessions")
-            for session in st.session_state.practice_history[-5:]:
+            for session in recent_sessions:
                 st.write(f"**{session['date']}** - Score: {session['score']}/{session['total']} | Time: {session['total_time']}s")
 
-    def start_practice_session(self, count, source):
-        questions = self.get_questions_for_practice(count, source)
+    def start_practice_session(self, count, source, topic=None, difficulty=None):
+        questions = self.get_questions_for_practice(count, source, topic, difficulty)
+        question_ids = [q.id for q in questions]
+        self.overlay.use('practice', question_ids)
+        st.session_state.last_practice_result = None
         st.session_state.current_practice = {
-            'questions': questions,
-            'total_questions': len(questions),
+            'question_ids': question_ids,
+            'total_questions': len(question_ids),
             'start_time': datetime.now(),
             'current_question': 0,
             'answers': {},
             'question_start_times': {},
-            'question_times': {},
+            'question_ms': {},
             'show_answers': True,  # Quick answers in practice mode
             'mode': 'practice'
         }
         # Start timer for first question
         st.session_state.current_practice['question_start_times'][0] = datetime.now()
 
-    def get_questions_for_practice(self, count, source):
+    def get_questions_for_practice(self, count, source, topic=None, difficulty=None):
+        """Shared, read-only questions for a new session"""
+        if source == "Question Bank":
+            question_ids = get_question_selector().select(
+                st.session_state.user_id, count, topic=topic, difficulty=difficulty)
+            # Ids are fresh from the selector, but a source may be replaced in between
+            questions = [q for q in self.shared_store.get_many(question_ids) if q is not None]
+            if questions:
+                return questions
+            st.warning("⚠️ No matching questions in the bank yet - using sample questions.")
         if source == "PDF Import" and st.session_state.converted_questions:
-            return st.session_state.converted_questions[:count]
-        else:
-            # Sample questions
-            return [
-                {
-                    'question': 'What is 15% of 200?',
-                    'options': ['15', '30', '25', '20'],
-                    'correct_answer': 'B',
-                    'explanation': '15% of 200 = (15/100) × 200 = 30'
-                },
-                {
-                    'question': 'Which is a prime number?',
-                    'options': ['4', '9', '11', '15'],
-                    'correct_answer': 'C',
-                    'explanation': '11 is only divisible by 1 and itself'
-                }
-            ][:count]
+            return self.shared_store.intern_many(st.session_state.converted_questions[:count])
+        if source == "Bookmarked" and self.overlay.bookmarks:
+            questions = [q for q in self.overlay.resolve(list(self.overlay.bookmarks)) if q is not None]
+            if questions:
+                return questions[:count]
+        # Sample questions
+        return self.shared_store.intern_many(SAMPLE_QUESTIONS[:count])
 
     def render_practice_interface(self):
         practice = st.session_state.current_practice
@@ -409,45 +714,68 @@ class MockTestApp:
             return
         
         # Practice header with stopwatch
-        col1, col2, col3, col4 = st.columns([2,1,1,1])
+        col1, col2, col3 = st.columns([2,2,1])
         
         with col1:
             st.subheader("🔍 Practice Session")
         with col2:
+            self.render_practice_timer()
+        with col3:
+            if st.button("📤 End Practice"):
+                self.end_practice_session()
+                st.rerun()
+        
+        self.render_practice_workspace()
+
+    @st.fragment(run_every=1)
+    def render_practice_timer(self):
+        # Ticks on its own every second without rerunning the page
+        practice = st.session_state.current_practice
+        if not practice:
+            return
+        timer_col1, timer_col2 = st.columns(2)
+        with timer_col1:
             # Session timer
             elapsed = (datetime.now() - practice['start_time']).seconds
             st.markdown(f'<div class="timer-green">⏱️ {elapsed}s</div>', unsafe_allow_html=True)
-        with col3:
+        with timer_col2:
             # Current question timer
             if practice['current_question'] in practice['question_start_times']:
                 q_elapsed = (datetime.now() - practice['question_start_times'][practice['current_question']]).seconds
                 st.markdown(f'<div class="timer-green">⏰ {q_elapsed}s</div>', unsafe_allow_html=True)
-        with col4:
-            if st.button("📤 End Practice"):
-                self.end_practice_session()
+
+    @st.fragment
+    def render_practice_workspace(self):
+        # Palette, question and navigation share the current-question state, so they
+        # rerun together; clicks here only rerun this fragment, not the whole app.
+        practice = st.session_state.current_practice
+        if not practice:
+            return
         
         # Quick navigation palette
         st.markdown("### Quick Navigation")
-        cols = st.columns(10)
-        for i in range(min(10, practice['total_questions'])):
-            with cols[i]:
-                status = "✅" if i in practice['answers'] else "⚪"
-                if st.button(f"{status}{i+1}", key=f"p_nav_{i}", use_container_width=True):
-                    # Save current question time
-                    if practice['current_question'] in practice['question_start_times']:
-                        start_time = practice['question_start_times'].get(practice['current_question'])
-                        if start_time:
-                            practice['question_times'][practice['current_question']] = (datetime.now() - start_time).seconds
-                    
-                    practice['current_question'] = i
-                    practice['question_start_times'][i] = datetime.now()
-                    st.rerun()
+        clicked = self.render_question_palette(practice['total_questions'], practice['current_question'],
+                                               lambda i: "✅" if i in practice['answers'] else "⚪", "p")
+        if clicked is not None:
+            # Save current question time
+            if practice['current_question'] in practice['question_start_times']:
+                start_time = practice['question_start_times'].get(practice['current_question'])
+                if start_time:
+                    practice['question_ms'][practice['current_question']] = elapsed_ms(start_time)
+            
+            practice['current_question'] = clicked
+            practice['question_start_times'][clicked] = datetime.now()
+            rerun_fragment()
         
         # Current question
         current_q = practice['current_question']
-        if current_q < len(practice['questions']):
-            question_data = practice['questions'][current_q]
-            self.display_practice_question(question_data, current_q)
+        question_data = None
+        if current_q < len(practice['question_ids']):
+            question_data = self.overlay.resolve([practice['question_ids'][current_q]])[0]
+            if question_data is None:
+                st.warning(REMOVED_QUESTION_WARNING)
+            else:
+                self.display_practice_question(question_data, current_q)
         
         # Navigation buttons near question
         st.markdown("---")
@@ -460,12 +788,12 @@ class MockTestApp:
             if st.button("Next ➡️", use_container_width=True) and current_q < practice['total_questions'] - 1:
                 self.navigate_practice_question(1)
         with nav_col3:
-            if st.button("⭐ Bookmark", use_container_width=True):
+            if st.button("⭐ Bookmark", use_container_width=True, disabled=question_data is None):
                 self.bookmark_question(question_data)
         with nav_col4:
             if st.button("🔍 Show Answer", use_container_width=True):
                 practice['show_answers'] = True
-                st.rerun()
+                rerun_fragment()
 
     def navigate_practice_question(self, direction):
         practice = st.session_state.current_practice
@@ -474,7 +802,7 @@ class MockTestApp:
         # Save current question time
         if current in practice['question_start_times']:
             start_time = practice['question_start_times'][current]
-            practice['question_times'][current] = (datetime.now() - start_time).seconds
+            practice['question_ms'][current] = elapsed_ms(start_time)
         
         # Navigate
         new_index = current + direction
@@ -482,31 +810,30 @@ class MockTestApp:
             practice['current_question'] = new_index
             practice['question_start_times'][new_index] = datetime.now()
             practice['show_answers'] = False  # Hide answer when moving to new question
-            st.rerun()
+            st.session_state.pop("p_palette_page", None)
+            rerun_fragment()
 
     def display_practice_question(self, question_data, q_index):
         practice = st.session_state.current_practice
         
         st.markdown(f'<div class="question-box">', unsafe_allow_html=True)
-        st.markdown(f"**Q{q_index+1}. {question_data['question']}**")
+        st.markdown(f"**Q{q_index+1}. {question_data.question}**")
         
         # Options
         selected_option = st.radio(
             "Select your answer:",
-            question_data['options'],
+            question_data.options,
             key=f"practice_q_{q_index}",
             index=practice['answers'].get(q_index, None)
         )
         
         # Save answer and provide immediate feedback in practice mode
         if selected_option:
-            option_index = question_data['options'].index(selected_option)
+            option_index = question_data.options.index(selected_option)
             practice['answers'][q_index] = option_index
             
             # Immediate feedback in practice mode
-            correct_index = ord(question_data['correct_answer']) - 65 if question_data['correct_answer'] else -1
-            
-            if option_index == correct_index:
+            if question_data.is_correct(option_index):
                 st.success("🎉 Correct! ✅")
                 # Play success sound (visual feedback)
                 st.markdown("🔊 *Correct sound*")
@@ -517,15 +844,14 @@ class MockTestApp:
             # Show explanation if enabled
             if practice['show_answers']:
                 with st.expander("📖 Explanation"):
-                    st.write(question_data.get('explanation', 'No explanation available.'))
-                    if question_data['correct_answer']:
-                        st.write(f"**Correct answer: {question_data['correct_answer']}**")
+                    st.write(question_data.explanation or 'No explanation available.')
+                    if question_data.correct_answer:
+                        st.write(f"**Correct answer: {question_data.correct_answer}**")
         
         st.markdown('</div>', unsafe_allow_html=True)
 
     def bookmark_question(self, question_data):
-        if question_data not in st.session_state.bookmarks:
-            st.session_state.bookmarks.append(question_data)
+        if self.overlay.bookmark(question_data.id):
             st.success("✅ Question bookmarked!")
 
     def end_practice_session(self):
@@ -533,36 +859,55 @@ class MockTestApp:
         if not practice:
             return
         
+        # Time on the question the session ended on
+        current = practice['current_question']
+        if current in practice['question_start_times']:
+            practice['question_ms'][current] = elapsed_ms(practice['question_start_times'][current])
+        
         # Calculate results
+        # Questions removed from the bank since the session started keep their place and score nothing
+        questions = self.overlay.resolve_recorded(practice['question_ids'])
         score = 0
         for q_index, user_answer in practice['answers'].items():
-            if q_index < len(practice['questions']):
-                correct_answer = practice['questions'][q_index]['correct_answer']
-                if correct_answer and user_answer == (ord(correct_answer) - 65):
-                    score += 1
+            if q_index < len(questions) and questions[q_index].is_correct(user_answer):
+                score += 1
         
         total_time = (datetime.now() - practice['start_time']).seconds
         
-        # Save to history
+        # Save to history: one row per attempt in the history store, nothing kept in the session
         session_result = {
             'date': datetime.now().strftime("%Y-%m-%d %H:%M"),
             'score': score,
             'total': practice['total_questions'],
             'total_time': total_time,
-            'answers': practice['answers'].copy(),
-            'questions': practice['questions'].copy(),
-            'question_times': practice['question_times'].copy()
+            'answers': practice['answers'],
+            'question_ms': practice['question_ms']
         }
+        # Selection weights count the final answers, as the history does
+        get_question_selector().record_session(st.session_state.user_id, session_result, questions)
+        session_id = self.history_store.record_session(st.session_state.user_id, session_result, questions)
+        # Aggregates are updated once here so the analysis page never rescans the history
+        self.practice_analytics().record_session(session_result, questions)
         
-        st.session_state.practice_history.append(session_result)
-        
-        # Show results and download option
-        st.success("🏁 Practice Session Completed!")
-        self.show_practice_results(session_result)
+        # Results and download option are shown by practice_mode on the next run
+        st.session_state.last_practice_result = session_id
         
         st.session_state.current_practice = None
+        self.overlay.use('practice', None)
 
-    def show_practice_results(self, result):
+    def practice_analytics(self):
+        """This session's running aggregates, built from the history the first time"""
+        if st.session_state.practice_analytics is None:
+            from practice_analytics import PracticeAnalytics
+            st.session_state.practice_analytics = PracticeAnalytics.from_history(
+                self.history_store.iter_results(st.session_state.user_id), self.overlay.resolve_recorded, TOPICS,
+                DIFFICULTIES)
+        return st.session_state.practice_analytics
+
+    def show_practice_results(self, session_id):
+        result = self.history_store.result(session_id)
+        if result is None:
+            return
         st.markdown("### 📊 Practice Results")
         
         col1, col2, col3, col4 = st.columns(4)
@@ -577,111 +922,244 @@ class MockTestApp:
             avg_time = result['total_time'] / result['total'] if result['total'] > 0 else 0
             st.metric("Avg Time/Q", f"{avg_time:.1f}s")
         
-        # Download PDF report
-        if st.button("📄 Download Detailed Report PDF"):
-            self.generate_practice_pdf_report(result)
-
-    def generate_practice_pdf_report(self, result):
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        
-        # Header
-        pdf.cell(200, 10, txt="Practice Session Report", ln=1, align='C')
-        pdf.cell(200, 10, txt=f"Date: {result['date']}", ln=1)
-        pdf.cell(200, 10, txt=f"Score: {result['score']}/{result['total']}", ln=1)
-        pdf.cell(200, 10, txt=f"Accuracy: {(result['score']/result['total'])*100:.1f}%", ln=1)
-        pdf.cell(200, 10, txt=f"Total Time: {result['total_time']} seconds", ln=1)
-        pdf.ln(10)
-        
-        # Questions and answers
-        pdf.set_font("Arial", size=10)
-        for i, question in enumerate(result['questions']):
-            pdf.multi_cell(0, 8, txt=f"Q{i+1}. {question['question']}")
-            
-            # User's answer
-            user_ans_index = result['answers'].get(i)
-            user_ans = question['options'][user_ans_index] if user_ans_index is not None else "Not attempted"
-            correct_ans = question['options'][ord(question['correct_answer'])-65] if question['correct_answer'] else "Not set"
-            
-            pdf.cell(0, 8, txt=f"Your answer: {user_ans}", ln=1)
-            pdf.cell(0, 8, txt=f"Correct answer: {correct_ans}", ln=1)
-            
-            if user_ans_index == (ord(question['correct_answer'])-65 if question['correct_answer'] else -1):
-                pdf.set_text_color(0, 128, 0)
-                pdf.cell(0, 8, txt="Status: ✅ Correct", ln=1)
-            else:
-                pdf.set_text_color(255, 0, 0)
-                pdf.cell(0, 8, txt="Status: ❌ Incorrect", ln=1)
-            
-            pdf.set_text_color(0, 0, 0)
-            pdf.ln(5)
-        
-        # Save and provide download
-        filename = f"practice_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf.output(filename)
-        
-        with open(filename, "rb") as f:
-            pdf_data = f.read()
-        
-        b64 = base64.b64encode(pdf_data).decode()
-        href = f'<a href="data:application/pdf;base64,{b64}" download="{filename}">📥 Download Practice Report PDF</a>'
-        st.markdown(href, unsafe_allow_html=True)
-        
-        os.remove(filename)
+        # The report renders on a worker thread while the results are on screen
+        report = self.report_renderer.submit(result, self.overlay.resolve_recorded(result['question_ids']))
+        self.offer_pending_download(report, "📄 Download Detailed Report PDF", report_filename(result),
+                                    "application/pdf", key="practice_report")
+
+    def offer_pending_download(self, future, label, file_name, mime, key):
+        """Download button for bytes that are still being produced on a worker thread"""
+        if not future.done():
+            st.fragment(self.wait_for_download, run_every=1)(future, label, key)
+        elif future.exception() is not None:
+            st.error(f"❌ Report generation failed: {future.exception()}")
+        else:
+            st.download_button(label, future.result(), file_name=file_name, mime=mime, key=key,
+                               on_click="ignore")
+
+    def wait_for_download(self, future, label, key):
+        if future.done():
+            st.rerun()
+        st.button(f"{label} (preparing…)", disabled=True, key=f"{key}_pending")
 
     # EXAM MODE (Similar to previous mock test but with timing features)
     def exam_mode(self):
         st.markdown('<div class="section-header">📝 Exam Mode</div>', unsafe_allow_html=True)
         
+        session = st.session_state.current_test
+        if session is not None and not session.submitted:
+            self.render_exam_interface()
+            return
+        
+        if st.session_state.last_exam_result:
+            self.show_exam_results(st.session_state.last_exam_result)
+            st.markdown("---")
+        
         col1, col2 = st.columns(2)
         with col1:
             test_type = st.selectbox("Test Type", ["Full Length", "Subject Wise"])
             subject = st.selectbox("Subject", ["Mathematics", "Reasoning", "English", "General Awareness"])
         with col2:
             duration = st.selectbox("Duration", ["30 minutes", "60 minutes", "90 minutes", "120 minutes"])
-            total_questions = st.slider("Total Questions", 10, 100, 25)
+            total_questions = st.slider("Total Questions", 10, 200, 25)
         
         if st.button("🚀 Start Exam", type="primary"):
             self.start_exam_session(subject, total_questions, duration)
-        
-        if st.session_state.current_test and st.session_state.current_test.get('mode') == 'exam':
-            self.render_exam_interface()
+            st.rerun()
 
     def start_exam_session(self, subject, total_questions, duration):
-        questions = self.get_questions_for_practice(total_questions, "Sample Bank")
-        st.session_state.current_test = {
-            'subject': subject,
-            'questions': questions,
-            'total_questions': total_questions,
-            'duration': duration,
-            'start_time': datetime.now(),
-            'answers': {},
-            'question_times': {},
-            'question_start_times': {0: datetime.now()},
-            'current_question': 0,
-            'marked_review': set(),
-            'mode': 'exam'
-        }
+        questions = self.question_bank.sample(total_questions, topic=SUBJECT_TOPICS.get(subject))
+        if questions:
+            questions = self.shared_store.intern_many(questions)
+        else:
+            questions = self.get_questions_for_practice(total_questions, "Sample Bank")
+        question_ids = [q.id for q in questions]
+        self.overlay.use('exam', question_ids)
+        st.session_state.last_exam_result = None
+        st.session_state.current_test = ExamSession(question_ids, parse_duration(duration), subject=subject)
 
     def render_exam_interface(self):
-        # Similar to practice but without immediate answers
-        # Implementation would be similar to practice mode but without show_answers
-        pass
+        session = st.session_state.current_test
+        if session.check_deadline():
+            self.finish_exam()
+            st.rerun()
+        
+        col1, col2, col3 = st.columns([2,2,1])
+        with col1:
+            st.subheader(f"📝 {session.subject} Exam")
+        with col2:
+            self.render_exam_timer()
+        with col3:
+            if st.button("✅ Submit Exam", type="primary"):
+                session.submit()
+                self.finish_exam()
+                st.rerun()
+        
+        self.render_exam_workspace()
+
+    @st.fragment(run_every=1)
+    def render_exam_timer(self):
+        # Remaining time comes from the server-side deadline, not the browser
+        session = st.session_state.current_test
+        if session is None or session.submitted:
+            return
+        if session.check_deadline():
+            self.finish_exam()
+            st.rerun()
+        remaining = int(session.remaining())
+        timer_class = "timer-red" if remaining < 300 else "timer-green"
+        st.markdown(f'<div class="{timer_class}">⏳ {remaining // 60:02d}:{remaining % 60:02d} left</div>',
+                    unsafe_allow_html=True)
+
+    @st.fragment
+    def render_exam_workspace(self):
+        session = st.session_state.current_test
+        if session is None or session.submitted:
+            return
+        
+        summary = session.summary()
+        st.caption(" | ".join(f"{EXAM_STATUS_ICONS[status]} {label}: {summary[status]}"
+                              for status, label in EXAM_STATUS_LEGEND.items()))
+        
+        clicked = self.render_question_palette(len(session), session.current,
+                                               lambda i: EXAM_STATUS_ICONS[session.status(i)], "exam")
+        if clicked is not None:
+            self.navigate_exam_question(clicked)
+        
+        index = session.current
+        question_data = self.overlay.resolve([session.question_ids[index]])[0]
+        if question_data is None:
+            st.warning(REMOVED_QUESTION_WARNING)
+        else:
+            st.markdown(f'<div class="question-box">', unsafe_allow_html=True)
+            review_tag = " 🟣 *(marked for review)*" if session.marked[index] else ""
+            st.markdown(f"**Q{index+1}. {question_data.question}**{review_tag}")
+            choice = st.radio(
+                "Select your answer:",
+                range(len(question_data.options)),
+                format_func=lambda i: question_data.options[i],
+                key=f"exam_q_{index}",
+                index=session.chosen(index)
+            )
+            if choice is not None and choice != session.chosen(index):
+                session.answer(index, choice)
+            st.markdown('</div>', unsafe_allow_html=True)
+        
+        nav_col1, nav_col2, nav_col3, nav_col4 = st.columns(4)
+        with nav_col1:
+            if st.button("⬅️ Previous", use_container_width=True, disabled=index == 0):
+                self.navigate_exam_question(index - 1)
+        with nav_col2:
+            review_label = "Unmark Review" if session.marked[index] else "🟣 Mark for Review"
+            if st.button(review_label, use_container_width=True):
+                session.toggle_marked(index)
+                rerun_fragment()
+        with nav_col3:
+            if st.button("🧹 Clear Response", use_container_width=True):
+                session.clear_answer(index)
+                st.session_state.pop(f"exam_q_{index}", None)
+                rerun_fragment()
+        with nav_col4:
+            if st.button("Save & Next ➡️", use_container_width=True, disabled=index == len(session) - 1):
+                self.navigate_exam_question(index + 1)
+
+    def navigate_exam_question(self, index):
+        session = st.session_state.current_test
+        if not session.go_to(index) and session.submitted:
+            # Time ran out between the last tick and this click
+            self.finish_exam()
+            st.rerun()
+        # Let the palette page follow the current question
+        st.session_state.pop("exam_palette_page", None)
+        rerun_fragment()
+
+    def render_question_palette(self, total, current, icon_for, key_prefix):
+        """Paged grid of question buttons; returns the clicked index or None.
+        
+        Only one page of buttons is rendered, so long papers stay cheap.
+        """
+        page_key = f"{key_prefix}_palette_page"
+        page_count = max(1, -(-total // PALETTE_PAGE_SIZE))
+        page = min(st.session_state.get(page_key, current // PALETTE_PAGE_SIZE), page_count - 1)
+        start = page * PALETTE_PAGE_SIZE
+        end = min(start + PALETTE_PAGE_SIZE, total)
+        
+        if page_count > 1:
+            prev_col, label_col, next_col = st.columns([1, 4, 1])
+            with prev_col:
+                if st.button("◀", key=f"{key_prefix}_palette_prev", disabled=page == 0, use_container_width=True):
+                    st.session_state[page_key] = page - 1
+                    rerun_fragment()
+            with label_col:
+                st.caption(f"Questions {start+1}–{end} of {total} (page {page+1}/{page_count})")
+            with next_col:
+                if st.button("▶", key=f"{key_prefix}_palette_next", disabled=page == page_count - 1,
+                             use_container_width=True):
+                    st.session_state[page_key] = page + 1
+                    rerun_fragment()
+        
+        cols = st.columns(PALETTE_COLUMNS)
+        clicked = None
+        for i in range(start, end):
+            with cols[(i - start) % PALETTE_COLUMNS]:
+                if st.button(f"{icon_for(i)}{i+1}", key=f"{key_prefix}_nav_{i}", use_container_width=True,
+                             type="primary" if i == current else "secondary"):
+                    clicked = i
+        return clicked
+
+    def finish_exam(self):
+        session = st.session_state.current_test
+        if session is None:
+            return
+        questions = self.overlay.resolve_recorded(session.question_ids)
+        score = session.score([q.correct_index for q in questions])
+        result = {
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M"),
+            'subject': session.subject,
+            'score': score,
+            'total': len(session),
+            'attempted': session.answered_count,
+            'marked': session.marked_count,
+            'total_time': int(session.elapsed()),
+            'auto_submitted': session.auto_submitted,
+            'question_ids': session.question_ids,
+            'answers': session.answers,
+        }
+        st.session_state.test_history.append(result)
+        st.session_state.last_exam_result = result
+        st.session_state.current_test = None
+        self.overlay.use('exam', None)
+
+    def show_exam_results(self, result):
+        st.markdown("### 📊 Exam Results")
+        if result['auto_submitted']:
+            st.warning("⏰ Time was up - your exam was submitted automatically.")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Score", f"{result['score']}/{result['total']}")
+        with col2:
+            st.metric("Attempted", result['attempted'])
+        with col3:
+            accuracy = (result['score'] / result['attempted']) * 100 if result['attempted'] else 0
+            st.metric("Accuracy", f"{accuracy:.1f}%")
+        with col4:
+            st.metric("Time Taken", f"{result['total_time'] // 60}m {result['total_time'] % 60}s")
 
     # Other methods (dashboard, performance analysis, etc.) remain similar to previous implementation
     def show_dashboard(self):
         st.markdown('<div class="section-header">📊 Your Learning Dashboard</div>', unsafe_allow_html=True)
         
-        col1, col2, col3, col4 = st.columns(4)
+        col1, col2, col3, col4, col5 = st.columns(5)
         with col1:
             st.metric("Tests Taken", len(st.session_state.test_history))
         with col2:
-            st.metric("Practice Sessions", len(st.session_state.practice_history))
+            st.metric("Practice Sessions", self.history_store.count(st.session_state.user_id))
         with col3:
-            st.metric("Bookmarks", len(st.session_state.bookmarks))
+            st.metric("Bookmarks", len(self.overlay.bookmarks))
         with col4:
             st.metric("PDF Questions", len(st.session_state.converted_questions))
+        with col5:
+            st.metric("Bank Questions", self.question_bank.count())
 
     def previous_year_papers(self):
         st.markdown('<div class="section-header">📚 Previous Year Papers</div>', unsafe_allow_html=True)
@@ -690,25 +1168,245 @@ class MockTestApp:
     def performance_analysis(self):
         st.markdown('<div class="section-header">📊 Performance Analysis</div>', unsafe_allow_html=True)
         
-        if st.session_state.practice_history:
-            # Show practice performance charts
-            history_df = pd.DataFrame(st.session_state.practice_history)
-            fig = px.line(history_df, x='date', y='score', title='Practice Score Trend')
-            st.plotly_chart(fig, use_container_width=True)
+        session_count = self.history_store.count(st.session_state.user_id)
+        if session_count:
+            self.render_practice_charts(self.practice_analytics())
+            
+            st.markdown("### 📦 Session Reports")
+            if st.button(f"📦 Build reports for all {session_count} sessions"):
+                sessions = [(result, self.overlay.resolve_recorded(result['question_ids']))
+                            for result in self.history_store.iter_results(st.session_state.user_id)]
+                st.session_state.report_zip = self.report_renderer.submit_zip(sessions)
+            if st.session_state.report_zip is not None:
+                self.offer_pending_download(st.session_state.report_zip, "📥 Download all reports (zip)",
+                                            "practice_reports.zip", "application/zip", key="report_zip_download")
+
+    def render_practice_charts(self, analytics):
+        """Charts drawn from the running aggregates only; cost doesn't grow with the history"""
+        import plotly.express as px
+        import plotly.graph_objects as go
+        from practice_analytics import ROLLING_SESSIONS, TIME_BIN_LABELS
+        
+        totals = analytics.totals()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Sessions", totals['sessions'])
+        with col2:
+            st.metric("Questions Answered", f"{totals['answered']}/{totals['questions']}")
+        with col3:
+            accuracy = totals['accuracy']
+            recent = totals['ewma_accuracy']
+            st.metric("Accuracy", f"{accuracy:.1%}" if accuracy is not None else "-",
+                      f"{recent - accuracy:+.1%} recent" if accuracy is not None and recent is not None else None)
+        with col4:
+            per_question = totals['seconds_per_question']
+            st.metric("Avg Time/Q", f"{per_question:.1f}s" if per_question is not None else "-")
+        
+        numbers, accuracy, rolling, seconds = analytics.trend()
+        trend = go.Figure()
+        trend.add_trace(go.Scatter(x=numbers, y=accuracy * 100, mode='markers+lines', name='Session'))
+        trend.add_trace(go.Scatter(x=numbers, y=rolling * 100, mode='lines', name=f'{ROLLING_SESSIONS}-session average'))
+        trend.update_layout(title='Accuracy Trend', xaxis_title='Session', yaxis_title='Accuracy (%)',
+                            yaxis_range=[0, 100])
+        st.plotly_chart(trend, use_container_width=True)
+        
+        chart_col1, chart_col2 = st.columns(2)
+        for col, tally, title in ((chart_col1, analytics.topics, 'Accuracy by Topic'),
+                                  (chart_col2, analytics.difficulties, 'Accuracy by Difficulty')):
+            answered = tally.field('answered')
+            shown = answered > 0
+            with col:
+                if shown.any():
+                    fig = px.bar(x=[label for label, keep in zip(tally.labels, shown) if keep],
+                                 y=tally.accuracy()[shown] * 100, title=title,
+                                 labels={'x': '', 'y': 'Accuracy (%)'},
+                                 hover_data={'answered': answered[shown],
+                                             'avg seconds': tally.mean_seconds()[shown].round(1)})
+                    st.plotly_chart(fig, use_container_width=True)
+        
+        if analytics.time_counts.any():
+            timing = go.Figure()
+            timing.add_trace(go.Bar(x=TIME_BIN_LABELS, y=analytics.time_counts, name='Questions'))
+            timing.add_trace(go.Scatter(x=TIME_BIN_LABELS, y=analytics.time_accuracy() * 100, yaxis='y2',
+                                        mode='markers+lines', name='Accuracy (%)'))
+            timing.update_layout(title='Time per Question', yaxis_title='Questions',
+                                 yaxis2=dict(title='Accuracy (%)', overlaying='y', side='right', range=[0, 100]))
+            st.plotly_chart(timing, use_container_width=True)
 
     def bookmarked_questions(self):
         st.markdown('<div class="section-header">⭐ Bookmarked Questions</div>', unsafe_allow_html=True)
         
-        for i, question in enumerate(st.session_state.bookmarks):
-            with st.expander(f"Bookmark {i+1}: {question['question'][:100]}..."):
-                st.write(question['question'])
-                if st.button("🗑️ Remove", key=f"remove_{i}"):
-                    st.session_state.bookmarks.pop(i)
+        if not self.overlay.bookmarks:
+            st.info("No bookmarks yet - bookmark questions during practice to find them here.")
+            return
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            query = st.text_input("🔎 Search bookmarks", key="bookmark_search")
+        with col2:
+            fuzzy = st.toggle("Fuzzy match", value=True, key="bookmark_fuzzy")
+        matches = self.overlay.search_bookmarks(query, fuzzy)
+        page, start = self.search_page(len(matches), "bookmark_page")
+        st.caption(f"{len(matches)} of {len(self.overlay.bookmarks)} bookmarks")
+        
+        page_ids = matches[start:start + SEARCH_PAGE_SIZE]
+        for i, question in enumerate(self.overlay.resolve_recorded(page_ids), start):
+            with st.expander(f"Bookmark {i+1}: {question.question[:100]}..."):
+                st.write(question.question)
+                saved_note = self.overlay.notes.get(question.id, '')
+                note = st.text_input("📝 My note", value=saved_note, key=f"note_{question.id}")
+                if note != saved_note:
+                    self.overlay.set_note(question.id, note)
+                if st.button("🗑️ Remove", key=f"remove_{question.id}"):
+                    self.overlay.unbookmark(question.id)
                     st.rerun()
 
     def admin_panel(self):
+        import pandas as pd
         st.markdown('<div class="section-header">⚙️ Admin Panel</div>', unsafe_allow_html=True)
         st.info("Admin features for question bank management")
+        
+        st.markdown("### 🗄️ Question Bank")
+        col1, col2, col3 = st.columns(3)
+        for col, facet in zip((col1, col2, col3), ('topic', 'difficulty', 'source')):
+            with col:
+                st.write(f"**By {facet}**")
+                counts = pd.Series(self.question_bank.facet_counts(facet), name="questions")
+                if facet == 'source':
+                    counts.index = counts.index.map(source_label)
+                st.dataframe(counts, use_container_width=True)
+        
+        st.markdown("### 🧠 Shared Question Memory")
+        report = self.shared_store.memory_report()
+        mem_col1, mem_col2, mem_col3, mem_col4 = st.columns(4)
+        with mem_col1:
+            st.metric("Active Sessions", report['sessions'])
+        with mem_col2:
+            st.metric("Shared Questions", report['shared_questions'], f"{report['session_references']} session refs")
+        with mem_col3:
+            st.metric("Shared + Overlay Memory", f"{(report['shared_bytes'] + report['overlay_bytes']) / 1024:.1f} KB")
+        with mem_col4:
+            st.metric("Saved vs Per-Session Copies", f"{report['saved_bytes'] / 1024:.1f} KB")
+        st.caption(f"Keeps about {report['max_questions']:,} questions; {report['evicted']:,} unused bank "
+                   f"questions evicted so far, reloaded from the bank when needed")
+        
+        self.bulk_import_panel()
+        self.grading_panel()
+        
+        st.markdown("### 📤 Export Bank")
+        exp_col1, exp_col2, exp_col3 = st.columns(3)
+        with exp_col1:
+            sources = [source for source in self.question_bank.facet_counts('source') if source]
+            export_source = st.selectbox("Source", ["All sources"] + sources, key="bank_export_source",
+                                         format_func=source_label)
+        with exp_col2:
+            export_format = st.selectbox("Format", list(EXPORT_FORMATS), key="bank_export_format")
+        with exp_col3:
+            if st.button("📤 Export", use_container_width=True, key="bank_export"):
+                source = None if export_source == "All sources" else export_source
+                # Rows stream out of SQLite in id order; only the encoded bytes are kept
+                data = export_bytes(self.question_bank.iter_questions(source=source), export_format,
+                                    option_count=self.question_bank.max_option_count(source))
+                self.offer_download(data, export_format, "question_bank", key="bank_download")
+
+        search_col1, search_col2 = st.columns([3, 1])
+        with search_col1:
+            query = st.text_input("🔎 Search question text", key="bank_search")
+        with search_col2:
+            fuzzy = st.toggle("Fuzzy match", value=True, key="bank_search_fuzzy")
+        if query:
+            # Misspelt words become an OR of the closest terms in the bank's vocabulary
+            groups = get_bank_search().expand(query, fuzzy)
+            total = self.question_bank.match_count(groups)
+            _, start = self.search_page(total, "bank_search_page")
+            results = self.question_bank.match(groups, SEARCH_PAGE_SIZE, start)
+            st.caption(f"{total:,} matches")
+            for q in results:
+                st.write(f"**#{q.id}** {q.question} "
+                         f"_({q.topic}, {q.difficulty}, {source_label(q.source) or 'manual'})_")
+
+    def search_page(self, total, key):
+        """Page picker for search results; returns (page, index of the page's first result)"""
+        page_count = max(1, -(-total // SEARCH_PAGE_SIZE))
+        if st.session_state.get(key, 1) > page_count:
+            st.session_state[key] = 1
+        page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, key=key)
+        return page, (page - 1) * SEARCH_PAGE_SIZE
+
+    def bulk_import_panel(self):
+        st.markdown("### 📥 Bulk Import")
+        uploaded = st.file_uploader("Questions file (CSV, JSONL, Excel or Parquet)", key="bulk_import_file",
+                                    type=['csv', 'jsonl', 'json', 'ndjson', 'xlsx', 'parquet'])
+        if uploaded is None or not st.button("📥 Import into Bank", key="bulk_import"):
+            return
+        status = st.empty()
+        try:
+            report = import_questions(self.question_bank, uploaded, uploaded.name,
+                                      progress=lambda rows: status.info(f"⏳ {rows:,} rows processed..."))
+        except ValueError as e:
+            status.error(f"❌ {e}")
+            return
+        status.success(f"✅ Imported {report['imported']:,} of {report['read']:,} rows")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Already in Bank", f"{report['duplicate_in_bank']:,}")
+        with col2:
+            st.metric("Repeated in File", f"{report['duplicate_in_file']:,}")
+        with col3:
+            st.metric("Rejected", f"{report['rejected']:,}")
+        if report['reject_reasons']:
+            st.write({reason: count for reason, count in report['reject_reasons'].items()})
+            st.dataframe(report['reject_samples'], hide_index=True, use_container_width=True)
+
+    def grading_panel(self):
+        st.markdown("### 📝 Grade Answer Sheets")
+        sources = [source for source in self.question_bank.facet_counts('source') if source]
+        if not sources:
+            st.caption("Add a paper to the bank to grade answer sheets against it.")
+            return
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            paper = st.selectbox("Paper (answer key)", sources, key="grade_source", format_func=source_label)
+        with col2:
+            marks = st.number_input("Marks per correct answer", min_value=0.0, value=1.0, step=0.25, key="grade_marks")
+        with col3:
+            penalty = st.number_input("Marks off per wrong answer", min_value=0.0, value=0.0, step=0.25,
+                                      key="grade_penalty")
+        uploaded = st.file_uploader("Answer sheets: one row per student, columns Q1, Q2, ... with the marked letter",
+                                    key="grade_sheets", type=['csv', 'jsonl', 'json', 'ndjson', 'xlsx', 'parquet'])
+        if uploaded is None or not st.button("📝 Grade Sheets", key="grade_run"):
+            return
+        from answer_grading import Grades, read_answer_sheets
+
+        key = get_answer_key(paper, self.question_bank.revision)
+        try:
+            student_ids, choices = read_answer_sheets(uploaded, uploaded.name, len(key))
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            return
+        grades = Grades(key, choices, student_ids, marks, penalty)
+        summary = grades.summary()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Students", f"{summary['students']:,}")
+        with col2:
+            st.metric("Graded Questions", f"{summary['graded_questions']} of {summary['questions']}")
+        with col3:
+            st.metric("Mean Score", f"{summary['mean_score'] or 0:.2f} / {summary['max_score']:g}")
+        with col4:
+            st.metric("Top Score", f"{summary['top_score'] or 0:.2f}")
+        students = grades.student_frame()
+        items = grades.item_frame()
+        st.write("**Students**")
+        st.dataframe(students, hide_index=True, use_container_width=True)
+        st.write("**Questions** (difficulty: share correct; discrimination: correlation with the rest of the test)")
+        st.dataframe(items, hide_index=True, use_container_width=True)
+        dl_col1, dl_col2 = st.columns(2)
+        with dl_col1:
+            self.offer_download(students.to_csv(index=False).encode(), 'csv', "grades_students",
+                                key="grade_students_download")
+        with dl_col2:
+            self.offer_download(items.to_csv(index=False).encode(), 'csv', "grades_questions",
+                                key="grade_items_download")
 
 # Run the app
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+"""Bulk import throughput: synthetic CSV/JSONL/Parquet into an empty bank.
+
+Usage: python benchmarks/bench_import.py [--questions 500000] [--format csv] [--chunk 50000]
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_bank import QuestionBank
+from question_export import export_questions
+from question_import import IMPORT_CHUNK_ROWS, import_questions
+
+TOPICS = ["General", "Math", "Reasoning", "English", "GK"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+
+def make_questions(count):
+    for i in range(count):
+        yield {
+            'question': f"Q{i}. A train covers {i % 500} km in {i % 9 + 1} hours. What is its speed (case {i})?",
+            'options': [f"{(i * (n + 3)) % 97} km/h" for n in range(4 + i % 2)],
+            'correct_answer': "ABCD"[i % 4],
+            'explanation': 'Speed = distance / time',
+            'topic': TOPICS[i % len(TOPICS)],
+            'difficulty': DIFFICULTIES[i % len(DIFFICULTIES)],
+        }
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=500000)
+    parser.add_argument("--format", choices=['csv', 'jsonl', 'parquet'], default='csv')
+    parser.add_argument("--chunk", type=int, default=IMPORT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, f"questions.{args.format}")
+        with open(path, "wb") as sink:
+            export_questions(make_questions(args.questions), args.format, sink, option_count=5)
+        bank = QuestionBank(os.path.join(workdir, "bank.db"))
+        rss_before = peak_rss_mb()
+
+        start = time.perf_counter()
+        report = import_questions(bank, path, path, chunk_rows=args.chunk)
+        elapsed = time.perf_counter() - start
+        print(f"file: {os.path.getsize(path) / 1e6:.1f} MB {args.format}, {report['read']:,} rows")
+        print(f"import: {elapsed:.2f} s  {report['imported'] / elapsed:,.0f} questions/s  "
+              f"peak RSS {peak_rss_mb():.0f} MB (before import {rss_before:.0f} MB)")
+
+        # Second pass: every row is a duplicate, so this is validation + dedupe only
+        start = time.perf_counter()
+        report = import_questions(bank, path, path, chunk_rows=args.chunk)
+        elapsed = time.perf_counter() - start
+        print(f"re-import (all duplicates): {elapsed:.2f} s  {report['duplicate_in_bank']:,} skipped")
+
+
+if __name__ == "__main__":
+    main()
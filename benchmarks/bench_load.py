@@ -0,0 +1,284 @@
+"""Concurrent-session load test: N simulated students driving app.py at once.
+
+Every simulated session is its own AppTest instance on its own thread,
+sharing the process-wide caches, question bank and worker pools the way
+real sessions share one server process. Each session walks a full flow:
+open the app, import a PDF, start a practice session from it, answer and
+move through every question, end the session and open Performance
+Analysis. For each concurrency level the harness reports rerun latency
+percentiles (overall and per step), process CPU time and the memory each
+session's ``session_state`` holds beyond the shared objects.
+
+AppTest cannot upload files, so the PDF import step converts a synthetic
+PDF with the app's converter and extraction cache and puts the questions
+in ``session_state`` as the converter page does.
+
+Usage: python benchmarks/bench_load.py [--sessions 1,2,4,8] [--practice-size 10] [--output load.json]
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import defaultdict
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_suite import git_revision, int_list, make_question_pdf, percentile
+
+# Objects every session points at but none of them owns
+SKIPPED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+                 threading.Thread)
+
+
+def shared_types():
+    from extraction_cache import ExtractionCache
+    from ingest_jobs import IngestQueue
+    from practice_history import PracticeHistoryStore
+    from practice_report import ReportRenderer
+    from question_bank import QuestionBank
+    from shared_bank import SharedQuestionStore
+    return SKIPPED_TYPES + (SharedQuestionStore, QuestionBank, ExtractionCache, ReportRenderer, IngestQueue,
+                            PracticeHistoryStore)
+
+
+@contextlib.contextmanager
+def concurrent_apptests():
+    """Let AppTest instances run on several threads at once while the block runs.
+
+    Each AppTest run installs a mock Runtime as the process-wide instance
+    and clears it when it finishes, which pulls the runtime from under any
+    other session still running: fall back to one long-lived mock instead.
+    Each run also compiles the script afresh, and concurrent compiles are
+    not safe; share one script cache, as a real server does. Streamlit's
+    own Runtime.instance, ScriptCache.get_bytecode and global.appTest
+    option are put back on the way out.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    fallback = MagicMock(spec=Runtime)
+    fallback.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    fallback.cache_storage_manager = MemoryCacheStorageManager()
+    scripts = ScriptCache()
+    compile_lock = threading.Lock()
+    # Read from the class dict, so the classmethod goes back as it was
+    instance = Runtime.__dict__['instance']
+    get_bytecode = ScriptCache.get_bytecode
+    app_test = config.get_option("global.appTest")
+
+    def shared_bytecode(self, script_path):
+        with compile_lock:
+            return get_bytecode(scripts, script_path)
+
+    Runtime.instance = classmethod(lambda cls: cls._instance or fallback)
+    ScriptCache.get_bytecode = shared_bytecode
+    # AppTest sets this per run and restores it afterwards; keep it on throughout
+    config.set_option("global.appTest", True)
+    try:
+        yield
+    finally:
+        Runtime.instance = instance
+        ScriptCache.get_bytecode = get_bytecode
+        config.set_option("global.appTest", app_test)
+
+
+def state_bytes(state, skipped):
+    """Deep size of session_state values, not following into shared objects"""
+    seen = set()
+    pending = list(state.values())
+    total = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, skipped):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return total
+
+
+class SimulatedSession:
+    """One student: an AppTest plus the timing of every rerun it triggers"""
+
+    def __init__(self, pdf_path, practice_size, skipped):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=300)
+        self.pdf_path = pdf_path
+        self.practice_size = practice_size
+        self.skipped = skipped
+        self.latencies = defaultdict(list)
+        self.state_kib = {}
+        self.error = None
+
+    def step(self, name, element=None):
+        start = time.perf_counter()
+        (element or self.at).run()
+        self.latencies[name].append(time.perf_counter() - start)
+        if self.at.exception:
+            raise RuntimeError(f"{name}: {self.at.exception[0].value}")
+
+    def button(self, text):
+        return next(b for b in self.at.button if text in b.label)
+
+    def mode(self, name, label):
+        self.step(name, self.at.sidebar.selectbox[0].set_value(label))
+
+    def import_pdf(self):
+        from extraction_cache import ExtractionCache
+        from quiz_converter import PDFQuizConverter
+
+        # What the converter page does with an upload, minus the upload widget
+        start = time.perf_counter()
+        result = PDFQuizConverter(workers=1).convert(self.pdf_path, cache=ExtractionCache())
+        self.at.session_state['converted_questions'] = result.questions
+        self.latencies['pdf_import'].append(time.perf_counter() - start)
+
+    def run_flow(self):
+        at = self.at
+        self.step('open_app')
+        self.mode('open_converter', "🔄 PDF to Quiz Converter")
+        self.import_pdf()
+        self.mode('open_practice', "🔍 Practice Mode")
+        source = next(s for s in at.selectbox if s.label == "Questions From")
+        self.step('choose_source', source.set_value("PDF Import"))
+        self.step('choose_count', at.slider[0].set_value(self.practice_size))
+        self.step('start_practice', self.button("Start Practice").click())
+        total = at.session_state['current_practice']['total_questions']
+        for i in range(total):
+            radio = at.radio(key=f"practice_q_{i}")
+            self.step('answer', radio.set_value(radio.options[i % len(radio.options)]))
+            if i < total - 1:
+                self.step('next_question', self.button("Next").click())
+        self.state_kib['practice'] = state_bytes(at.session_state.filtered_state, self.skipped) / 1024
+        self.step('end_practice', self.button("End Practice").click())
+        self.mode('open_analysis', "📊 Performance Analysis")
+        self.state_kib['end'] = state_bytes(at.session_state.filtered_state, self.skipped) / 1024
+
+    def run(self, barrier, rounds):
+        try:
+            barrier.wait()
+            for _ in range(rounds):
+                self.run_flow()
+        except Exception as e:
+            self.error = e
+
+
+def run_level(count, args, pdf_path, skipped):
+    sessions = [SimulatedSession(pdf_path, args.practice_size, skipped) for _ in range(count)]
+    barrier = threading.Barrier(count + 1)
+    threads = [threading.Thread(target=session.run, args=(barrier, args.rounds), name=f"session-{i}")
+               for i, session in enumerate(sessions)]
+    for thread in threads:
+        thread.start()
+    gc.collect()
+    barrier.wait()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for thread in threads:
+        thread.join()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    errors = [session.error for session in sessions if session.error]
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {count} sessions failed: {errors[0]}")
+    by_step = defaultdict(list)
+    for session in sessions:
+        for name, values in session.latencies.items():
+            by_step[name].extend(values)
+    reruns = sorted(value for name, values in by_step.items() if name != 'pdf_import' for value in values)
+    practice_kib = [session.state_kib['practice'] for session in sessions]
+    end_kib = [session.state_kib['end'] for session in sessions]
+    return {
+        'sessions': count,
+        'reruns': len(reruns),
+        'wall_s': wall,
+        'reruns_per_s': len(reruns) / wall,
+        'p50_ms': percentile(reruns, 0.5) * 1000,
+        'p95_ms': percentile(reruns, 0.95) * 1000,
+        'p99_ms': percentile(reruns, 0.99) * 1000,
+        'max_ms': reruns[-1] * 1000,
+        'cpu_s': cpu,
+        'cpu_ms_per_rerun': cpu * 1000 / len(reruns),
+        'cpu_utilization': cpu / wall,
+        'state_kib_practice_mean': statistics.fmean(practice_kib),
+        'state_kib_end_mean': statistics.fmean(end_kib),
+        'state_kib_end_max': max(end_kib),
+        'steps': {name: {'count': len(values),
+                         'p50_ms': percentile(sorted(values), 0.5) * 1000,
+                         'p95_ms': percentile(sorted(values), 0.95) * 1000}
+                  for name, values in by_step.items()},
+    }
+
+
+def print_level(level):
+    print(f"{level['sessions']:>8} {level['reruns']:>7} {level['p50_ms']:9.1f} {level['p95_ms']:9.1f} "
+          f"{level['p99_ms']:9.1f} {level['reruns_per_s']:9.1f} {level['cpu_ms_per_rerun']:10.1f} "
+          f"{level['cpu_utilization']:6.0%} {level['state_kib_end_mean']:12.1f}", flush=True)
+
+
+def print_steps(level):
+    print(f"  per step at {level['sessions']} sessions (p50 / p95 ms): " + ", ".join(
+        f"{name} {step['p50_ms']:.0f}/{step['p95_ms']:.0f}" for name, step in level['steps'].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int_list, default=[1, 2, 4, 8], help="Concurrency levels")
+    parser.add_argument("--rounds", type=int, default=1, help="Flows each session runs per level")
+    parser.add_argument("--practice-size", type=int, default=10, help="Questions per practice session (5-50)")
+    parser.add_argument("--pdf-questions", type=int, default=200, help="Questions in the imported PDF")
+    parser.add_argument("--output", help="JSON results file (default: load-<commit>.json)")
+    args = parser.parse_args()
+
+    meta = {
+        'commit': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': {key: value for key, value in vars(args).items() if key != 'output'},
+    }
+    levels = []
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.update(MOCKTEST_BANK_PATH=os.path.join(workdir, "bank.db"),
+                          MOCKTEST_CACHE_DIR=os.path.join(workdir, "cache"),
+                          MOCKTEST_JOBS_DIR=os.path.join(workdir, "jobs"),
+                          MOCKTEST_HISTORY_PATH=os.path.join(workdir, "history.db"))
+        pdf_path = os.path.join(workdir, "paper.pdf")
+        make_question_pdf(pdf_path, args.pdf_questions, 'compact')
+        skipped = shared_types()
+        with concurrent_apptests():
+            # One untimed flow first, so imports and cold caches don't land in the first level
+            run_level(1, argparse.Namespace(**{**vars(args), 'rounds': 1}), pdf_path, skipped)
+            print(f"{'sessions':>8} {'reruns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'reruns/s':>9} "
+                  f"{'CPU ms/run':>10} {'CPU':>6} {'state KiB':>12}")
+            for count in args.sessions:
+                levels.append(run_level(count, args, pdf_path, skipped))
+                print_level(levels[-1])
+        for level in levels:
+            print_steps(level)
+
+    output = args.output or f"load-{meta['commit'] or 'unknown'}.json"
+    with open(output, "w") as f:
+        json.dump({'meta': meta, 'levels': levels}, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
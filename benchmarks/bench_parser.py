@@ -0,0 +1,91 @@
+"""Parser throughput benchmark on synthetic question text.
+
+Usage: python benchmarks/bench_parser.py [--questions 10000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_parser import parse_questions
+
+
+def make_question_text(count, seed=0):
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(count):
+        words = " ".join(rng.choice(["speed", "train", "ratio", "profit", "angle", "area"]) for _ in range(12))
+        options = "\n".join(f"{letter}. {rng.randint(1, 999)} {words[:20]}" for letter in "ABCD")
+        blocks.append(f"Q{i + 1}. Which value fits {words}?\n{options}\nAnswer {rng.choice('ABCD')}")
+        if i % 25 == 0:
+            blocks.append("Page header text without a question")
+    return "\n\n".join(blocks) + "\n"
+
+
+def legacy_parse(text):
+    """The regex parser this module replaced, kept for comparison"""
+    questions = []
+    for block in re.split(r'\n\s*\n', text):
+        if not block.strip():
+            continue
+        lines = block.strip().split('\n')
+        if len(lines) < 3:
+            continue
+        first_line = lines[0].strip()
+        if not (re.match(r'^(?:Q\.?|Question|\d+\.|\(?\d+\)?)', first_line, re.IGNORECASE) or
+                '?' in first_line or 'which' in first_line.lower()):
+            continue
+        block_lines = [line.strip() for line in block.split('\n') if line.strip()]
+        question_data = {'question': block_lines[0], 'options': [], 'correct_answer': None,
+                         'explanation': 'Auto-extracted from PDF'}
+        answer_line = None
+        for line in block_lines[1:]:
+            if re.match(r'^[A-D]\.', line, re.IGNORECASE):
+                question_data['options'].append(line)
+            elif 'answer' in line.lower():
+                answer_line = line
+            elif re.match(r'^[A-D]\.', line[:3], re.IGNORECASE):
+                question_data['options'].append(line)
+        if answer_line:
+            answer_match = re.search(r'[A-D]', answer_line, re.IGNORECASE)
+            if answer_match:
+                question_data['correct_answer'] = answer_match.group().upper()
+        if question_data['question'] and len(question_data['options']) >= 2:
+            questions.append(question_data)
+    return questions
+
+
+def best_of(func, text, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = make_question_text(args.questions)
+    legacy_time, expected = best_of(legacy_parse, text, args.repeat)
+    new_time, parsed = best_of(parse_questions, text, args.repeat)
+    if parsed != expected:
+        sys.exit("parse_questions output differs from the legacy parser")
+
+    print(f"input: {len(text) / 1e6:.1f} MB, {len(parsed)} questions")
+    for name, elapsed in (("legacy regex", legacy_time), ("single-pass", new_time)):
+        print(f"{name:>13}: {elapsed * 1000:8.1f} ms  {len(parsed) / elapsed:12,.0f} questions/s")
+    print(f"      speedup: {legacy_time / new_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
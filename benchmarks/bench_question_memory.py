@@ -0,0 +1,64 @@
+"""Memory per question: plain dicts versus the slotted Question model.
+
+Usage: python benchmarks/bench_question_memory.py [--questions 100000]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from question_model import Question
+
+TOPICS = ["General", "Math", "Reasoning", "English", "GK"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+
+def make_rows(count):
+    # JSON round trip, like rows coming back from the cache or the bank:
+    # every topic/difficulty/letter is a fresh string object
+    rows = [{
+        'id': i,
+        'question': f"Q{i}. A train covers {i % 500} km in {i % 9 + 1} hours. What is its speed?",
+        'options': [f"{letter}. {(i * (n + 3)) % 97} km/h" for n, letter in enumerate("ABCD")],
+        'correct_answer': "ABCD"[i % 4],
+        'explanation': 'Auto-extracted from PDF',
+        'topic': TOPICS[i % len(TOPICS)],
+        'difficulty': DIFFICULTIES[i % len(DIFFICULTIES)],
+        'source': 'paper.pdf',
+    } for i in range(count)]
+    return json.loads(json.dumps(rows))
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100000)
+    args = parser.parse_args()
+
+    dicts, dict_bytes = measure(lambda: make_rows(args.questions))
+    serialized = json.dumps(dicts)
+    del dicts
+    questions, model_bytes = measure(lambda: [Question.from_dict(row) for row in json.loads(serialized)])
+    assert len(questions) == args.questions
+
+    print(f"{args.questions:,} questions")
+    print(f"  dicts:    {dict_bytes / 1e6:8.1f} MB  {dict_bytes / args.questions:7.0f} B/question")
+    print(f"  Question: {model_bytes / 1e6:8.1f} MB  {model_bytes / args.questions:7.0f} B/question")
+    print(f"  saving:   {(1 - model_bytes / dict_bytes) * 100:7.1f} %")
+
+
+if __name__ == "__main__":
+    main()
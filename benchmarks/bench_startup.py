@@ -0,0 +1,96 @@
+"""Cold-start cost: heavy import times and time-to-first-render per route.
+
+Every route is measured in a fresh interpreter, driving app.py with
+Streamlit's AppTest: the first (Dashboard) run, the first render of the
+route itself, and a warm rerun of it. Also lists which heavy libraries
+each route ended up importing.
+
+Usage: python benchmarks/bench_startup.py [--repeat 3] [--route "📊 Performance Analysis"]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+HEAVY_MODULES = ["pandas", "plotly.express", "fpdf", "pdfplumber", "PyPDF2"]
+ROUTES = ["🏠 Dashboard", "📝 Exam Mode", "🔍 Practice Mode", "📚 Previous Year Papers",
+          "📊 Performance Analysis", "⭐ Bookmarked Questions", "🔄 PDF to Quiz Converter", "⚙️ Admin Panel"]
+
+
+def import_time(module):
+    """Seconds to import ``module`` in a fresh interpreter"""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip())
+
+
+def measure_route(route):
+    """Runs inside a fresh interpreter; prints one JSON line of timings"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    start = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - start
+    start = time.perf_counter()
+    at.sidebar.selectbox[0].set_value(route).run()
+    route_first = time.perf_counter() - start
+    start = time.perf_counter()
+    at.run()
+    route_warm = time.perf_counter() - start
+    print(json.dumps({
+        'first_run': first_run,
+        'route_first': route_first,
+        'route_warm': route_warm,
+        'errors': [str(e.value) for e in at.exception],
+        'heavy_loaded': [m for m in HEAVY_MODULES if m in sys.modules],
+    }))
+
+
+def run_child(route, workdir):
+    env = dict(os.environ,
+               MOCKTEST_BANK_PATH=os.path.join(workdir, "bank.db"),
+               MOCKTEST_CACHE_DIR=os.path.join(workdir, "cache"),
+               MOCKTEST_HISTORY_PATH=os.path.join(workdir, "history.db"))
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", route],
+                         capture_output=True, text=True, env=env, cwd=workdir, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--route", action="append", help="Route label to measure (default: all)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure_route(args.child)
+        return
+
+    print("import time in a fresh interpreter:")
+    for module in ["streamlit"] + HEAVY_MODULES:
+        print(f"  {module:>15}: {min(import_time(module) for _ in range(args.repeat)) * 1000:8.1f} ms")
+
+    print(f"\n{'route':<28}{'first run':>12}{'route first':>13}{'warm':>10}  heavy imports")
+    with tempfile.TemporaryDirectory() as workdir:
+        for route in args.route or ROUTES:
+            runs = [run_child(route, workdir) for _ in range(args.repeat)]
+            errors = [e for run in runs for e in run['errors']]
+            if errors:
+                sys.exit(f"{route}: {errors[0]}")
+            timings = [statistics.median(run[key] for run in runs) * 1000
+                       for key in ('first_run', 'route_first', 'route_warm')]
+            print(f"{route:<28}" + "".join(f"{t:>10.0f}ms" for t in timings)
+                  + "  " + (", ".join(runs[-1]['heavy_loaded']) or "-"))
+
+
+if __name__ == "__main__":
+    main()
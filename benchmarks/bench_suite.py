@@ -0,0 +1,551 @@
+"""Benchmark suite: PDF extraction, parsing, export, selection, grading, deduplication and practice history stages.
+
+Synthetic question PDFs are generated with fpdf at several sizes and
+layouts, and synthetic practice histories are injected into the app. Each
+stage reports throughput, latency percentiles and peak Python memory, and
+the whole run is written as JSON so results from different commits can be
+compared.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 200,2000] [--repeat 5] [--output results.json]
+    python benchmarks/bench_suite.py --stages parse,export --repeat 10
+    python benchmarks/bench_suite.py --compare before.json after.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STAGES = ['extract', 'parse', 'convert', 'export', 'select', 'grade', 'dedupe', 'end_practice', 'analysis']
+LAYOUTS = ['compact', 'wrapped', 'noisy']
+TOPICS = ["General", "Math", "Reasoning", "English", "GK"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+WORDS = ["speed", "train", "ratio", "profit", "angle", "area", "average", "interest", "volume", "series"]
+
+
+# Synthetic inputs
+
+def question_lines(i, rng, wrapped):
+    words = " ".join(rng.choice(WORDS) for _ in range(40 if wrapped else 10))
+    options = [f"{letter}. {rng.randint(1, 999)} {rng.choice(WORDS)}" for letter in "ABCD"]
+    return f"Q{i + 1}. Which value fits the {words}?", options, f"Answer: {rng.choice('ABCD')}"
+
+
+def make_question_pdf(path, count, layout, seed=0):
+    """Write ``count`` questions in ``layout``; returns the page count.
+
+    compact: one line per question and option, blocks run across pages.
+    wrapped: long question stems wrapped over several lines.
+    noisy: page headers and footers plus instruction paragraphs between blocks.
+    """
+    from fpdf import FPDF
+
+    class Paper(FPDF):
+        def header(self):
+            if layout == 'noisy':
+                self.set_font("Arial", size=8)
+                self.cell(0, 5, "Synthetic Mock Paper - Reasoning and Aptitude", ln=1)
+                self.cell(0, 5, " ", ln=1)
+                self.set_font("Arial", size=10)
+
+        def footer(self):
+            if layout == 'noisy':
+                self.set_y(-12)
+                self.set_font("Arial", size=8)
+                self.cell(0, 5, f"Page {self.page_no()}", align='C')
+                self.set_font("Arial", size=10)
+
+    rng = random.Random(seed)
+    pdf = Paper()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.set_font("Arial", size=10)
+    pdf.add_page()
+    for i in range(count):
+        question, options, answer = question_lines(i, rng, layout == 'wrapped')
+        if layout == 'wrapped':
+            pdf.multi_cell(0, 5, question)
+        else:
+            pdf.cell(0, 5, question, ln=1)
+        for line in options + [answer]:
+            pdf.cell(0, 5, line, ln=1)
+        # A lone space survives extraction as a blank line, which ends the block
+        pdf.cell(0, 5, " ", ln=1)
+        if layout == 'noisy' and i % 10 == 9:
+            pdf.multi_cell(0, 5, "Read every option carefully before answering. " * 3)
+            pdf.cell(0, 5, " ", ln=1)
+    pdf.output(path)
+    return pdf.page_no()
+
+
+def make_questions(count, seed=0):
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        question, options, answer = question_lines(i, rng, False)
+        questions.append({'question': question, 'options': options, 'correct_answer': answer[-1],
+                          'explanation': 'Synthetic', 'topic': TOPICS[i % len(TOPICS)],
+                          'difficulty': DIFFICULTIES[i % len(DIFFICULTIES)]})
+    return questions
+
+
+def make_history(sessions, question_ids, seed=0):
+    """Practice session results shaped like end_practice_session's, plus their question ids"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    history = []
+    for n in range(sessions):
+        ids = tuple(rng.sample(question_ids, rng.randint(5, min(50, len(question_ids)))))
+        answers = {i: rng.randrange(4) for i in range(len(ids)) if rng.random() < 0.9}
+        question_ms = {i: rng.randint(3000, 90000) for i in answers}
+        history.append({
+            'date': (start + timedelta(hours=7 * n)).strftime("%Y-%m-%d %H:%M"),
+            'score': sum(rng.random() < 0.6 for _ in answers),
+            'total': len(ids),
+            'total_time': sum(question_ms.values()) // 1000,
+            'answers': answers,
+            'question_ids': ids,
+            'question_ms': question_ms,
+        })
+    return history
+
+
+# Measurement
+
+def percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of an already sorted list"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = fraction * (len(sorted_values) - 1)
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def peak_memory(func):
+    """Peak bytes Python allocated while ``func`` ran (worker processes excluded)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(stage, case, latencies, items_per_sample, unit, peak_bytes, **extra):
+    """One result record; throughput uses the median sample"""
+    ordered = sorted(latencies)
+    median = percentile(ordered, 0.5)
+    return {
+        'stage': stage,
+        'case': case,
+        'samples': len(ordered),
+        'items': items_per_sample,
+        'unit': unit,
+        'throughput': items_per_sample / median if median > 0 else None,
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': median * 1000,
+        'p95_ms': percentile(ordered, 0.95) * 1000,
+        'p99_ms': percentile(ordered, 0.99) * 1000,
+        'peak_kib': peak_bytes / 1024,
+        **extra,
+    }
+
+
+def timed(func, repeat):
+    latencies = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        latencies.append(time.perf_counter() - start)
+    return latencies, result
+
+
+# Stages
+
+def bench_pdf_stages(args, workdir, stages, report):
+    from pdf_engine import PDFTextExtractor
+    from quiz_converter import PDFQuizConverter
+
+    results = []
+    for layout in args.layouts:
+        for size in args.sizes:
+            path = os.path.join(workdir, f"{layout}-{size}.pdf")
+            pages = make_question_pdf(path, size, layout, seed=size)
+            case = f"{layout}/{size}q/{pages}p"
+            converter = PDFQuizConverter(workers=args.workers)
+            text = converter.extract_text_from_pdf(path)
+
+            if 'extract' in stages:
+                extractor = PDFTextExtractor(workers=args.workers)
+                page_latencies = []
+
+                def extract():
+                    for page in extractor.iter_page_results(path):
+                        page_latencies.append(page.seconds)
+
+                latencies, _ = timed(extract, args.repeat)
+                record = summarize('extract', case, latencies, pages, 'pages', peak_memory(extract))
+                # Per-page percentiles as well: one slow page hides in a whole-document time
+                ordered = sorted(page_latencies)
+                record.update(page_p50_ms=percentile(ordered, 0.5) * 1000,
+                              page_p95_ms=percentile(ordered, 0.95) * 1000,
+                              page_p99_ms=percentile(ordered, 0.99) * 1000)
+                results.append(report(record))
+
+            if 'parse' in stages:
+                def parse():
+                    return list(converter.smart_question_parser(text))
+
+                latencies, parsed = timed(parse, args.repeat)
+                results.append(report(summarize('parse', case, latencies, len(parsed), 'questions',
+                                                peak_memory(parse), expected=size)))
+
+            if 'convert' in stages:
+                latencies, result = timed(lambda: converter.convert(path), args.repeat)
+                results.append(report(summarize('convert', case, latencies, len(result.questions), 'questions',
+                                                peak_memory(lambda: converter.convert(path)), pages=pages)))
+    return results
+
+
+def bench_export(args, report):
+    from question_export import EXPORT_FORMATS, export_bytes
+
+    questions = make_questions(args.export_rows)
+    results = []
+    for fmt in EXPORT_FORMATS:
+        def export():
+            return export_bytes(questions, fmt)
+
+        latencies, data = timed(export, args.repeat)
+        results.append(report(summarize('export', f"{fmt}/{len(questions)}q", latencies, len(questions),
+                                        'questions', peak_memory(export), bytes=len(data))))
+    return results
+
+
+def bench_select(args, workdir, report):
+    """Adaptive question selection straight against banks of several sizes"""
+    from practice_history import PracticeHistoryStore
+    from question_bank import QuestionBank
+    from question_selector import QuestionSelector
+
+    store = PracticeHistoryStore(os.path.join(workdir, "select-history.db"))
+    rng = random.Random(0)
+    results = []
+    for size in args.select_banks:
+        bank = QuestionBank(os.path.join(workdir, f"select-{size}.db"))
+        bank.add_questions(make_questions(size), source="bench.pdf")
+        user_id = f"select-{size}"
+        for result in make_history(args.history[-1], list(range(1, size + 1))):
+            store.record_session(user_id, result, bank.get_questions(result['question_ids']))
+        selector = QuestionSelector(bank, store)
+
+        start = time.perf_counter()
+        selector.select(user_id, args.practice_size)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        def select():
+            return selector.select(user_id, args.practice_size, topic=rng.choice(TOPICS))
+
+        latencies, _ = timed(select, args.repeat * 20)
+        results.append(report(summarize('select', f"{args.practice_size}q/{size}bank", latencies,
+                                        args.practice_size, 'questions', peak_memory(select),
+                                        cold_ms=cold_ms, state_kib=selector.nbytes() / 1024)))
+
+        session = bank.get_questions(range(1, args.practice_size + 1))
+
+        def answer():
+            result = {'answers': {i: rng.randrange(4) for i in range(len(session))}}
+            selector.record_session(user_id, result, session)
+
+        latencies, _ = timed(answer, args.repeat * 20)
+        results.append(report(summarize('select', f"answer/{size}bank", latencies, len(session), 'answers',
+                                        peak_memory(answer))))
+    return results
+
+
+def make_answer_sheets(path, students, questions, seed=0):
+    """A CSV of OMR-style answer sheets for ``questions`` keyed 'A', 'B', 'C', 'D', ... in turn"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    key = np.arange(questions) % 4
+    ability = rng.random((students, 1))
+    choices = np.where(rng.random((students, questions)) < ability, key, rng.integers(0, 4, (students, questions)))
+    cells = np.array(list("ABCD") + [""], dtype=object)[np.where(rng.random(choices.shape) < 0.05, 4, choices)]
+    frame = pd.DataFrame(cells, columns=[f"Q{i + 1}" for i in range(questions)])
+    frame.insert(0, "student_id", [f"S{i:06d}" for i in range(students)])
+    frame.to_csv(path, index=False)
+    return "".join("ABCD"[i] for i in key)
+
+
+def bench_grade(args, workdir, report):
+    """Reading and scoring batches of answer sheets against one compiled key"""
+    from answer_grading import AnswerKey, Grades, read_answer_sheets
+
+    results = []
+    for students in args.grade_students:
+        path = os.path.join(workdir, f"sheets-{students}.csv")
+        key = AnswerKey.from_letters(make_answer_sheets(path, students, args.grade_questions))
+        case = f"{students}x{args.grade_questions}"
+
+        def read():
+            return read_answer_sheets(path, path, len(key))
+
+        latencies, (student_ids, choices) = timed(read, args.repeat)
+        results.append(report(summarize('grade', f"read/{case}", latencies, students, 'students', peak_memory(read))))
+
+        def score():
+            grades = Grades(key, choices, student_ids, penalty=0.25)
+            grades.student_frame()
+            return grades.item_frame()
+
+        latencies, _ = timed(score, args.repeat)
+        results.append(report(summarize('grade', f"score/{case}", latencies, students, 'students',
+                                        peak_memory(score))))
+    return results
+
+
+def bench_dedupe(args, workdir, report):
+    """Bulk insert and background signing, and near-duplicate checks of an import against banks of several sizes"""
+    from near_duplicates import find_near_duplicates
+    from question_bank import QuestionBank
+
+    results = []
+    for size in args.dedupe_banks:
+        bank = QuestionBank(os.path.join(workdir, f"dedupe-{size}.db"))
+        questions = make_questions(size)
+        start = time.perf_counter()
+        bank.add_questions(questions, source="bench.pdf")
+        insert_ms = (time.perf_counter() - start) * 1000
+        # Bulk inserts are signed by the bank's background backfill
+        while bank.unsigned_count():
+            time.sleep(0.05)
+        sign_ms = (time.perf_counter() - start) * 1000 - insert_ms
+        # Half reworded repeats of bank questions, half new
+        rng = random.Random(size)
+        batch = [dict(question, question=question['question'].replace("Which value fits", "Which value best fits"))
+                 for question in rng.sample(questions, args.dedupe_batch // 2)]
+        batch += make_questions(args.dedupe_batch - len(batch), seed=size + 1)
+        find_near_duplicates(bank, batch[:1])
+
+        def check():
+            return find_near_duplicates(bank, batch, source="import.pdf")
+
+        latencies, flagged = timed(check, args.repeat)
+        results.append(report(summarize('dedupe', f"check {args.dedupe_batch}q/{size}bank", latencies,
+                                        args.dedupe_batch, 'questions', peak_memory(check),
+                                        insert_ms=insert_ms, sign_ms=sign_ms, flagged=len(flagged))))
+    return results
+
+
+def app_test(bank_questions):
+    from question_bank import QuestionBank
+    from streamlit.testing.v1 import AppTest
+
+    bank = QuestionBank()
+    if bank.count() < bank_questions:
+        bank.add_questions(make_questions(bank_questions), source="bench.pdf")
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    at.run()
+    return at
+
+
+def load_history(at, history_size, bank_questions):
+    """Record a synthetic history in the history store as a new user and switch the app to that user"""
+    from practice_history import PracticeHistoryStore
+    from question_bank import QuestionBank
+
+    bank, store = QuestionBank(), PracticeHistoryStore()
+    user_id = f"bench-{history_size}-{time.time_ns()}"
+    for result in make_history(history_size, list(range(1, bank_questions + 1))):
+        store.record_session(user_id, result, bank.get_questions(result['question_ids']))
+    at.session_state['user_id'] = user_id
+    # Aggregates are rebuilt from the stored history on the first visit, outside the timed reruns
+    at.session_state['practice_analytics'] = None
+
+
+def set_mode(at, mode):
+    at.sidebar.selectbox[0].set_value(mode).run()
+
+
+def bench_end_practice(args, report):
+    """Full rerun triggered by End Practice, with answers filled in for every question"""
+    at = app_test(args.bank_questions)
+    rng = random.Random(0)
+    results = []
+    for history_size in args.history:
+        load_history(at, history_size, args.bank_questions)
+        set_mode(at, "🔍 Practice Mode")
+        at.slider[0].set_value(args.practice_size).run()
+
+        def end_practice():
+            next(b for b in at.button if "Start Practice" in b.label).click().run()
+            practice = at.session_state['current_practice']
+            practice['answers'] = {i: rng.randrange(4) for i in range(practice['total_questions'])}
+            practice['question_ms'] = {i: rng.randint(3000, 90000) for i in practice['answers']}
+            end = next(b for b in at.button if "End Practice" in b.label)
+            start = time.perf_counter()
+            end.click().run()
+            elapsed = time.perf_counter() - start
+            if at.exception:
+                raise RuntimeError(f"app error: {at.exception[0].value}")
+            return elapsed
+
+        end_practice()  # the first end also builds the aggregates from the stored history
+        latencies = [end_practice() for _ in range(args.repeat)]
+        peak = peak_memory(end_practice)
+        results.append(report(summarize('end_practice', f"{args.practice_size}q/{history_size}h", latencies,
+                                        1, 'sessions', peak)))
+    return results
+
+
+def bench_analysis(args, report):
+    """Reruns of the Performance Analysis page over histories of several sizes"""
+    at = app_test(args.bank_questions)
+    results = []
+    for history_size in args.history:
+        load_history(at, history_size, args.bank_questions)
+        set_mode(at, "📊 Performance Analysis")
+
+        def rerun():
+            at.run()
+            if at.exception:
+                raise RuntimeError(f"app error: {at.exception[0].value}")
+
+        latencies, _ = timed(rerun, args.repeat)
+        results.append(report(summarize('analysis', f"{history_size}h", latencies, history_size, 'sessions',
+                                        peak_memory(rerun))))
+    return results
+
+
+# Results
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def print_record(record):
+    throughput = f"{record['throughput']:12,.1f} {record['unit']}/s" if record['throughput'] else ""
+    print(f"{record['stage']:>12} {record['case']:<22} p50 {record['p50_ms']:9.2f} ms  p95 {record['p95_ms']:9.2f} ms  "
+          f"p99 {record['p99_ms']:9.2f} ms  peak {record['peak_kib']:10,.0f} KiB  {throughput}", flush=True)
+    return record
+
+
+def compare(before_path, after_path):
+    """Print p50, throughput and peak memory changes for stages present in both runs"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"before: {before['meta'].get('commit')}  after: {after['meta'].get('commit')}")
+    baseline = {(r['stage'], r['case']): r for r in before['results']}
+    for record in after['results']:
+        old = baseline.get((record['stage'], record['case']))
+        if old is None:
+            continue
+        print(f"{record['stage']:>12} {record['case']:<22} p50 {old['p50_ms']:9.2f} -> {record['p50_ms']:9.2f} ms "
+              f"({old['p50_ms'] / record['p50_ms']:5.2f}x)  peak {old['peak_kib']:9,.0f} -> "
+              f"{record['peak_kib']:9,.0f} KiB")
+
+
+def int_list(value):
+    return [int(part) for part in value.split(",") if part]
+
+
+def name_list(choices):
+    def parse(value):
+        names = [part for part in value.split(",") if part]
+        unknown = set(names) - set(choices)
+        if unknown:
+            raise argparse.ArgumentTypeError(f"unknown: {', '.join(sorted(unknown))} (choose from {', '.join(choices)})")
+        return names
+    return parse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stages", type=name_list(STAGES), default=STAGES)
+    parser.add_argument("--layouts", type=name_list(LAYOUTS), default=LAYOUTS)
+    parser.add_argument("--sizes", type=int_list, default=[200, 2000], help="Questions per PDF")
+    parser.add_argument("--history", type=int_list, default=[100, 1000], help="Practice sessions in the history")
+    parser.add_argument("--practice-size", type=int, default=50, help="Questions per ended practice session")
+    parser.add_argument("--bank-questions", type=int, default=2000)
+    parser.add_argument("--select-banks", type=int_list, default=[10000, 100000],
+                        help="Bank sizes for question selection")
+    parser.add_argument("--grade-students", type=int_list, default=[1000, 10000], help="Answer sheets per batch")
+    parser.add_argument("--grade-questions", type=int, default=200, help="Questions per answer sheet")
+    parser.add_argument("--dedupe-banks", type=int_list, default=[10000, 100000],
+                        help="Bank sizes for near-duplicate checks")
+    parser.add_argument("--dedupe-batch", type=int, default=200, help="Imported questions per near-duplicate check")
+    parser.add_argument("--export-rows", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=1, help="Extraction worker processes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="JSON results file (default: bench-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two results files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    meta = {
+        'commit': git_revision(),
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': {key: value for key, value in vars(args).items() if key not in ('compare', 'output')},
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        # The app's bank, cache and job queue all live in the scratch directory
+        os.environ.update(MOCKTEST_BANK_PATH=os.path.join(workdir, "bank.db"),
+                          MOCKTEST_CACHE_DIR=os.path.join(workdir, "cache"),
+                          MOCKTEST_JOBS_DIR=os.path.join(workdir, "jobs"),
+                          MOCKTEST_HISTORY_PATH=os.path.join(workdir, "history.db"))
+        stages = set(args.stages)
+        if stages & {'extract', 'parse', 'convert'}:
+            results += bench_pdf_stages(args, workdir, stages, print_record)
+        if 'export' in stages:
+            results += bench_export(args, print_record)
+        if 'select' in stages:
+            results += bench_select(args, workdir, print_record)
+        if 'grade' in stages:
+            results += bench_grade(args, workdir, print_record)
+        if 'dedupe' in stages:
+            results += bench_dedupe(args, workdir, print_record)
+        if 'end_practice' in stages:
+            results += bench_end_practice(args, print_record)
+        if 'analysis' in stages:
+            results += bench_analysis(args, print_record)
+
+    output = args.output or f"bench-{meta['commit'] or 'unknown'}.json"
+    with open(output, "w") as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Exam session state: a server-side deadline clock and compact per-question arrays"""
+import time
+from array import array
+
+UNANSWERED = -1
+
+NOT_VISITED = 'not_visited'
+NOT_ANSWERED = 'not_answered'
+ANSWERED = 'answered'
+MARKED = 'marked'
+ANSWERED_MARKED = 'answered_marked'
+
+
+def parse_duration(label):
+    """'90 minutes' -> 5400 seconds"""
+    return int(label.split()[0]) * 60
+
+
+class ExamSession:
+    """One candidate's attempt at an exam.
+
+    The deadline is fixed on the server from a monotonic clock when the
+    exam starts, so nothing the browser sends can extend it. Every
+    per-question value lives in a flat array indexed by question position,
+    and the counters shown in the palette are kept up to date as answers
+    change, so each action is O(1) however long the paper is.
+    """
+
+    def __init__(self, question_ids, duration_seconds, subject='', clock=time.monotonic):
+        count = len(question_ids)
+        self.question_ids = tuple(question_ids)
+        self.subject = subject
+        self.duration_seconds = duration_seconds
+        self.clock = clock
+        self.started_at = clock()
+        self.deadline = self.started_at + duration_seconds
+        self.answers = array('b', [UNANSWERED]) * count
+        self.marked = bytearray(count)
+        self.visited = bytearray(count)
+        self.time_spent = array('d', [0.0]) * count
+        self.answered_count = 0
+        self.marked_count = 0
+        # Questions both answered and marked, so each palette status can be counted once
+        self.answered_marked_count = 0
+        self.visited_count = 0
+        self.current = 0
+        self.entered_at = self.started_at
+        self.submitted = False
+        self.auto_submitted = False
+        self.finished_at = None
+        if count:
+            self.visited[0] = 1
+            self.visited_count = 1
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    # Clock
+
+    def remaining(self):
+        if self.submitted:
+            return max(0.0, self.deadline - self.finished_at)
+        return max(0.0, self.deadline - self.clock())
+
+    def elapsed(self):
+        end = self.finished_at if self.submitted else min(self.clock(), self.deadline)
+        return end - self.started_at
+
+    def check_deadline(self):
+        """Auto-submit once time is up; returns True when the exam is over"""
+        if not self.submitted and self.clock() >= self.deadline:
+            self.submit(auto=True)
+        return self.submitted
+
+    def _accept_action(self):
+        return not self.check_deadline()
+
+    def _record_time(self):
+        now = min(self.clock(), self.deadline)
+        if len(self):
+            self.time_spent[self.current] += max(0.0, now - self.entered_at)
+        self.entered_at = now
+
+    # Actions
+
+    def go_to(self, index):
+        if not self._accept_action() or not 0 <= index < len(self):
+            return False
+        self._record_time()
+        self.current = index
+        self._visit(index)
+        return True
+
+    def _visit(self, index):
+        if not self.visited[index]:
+            self.visited[index] = 1
+            self.visited_count += 1
+
+    def answer(self, index, option_index):
+        if not self._accept_action():
+            return False
+        self._visit(index)
+        if self.answers[index] == UNANSWERED:
+            self.answered_count += 1
+            self.answered_marked_count += self.marked[index]
+        self.answers[index] = option_index
+        return True
+
+    def clear_answer(self, index):
+        if not self._accept_action():
+            return False
+        if self.answers[index] != UNANSWERED:
+            self.answered_count -= 1
+            self.answered_marked_count -= self.marked[index]
+            self.answers[index] = UNANSWERED
+        return True
+
+    def toggle_marked(self, index):
+        if not self._accept_action():
+            return False
+        self._visit(index)
+        change = -1 if self.marked[index] else 1
+        self.marked_count += change
+        if self.answers[index] != UNANSWERED:
+            self.answered_marked_count += change
+        self.marked[index] ^= 1
+        return True
+
+    def submit(self, auto=False):
+        if self.submitted:
+            return
+        self._record_time()
+        self.finished_at = min(self.clock(), self.deadline)
+        self.submitted = True
+        self.auto_submitted = auto
+
+    # Queries
+
+    def chosen(self, index):
+        value = self.answers[index]
+        return None if value == UNANSWERED else value
+
+    def status(self, index):
+        answered = self.answers[index] != UNANSWERED
+        if self.marked[index]:
+            return ANSWERED_MARKED if answered else MARKED
+        if answered:
+            return ANSWERED
+        return NOT_ANSWERED if self.visited[index] else NOT_VISITED
+
+    def summary(self):
+        """Questions per palette status; every question is counted under exactly one"""
+        marked_only = self.marked_count - self.answered_marked_count
+        return {
+            ANSWERED: self.answered_count - self.answered_marked_count,
+            MARKED: marked_only,
+            ANSWERED_MARKED: self.answered_marked_count,
+            NOT_ANSWERED: self.visited_count - self.answered_count - marked_only,
+            NOT_VISITED: len(self) - self.visited_count,
+        }
+
+    def score(self, correct_indexes):
+        """Number of answers matching ``correct_indexes`` (one per question)"""
+        return sum(1 for chosen, correct in zip(self.answers, correct_indexes)
+                   if chosen != UNANSWERED and chosen == correct)
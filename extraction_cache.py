@@ -0,0 +1,91 @@
+"""Content-addressed disk cache for PDF extraction and parse results"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_CACHE_DIR = os.environ.get("MOCKTEST_CACHE_DIR", os.path.join(os.getcwd(), ".mocktest_cache"))
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ExtractionCache:
+    """Stores ``{'text', 'questions', 'pages'}`` per PDF as JSON files.
+
+    Entries are keyed by the SHA-256 of the PDF bytes plus the parser
+    version. File mtimes double as the LRU clock: a hit touches the
+    entry, and writes evict the least recently used files until the
+    directory fits in ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(pdf_bytes, parser_version):
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        return f"{digest}-v{parser_version}"
+
+    @staticmethod
+    def content_digest(key):
+        """The PDF's SHA-256 hex digest from a make_key key"""
+        return key.split("-v", 1)[0]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key, text, questions, pages=None):
+        entry = {"text": text, "questions": questions, "pages": pages or []}
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until under the size cap"""
+        with self._lock:
+            entries = []
+            total = 0
+            for item in os.scandir(self.cache_dir):
+                if not item.name.endswith(".json"):
+                    continue
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+                total += stat.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            for item in os.scandir(self.cache_dir):
+                if item.name.endswith(".json"):
+                    os.remove(item.path)
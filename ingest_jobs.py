@@ -0,0 +1,255 @@
+"""Background PDF ingestion: a persistent job queue run on a bounded thread pool.
+
+Uploaded PDFs are spooled to disk and recorded in a small SQLite table,
+so jobs outlive the browser tab that queued them and are picked up again
+after a server restart. Each job extracts and parses one PDF outside any
+Streamlit script run; its questions are kept with the job until they are
+collected into the question bank.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from pdf_engine import DEFAULT_WORKERS
+from question_bank import pdf_source
+from quiz_converter import PDFQuizConverter
+
+DEFAULT_JOBS_DIR = os.environ.get("MOCKTEST_JOBS_DIR", os.path.join(os.getcwd(), ".mocktest_data", "ingest"))
+DEFAULT_QUEUE_WORKERS = 2
+# Progress is written to the job table at most this often per job
+PROGRESS_INTERVAL = 0.5
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingest_jobs (
+    id INTEGER PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    pdf_path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    auto_collect INTEGER NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    pages_done INTEGER NOT NULL DEFAULT 0,
+    pages_total INTEGER,
+    question_count INTEGER,
+    questions TEXT,
+    collected INTEGER,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs(status);
+"""
+
+# Everything but the (possibly large) questions payload
+JOB_COLUMNS = ("id, file_name, status, auto_collect, pages_done, pages_total, question_count,"
+               " collected, error, created_at, started_at, finished_at")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class IngestQueue:
+    """Accepts PDFs, runs them ``workers`` at a time and tracks them in SQLite.
+
+    Jobs convert through PDFQuizConverter with the shared extraction cache,
+    so a PDF converted here or by the single-file converter is reused by
+    the other. ``on_replace(source)`` is called when collecting questions
+    replaces an earlier import of the same PDF.
+    """
+
+    def __init__(self, bank, cache, jobs_dir=DEFAULT_JOBS_DIR, workers=DEFAULT_QUEUE_WORKERS,
+                 extractor_workers=None, on_replace=None):
+        self.bank = bank
+        self.cache = cache
+        self.jobs_dir = jobs_dir
+        self.extractor_workers = extractor_workers or max(1, DEFAULT_WORKERS // workers)
+        self.on_replace = on_replace
+        self._local = threading.local()
+        self._collect_lock = threading.Lock()
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._resume()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.jobs_dir, "jobs.db"), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        conn = self._conn()
+        with conn:
+            conn.execute(f"UPDATE ingest_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _resume(self):
+        # Jobs that were running when the server stopped start again from the top
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE ingest_jobs SET status = ?, pages_done = 0 WHERE status = ?", (QUEUED, RUNNING))
+        for row in conn.execute("SELECT id FROM ingest_jobs WHERE status = ? ORDER BY id", (QUEUED,)).fetchall():
+            self._executor.submit(self._run, row['id'])
+
+    # Queueing and control
+
+    def submit(self, file_name, pdf_bytes, auto_collect=False):
+        """Spool a PDF and queue it; returns the job id"""
+        digest = hashlib.sha256(pdf_bytes).hexdigest()
+        pdf_path = os.path.join(self.jobs_dir, digest + ".pdf")
+        # Record the job before looking for its spool file, so a job releasing
+        # the same file either sees this one and keeps it, or removes it first
+        conn = self._conn()
+        with conn:
+            job_id = conn.execute(
+                "INSERT INTO ingest_jobs (file_name, pdf_path, status, auto_collect, created_at)"
+                " VALUES (?, ?, ?, ?, ?)", (file_name, pdf_path, QUEUED, 1 if auto_collect else 0, _now())).lastrowid
+        try:
+            if not os.path.exists(pdf_path):
+                fd, tmp_path = tempfile.mkstemp(dir=self.jobs_dir, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(pdf_bytes)
+                os.replace(tmp_path, pdf_path)
+        except OSError as e:
+            self._update(job_id, status=FAILED, finished_at=_now(), error=str(e))
+            raise
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def cancel(self, job_id):
+        """Cancel a queued job at once, or a running one at its next progress update.
+
+        The request goes through the job table, so it reaches the worker
+        whichever server process or session asked for it.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE ingest_jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                         (CANCELLED, _now(), job_id, QUEUED))
+            conn.execute("UPDATE ingest_jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+
+    def _check_cancelled(self, job_id):
+        row = self._conn().execute("SELECT cancel_requested FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row['cancel_requested']:
+            raise JobCancelled()
+
+    # Worker
+
+    def _run(self, job_id):
+        conn = self._conn()
+        with conn:
+            # Claim the job; it may have been cancelled while it waited
+            claimed = conn.execute("UPDATE ingest_jobs SET status = ?, started_at = ?, error = NULL, cancel_requested = 0"
+                                   " WHERE id = ? AND status = ?", (RUNNING, _now(), job_id, QUEUED)).rowcount
+        if not claimed:
+            return
+        job = conn.execute("SELECT * FROM ingest_jobs WHERE id = ?", (job_id,)).fetchone()
+        try:
+            questions, pages_total = self._convert(job_id, job['pdf_path'])
+            self._update(job_id, status=DONE, finished_at=_now(), pages_done=pages_total, pages_total=pages_total,
+                         question_count=len(questions), questions=json.dumps(questions, ensure_ascii=False))
+        except JobCancelled:
+            self._update(job_id, status=CANCELLED, finished_at=_now())
+        except Exception as e:
+            self._update(job_id, status=FAILED, finished_at=_now(), error=str(e) or type(e).__name__)
+        else:
+            if job['auto_collect']:
+                self.collect([job_id])
+        finally:
+            self._release_spool(job['pdf_path'])
+
+    def _convert(self, job_id, pdf_path):
+        last_write = [0.0]
+
+        def progress(done, total):
+            if time.monotonic() - last_write[0] > PROGRESS_INTERVAL or done == total:
+                self._check_cancelled(job_id)
+                self._update(job_id, pages_done=done, pages_total=total)
+                last_write[0] = time.monotonic()
+
+        result = PDFQuizConverter(workers=self.extractor_workers).convert(pdf_path, progress, self.cache)
+        return result.questions, len(result.pages)
+
+    def _release_spool(self, pdf_path):
+        # The same file may be queued twice; keep it until no job still needs it.
+        # The write lock is held until the file is gone, so a submit from any
+        # process can't record its job in between and then find the file missing.
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            still_needed = conn.execute(
+                f"SELECT 1 FROM ingest_jobs WHERE pdf_path = ? AND status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                (pdf_path, *ACTIVE_STATUSES)).fetchone()
+            if not still_needed:
+                try:
+                    os.remove(pdf_path)
+                except OSError:
+                    pass
+
+    # Results
+
+    def collect(self, job_ids=None):
+        """Add finished, uncollected jobs' questions to the bank; returns questions added.
+
+        Re-collecting the same PDF replaces its earlier questions, the same as
+        saving from the single-file converter; another PDF with the same file
+        name is a different source.
+        """
+        added = 0
+        with self._collect_lock:
+            conn = self._conn()
+            query = ("SELECT id, file_name, pdf_path, questions FROM ingest_jobs"
+                     " WHERE status = ? AND collected IS NULL")
+            params = [DONE]
+            if job_ids is not None:
+                query += f" AND id IN ({','.join('?' * len(job_ids)) or 'NULL'})"
+                params.extend(job_ids)
+            for row in conn.execute(query + " ORDER BY id", params).fetchall():
+                questions = json.loads(row['questions'] or "[]")
+                # Spooled PDFs are named by their SHA-256, which keys the source with the file name
+                digest = os.path.splitext(os.path.basename(row['pdf_path']))[0]
+                source = pdf_source(row['file_name'], digest)
+                if self.bank.delete_source(source) and self.on_replace:
+                    self.on_replace(source)
+                self.bank.add_questions(questions, source=source)
+                # The bank holds the questions now; drop the job's copy
+                self._update(row['id'], collected=len(questions), questions=None)
+                added += len(questions)
+        return added
+
+    def jobs(self, limit=200):
+        """Most recent jobs first, without their question payloads"""
+        rows = self._conn().execute(f"SELECT {JOB_COLUMNS} FROM ingest_jobs ORDER BY id DESC LIMIT ?", (limit,))
+        return [dict(row) for row in rows]
+
+    def status_counts(self):
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM ingest_jobs GROUP BY status")
+        return {row['status']: row['n'] for row in rows}
+
+    def clear_finished(self):
+        """Forget collected, failed and cancelled jobs"""
+        conn = self._conn()
+        with conn:
+            return conn.execute("DELETE FROM ingest_jobs WHERE status IN (?, ?) OR collected IS NOT NULL",
+                                (FAILED, CANCELLED)).rowcount
@@ -0,0 +1,137 @@
+"""Near-duplicate question detection with MinHash signatures and LSH banding.
+
+``dedupe_key`` catches exact repeats; this catches the same question with
+small wording changes, as papers from different years tend to have.
+Each question's text and options, reduced to case-folded words, are cut into
+overlapping SHINGLE_BYTES-byte shingles, and NUM_PERM hash functions give
+a MinHash signature: the share of positions where two signatures agree
+estimates the Jaccard similarity of the two shingle sets.
+
+For sub-linear lookups the signature is split into BANDS bands of ROWS
+values and each band is hashed to a bucket. Only questions sharing a
+bucket are compared. With 16 bands of 4 rows, a pair at similarity 0.8
+meets in some bucket with probability above 0.99, while a pair at 0.3
+meets about one time in eight and is then rejected by the comparison.
+"""
+import re
+
+import numpy as np
+
+from question_bank import source_label
+
+SHINGLE_BYTES = 5
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+DEFAULT_THRESHOLD = 0.8
+WORD_PATTERN = re.compile(r"[^\W_]+")
+# Questions hashed together; bounds the NUM_PERM x shingles working array
+SIGNATURE_BATCH = 64
+# Members read from any one LSH bucket when looking up matches
+MAX_BUCKET_MEMBERS = 256
+
+_rng = np.random.default_rng(0x5EED)
+# Each shingle is first mixed to 32 bits; hash function i is then x -> a[i] * x + b[i] mod 2**32
+# with odd a[i], a permutation of the 32-bit values
+_SHINGLE_MIX = np.uint64(0x9E3779B97F4A7C15)
+_HASH_A = (_rng.integers(0, 2 ** 31, NUM_PERM, dtype=np.uint32) * np.uint32(2) + np.uint32(1))[:, None]
+_HASH_B = _rng.integers(0, 2 ** 32, NUM_PERM, dtype=np.uint32)[:, None]
+_BAND_MIX = _rng.integers(0, 2 ** 63, (BANDS, ROWS), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+
+def signature_text(question, options):
+    """The text a signature is taken over: case-folded words, so spacing and punctuation don't count"""
+    return " ".join(WORD_PATTERN.findall(" ".join((question, *options)).casefold()))
+
+
+def _shingle_hashes(texts):
+    """32-bit hashes of every byte shingle of every text, and where each text's hashes start.
+
+    The texts are joined into one buffer and shingled in one pass; windows
+    that run into the next text are dropped. Repeated shingles are kept,
+    since they don't change a minimum.
+    """
+    encoded = [text.encode('utf-8').ljust(SHINGLE_BYTES) for text in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    ids = data[:len(data) - SHINGLE_BYTES + 1].copy()
+    for shift in range(1, SHINGLE_BYTES):
+        ids |= data[shift:len(data) - SHINGLE_BYTES + 1 + shift] << np.uint64(8 * shift)
+    ends = np.cumsum(lengths)
+    counts = lengths - SHINGLE_BYTES + 1
+    starts = ends - lengths
+    # Window starts inside each text: its start up to SHINGLE_BYTES - 1 before its end
+    keep = np.repeat(starts - np.cumsum(np.r_[0, counts[:-1]]), counts) + np.arange(counts.sum())
+    hashes = ((ids[keep] * _SHINGLE_MIX) >> np.uint64(32)).astype(np.uint32)
+    return hashes, np.cumsum(np.r_[0, counts[:-1]])
+
+
+def signatures(texts):
+    """MinHash signatures, one uint32 row of NUM_PERM values per text"""
+    texts = list(texts)
+    result = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    for start in range(0, len(texts), SIGNATURE_BATCH):
+        batch = texts[start:start + SIGNATURE_BATCH]
+        hashes, offsets = _shingle_hashes(batch)
+        permuted = np.multiply(_HASH_A, hashes[None, :])
+        permuted += _HASH_B
+        result[start:start + len(batch)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return result
+
+
+def band_buckets(signature_rows):
+    """Bucket key for every band of every signature, as signed 64-bit ints (SQLite INTEGER)"""
+    bands = signature_rows.reshape(len(signature_rows), BANDS, ROWS).astype(np.uint64)
+    mixed = (bands * _BAND_MIX).sum(axis=2) + np.arange(BANDS, dtype=np.uint64)
+    mixed ^= mixed >> np.uint64(29)
+    return mixed.view(np.int64)
+
+
+def similarity(signature, others):
+    """Estimated Jaccard similarity of one signature with each row of ``others``"""
+    return (others == signature).mean(axis=1)
+
+
+def to_blob(signature):
+    return signature.astype(np.uint32).tobytes()
+
+
+def from_blobs(blobs):
+    return np.frombuffer(b"".join(blobs), dtype=np.uint32).reshape(-1, NUM_PERM)
+
+
+def find_near_duplicates(bank, questions, threshold=DEFAULT_THRESHOLD, source=None):
+    """Review list of likely duplicates among newly imported questions.
+
+    Each question dict is compared with the bank (ignoring questions from
+    ``source`` itself, which a save replaces) and with the questions before
+    it in the same batch. Returns one dict per flagged question, in order.
+    """
+    if not questions:
+        return []
+    signature_rows = signatures(signature_text(q['question'], q.get('options') or ()) for q in questions)
+    in_bank = bank.similar_questions(signature_rows, threshold, exclude_source=source)
+
+    buckets = band_buckets(signature_rows)
+    seen = {}
+    flagged = []
+    for position, question in enumerate(questions):
+        earlier = {seen[bucket] for bucket in buckets[position].tolist() if bucket in seen}
+        for bucket in buckets[position].tolist():
+            seen.setdefault(bucket, position)
+        best = None
+        if earlier:
+            earlier = sorted(earlier)
+            scores = similarity(signature_rows[position], signature_rows[earlier])
+            top = int(scores.argmax())
+            if scores[top] >= threshold:
+                best = {'match': f"Q{earlier[top] + 1} in this file", 'similarity': float(scores[top]),
+                        'match_question': questions[earlier[top]]['question']}
+        if in_bank[position]:
+            match_id, score, match_question, match_source = in_bank[position][0]
+            if best is None or score > best['similarity']:
+                best = {'match': f"#{match_id} ({source_label(match_source) or 'manual'})", 'similarity': score,
+                        'match_question': match_question}
+        if best:
+            flagged.append({'position': position, 'question': question['question'], **best})
+    return flagged
@@ -0,0 +1,221 @@
+"""Page-streaming PDF text extraction used by the PDF to Quiz Converter"""
+import io
+import multiprocessing
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Pages handed to a worker per task; small enough to stream, large enough
+# that each worker amortises opening the document.
+PAGES_PER_CHUNK = 16
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# Pages scoring below this are re-extracted with the fallback backend
+MIN_PAGE_QUALITY = 0.6
+
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b-\x1f]')
+
+PageResult = namedtuple('PageResult', ['number', 'text', 'backend', 'seconds'])
+
+
+# Backend libraries are imported when a backend is first opened, so importing
+# this module (and every app page that does) stays cheap.
+
+class PyPDF2Backend:
+    """Fast text-stream extraction with no layout analysis"""
+    name = 'pypdf2'
+
+    def __init__(self, pdf_bytes):
+        import PyPDF2
+        self.reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+
+    def __len__(self):
+        return len(self.reader.pages)
+
+    def page_text(self, number):
+        return self.reader.pages[number].extract_text() or ""
+
+    def close(self):
+        self.reader = None
+
+
+class PdfplumberBackend:
+    """Slower, layout-aware extraction; copes with odd encodings and columns"""
+    name = 'pdfplumber'
+
+    def __init__(self, pdf_bytes):
+        import pdfplumber
+        self.pdf = pdfplumber.open(io.BytesIO(pdf_bytes))
+
+    def __len__(self):
+        return len(self.pdf.pages)
+
+    def page_text(self, number):
+        page = self.pdf.pages[number]
+        text = page.extract_text() or ""
+        page.flush_cache()
+        return text
+
+    def close(self):
+        self.pdf.close()
+
+
+BACKENDS = {backend.name: backend for backend in (PyPDF2Backend, PdfplumberBackend)}
+
+
+def page_quality(text):
+    """Cheap 0..1 score of how usable extracted page text looks"""
+    stripped = text.strip()
+    if not stripped:
+        return 0.0
+    length = len(stripped)
+    # Unmapped glyphs show up as (cid:NN) or U+FFFD; control characters as junk
+    junk = stripped.count('\ufffd') + 6 * stripped.count('(cid:') + len(_CONTROL_CHARS.findall(stripped))
+    score = 1.0 - min(1.0, junk / length)
+    # Long pages with almost no spaces usually mean words were glued together
+    if length > 200 and stripped.count(' ') < length * 0.05:
+        score *= 0.5
+    return score
+
+
+def read_pdf_bytes(pdf_file):
+    """Return raw bytes for a path, bytes object or file-like upload"""
+    if isinstance(pdf_file, (bytes, bytearray, memoryview)):
+        return bytes(pdf_file)
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+class _PageReader:
+    """Reads pages with the primary backend, falling back page by page"""
+
+    def __init__(self, pdf_bytes, backend, fallback):
+        self.pdf_bytes = pdf_bytes
+        self.primary = BACKENDS[backend](pdf_bytes)
+        self.fallback_name = fallback
+        self.fallback = None
+
+    def __len__(self):
+        return len(self.primary)
+
+    def read(self, number):
+        start = time.perf_counter()
+        text = self.primary.page_text(number)
+        backend = self.primary.name
+        if self.fallback_name and page_quality(text) < MIN_PAGE_QUALITY:
+            if self.fallback is None:
+                self.fallback = BACKENDS[self.fallback_name](self.pdf_bytes)
+            fallback_text = self.fallback.page_text(number)
+            if page_quality(fallback_text) > page_quality(text):
+                text, backend = fallback_text, self.fallback.name
+        return PageResult(number, text, backend, time.perf_counter() - start)
+
+    def close(self):
+        self.primary.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+_worker_state = None
+
+
+def _init_worker(pdf_bytes, backend, fallback):
+    # Ship the document once per worker instead of once per task
+    global _worker_state
+    _worker_state = (pdf_bytes, backend, fallback)
+
+
+def _extract_range(start, stop):
+    """Extract pages [start, stop) inside a worker process"""
+    reader = _PageReader(*_worker_state)
+    try:
+        return [reader.read(number) for number in range(start, stop)]
+    finally:
+        reader.close()
+
+
+class PDFTextExtractor:
+    def __init__(self, workers=None, chunk_size=PAGES_PER_CHUNK, backend='pypdf2', fallback='pdfplumber'):
+        self.workers = max(1, workers or DEFAULT_WORKERS)
+        self.chunk_size = max(1, chunk_size)
+        self.backend = backend
+        self.fallback = fallback
+        self.page_log = []
+
+    def describe(self):
+        """Short label of the backend setup, e.g. 'pypdf2+pdfplumber'"""
+        return f"{self.backend}+{self.fallback}" if self.fallback else self.backend
+
+    def iter_page_results(self, pdf_file, progress=None):
+        """Yield a PageResult per page in page order, recording each in page_log.
+
+        ``progress`` is called as ``progress(done_pages, total_pages)``.
+        """
+        self.page_log = []
+        pdf_bytes = read_pdf_bytes(pdf_file)
+        reader = _PageReader(pdf_bytes, self.backend, self.fallback)
+        total = len(reader)
+        if self.workers == 1 or total <= self.chunk_size:
+            results = self._iter_serial(reader, total, progress)
+        else:
+            reader.close()
+            results = self._iter_parallel(pdf_bytes, total, progress)
+        for result in results:
+            self.page_log.append(result)
+            yield result
+
+    def iter_pages(self, pdf_file, progress=None):
+        """Yield (page_number, text) tuples in page order"""
+        for result in self.iter_page_results(pdf_file, progress):
+            yield result.number, result.text
+
+    def _iter_serial(self, reader, total, progress):
+        try:
+            for number in range(total):
+                result = reader.read(number)
+                if progress:
+                    progress(number + 1, total)
+                yield result
+        finally:
+            reader.close()
+
+    def _iter_parallel(self, pdf_bytes, total, progress):
+        # A small first chunk gets the opening pages back quickly for streaming
+        first = max(1, self.chunk_size // 8)
+        ranges = [(0, first)] + [(start, min(start + self.chunk_size, total))
+                                 for start in range(first, total, self.chunk_size)]
+        pool = ProcessPoolExecutor(
+            max_workers=min(self.workers, len(ranges)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(pdf_bytes, self.backend, self.fallback),
+        )
+        try:
+            futures = [pool.submit(_extract_range, start, stop) for start, stop in ranges]
+            done = 0
+            # Consume in submission order so pages come out in document order
+            for future in futures:
+                results = future.result()
+                yield from results
+                done += len(results)
+                if progress:
+                    progress(done, total)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def extract_text(self, pdf_file, progress=None):
+        """Concatenate non-empty pages, one trailing newline each"""
+        return "".join(text + "\n" for _, text in self.iter_pages(pdf_file, progress) if text)
+
+    def page_report(self):
+        """Backend and timing per page of the last extraction"""
+        return [{'page': result.number + 1, 'backend': result.backend,
+                 'ms': round(result.seconds * 1000, 1), 'chars': len(result.text)}
+                for result in self.page_log]
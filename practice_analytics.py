@@ -0,0 +1,150 @@
+"""Running practice statistics kept as small NumPy arrays.
+
+Each finished session is folded in once by ``record_session``; the
+Performance Analysis page only reads the arrays, so rendering it costs the
+same after five sessions or five thousand. Nothing here refers back to the
+practice history, which is only needed for the per-session reports.
+"""
+import numpy as np
+
+# Upper edges of the time-per-question histogram bins, in seconds; the last bin is open
+TIME_BIN_EDGES = np.array([5, 10, 20, 30, 45, 60, 90, 120, 180])
+TIME_BIN_LABELS = (["<5s"] + [f"{low}-{high}s" for low, high in zip(TIME_BIN_EDGES[:-1], TIME_BIN_EDGES[1:])]
+                   + [f"{TIME_BIN_EDGES[-1]}s+"])
+# Sessions kept for the trend chart
+TREND_WINDOW = 100
+ROLLING_SESSIONS = 5
+EWMA_ALPHA = 0.2
+
+
+class GroupTally:
+    """Questions, answered, correct and timed milliseconds per label (topic or difficulty)"""
+
+    FIELDS = ('questions', 'answered', 'correct', 'ms', 'timed')
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self._index = {}
+        self.counts = np.zeros((len(self.FIELDS), 0), dtype=np.int64)
+        for label in labels:
+            self.code(label)
+
+    def code(self, label):
+        code = self._index.get(label)
+        if code is None:
+            code = self._index[label] = len(self.labels)
+            self.labels.append(label)
+            self.counts = np.pad(self.counts, ((0, 0), (0, 1)))
+        return code
+
+    def add(self, codes, answered, correct, ms, timed):
+        size = len(self.labels)
+        for row, weights in enumerate((None, answered, correct, ms, timed)):
+            self.counts[row] += np.bincount(codes, weights=weights, minlength=size).astype(np.int64)
+
+    def field(self, name):
+        return self.counts[self.FIELDS.index(name)]
+
+    def accuracy(self):
+        """Correct / answered per label, NaN where nothing was answered"""
+        answered = self.field('answered')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(answered > 0, self.field('correct') / answered, np.nan)
+
+    def mean_seconds(self):
+        timed = self.field('timed')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(timed > 0, self.field('ms') / timed / 1000, np.nan)
+
+
+class PracticeAnalytics:
+    """Aggregates over every practice session this user has finished"""
+
+    def __init__(self, topics=(), difficulties=()):
+        self.sessions = 0
+        self.topics = GroupTally(topics)
+        self.difficulties = GroupTally(difficulties)
+        # Time-per-question histogram, and how many of each bin were answered correctly
+        self.time_counts = np.zeros(len(TIME_BIN_LABELS), dtype=np.int64)
+        self.time_correct = np.zeros(len(TIME_BIN_LABELS), dtype=np.int64)
+        # Ring buffer of the latest sessions: accuracy and mean seconds per question
+        self.trend_accuracy = np.full(TREND_WINDOW, np.nan, dtype=np.float32)
+        self.trend_seconds = np.full(TREND_WINDOW, np.nan, dtype=np.float32)
+        self.ewma_accuracy = np.nan
+
+    @classmethod
+    def from_history(cls, history, resolve, topics=(), difficulties=()):
+        """Aggregates for an existing history; ``resolve(ids)`` returns Question objects"""
+        analytics = cls(topics, difficulties)
+        for result in history:
+            analytics.record_session(result, resolve(result['question_ids']))
+        return analytics
+
+    def record_session(self, result, questions):
+        """Fold one finished session (as built by end_practice_session) into the totals"""
+        count = len(questions)
+        if not count:
+            return
+        answers = result['answers']
+        chosen = np.fromiter((answers.get(i, -1) for i in range(count)), dtype=np.int64, count=count)
+        key = np.fromiter((q.correct_index for q in questions), dtype=np.int64, count=count)
+        answered = chosen >= 0
+        correct = answered & (chosen == key) & (key >= 0)
+        question_ms = result['question_ms']
+        ms = np.fromiter((question_ms.get(i, -1) for i in range(count)), dtype=np.int64, count=count)
+        timed = ms >= 0
+        ms = np.where(timed, ms, 0)
+
+        for tally, attribute in ((self.topics, 'topic'), (self.difficulties, 'difficulty')):
+            codes = np.fromiter((tally.code(getattr(q, attribute)) for q in questions), dtype=np.int64, count=count)
+            tally.add(codes, answered, correct, ms, timed)
+
+        bins = np.searchsorted(TIME_BIN_EDGES * 1000, ms[timed], side='right')
+        self.time_counts += np.bincount(bins, minlength=len(TIME_BIN_LABELS))
+        self.time_correct += np.bincount(bins, weights=correct[timed], minlength=len(TIME_BIN_LABELS)).astype(np.int64)
+
+        accuracy = correct.sum() / answered.sum() if answered.any() else 0.0
+        slot = self.sessions % TREND_WINDOW
+        self.trend_accuracy[slot] = accuracy
+        self.trend_seconds[slot] = ms[timed].mean() / 1000 if timed.any() else np.nan
+        self.ewma_accuracy = accuracy if self.sessions == 0 else (
+            EWMA_ALPHA * accuracy + (1 - EWMA_ALPHA) * self.ewma_accuracy)
+        self.sessions += 1
+
+    # Read side: every method below is O(labels + bins + TREND_WINDOW)
+
+    def totals(self):
+        answered = int(self.topics.field('answered').sum())
+        correct = int(self.topics.field('correct').sum())
+        timed = int(self.topics.field('timed').sum())
+        return {
+            'sessions': self.sessions,
+            'questions': int(self.topics.field('questions').sum()),
+            'answered': answered,
+            'correct': correct,
+            'accuracy': correct / answered if answered else None,
+            'seconds_per_question': int(self.topics.field('ms').sum()) / timed / 1000 if timed else None,
+            'ewma_accuracy': None if np.isnan(self.ewma_accuracy) else float(self.ewma_accuracy),
+        }
+
+    def trend(self):
+        """(session numbers, accuracy, rolling mean accuracy, mean seconds) for the latest sessions, oldest first"""
+        kept = min(self.sessions, TREND_WINDOW)
+        order = (np.arange(kept) + self.sessions - kept) % TREND_WINDOW
+        accuracy = self.trend_accuracy[order]
+        window = min(ROLLING_SESSIONS, kept) or 1
+        # Rolling mean over the sessions available so far at the start of the window
+        cumulative = np.concatenate(([0.0], np.cumsum(accuracy, dtype=np.float64)))
+        starts = np.maximum(np.arange(1, kept + 1) - window, 0)
+        rolling = (cumulative[1:] - cumulative[starts]) / (np.arange(1, kept + 1) - starts)
+        numbers = np.arange(self.sessions - kept + 1, self.sessions + 1)
+        return numbers, accuracy, rolling, self.trend_seconds[order]
+
+    def time_accuracy(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.time_counts > 0, self.time_correct / self.time_counts, np.nan)
+
+    def nbytes(self):
+        arrays = (self.topics.counts, self.difficulties.counts, self.time_counts, self.time_correct,
+                  self.trend_accuracy, self.trend_seconds)
+        return sum(array.nbytes for array in arrays)
@@ -0,0 +1,152 @@
+"""Persistent, column-oriented practice history.
+
+Every finished practice session adds one summary row and one row per
+question attempt (session, question id, chosen option, correct flag,
+milliseconds spent), written together in a single transaction. Nothing
+is kept per Streamlit session: results, reports and analytics read the
+rows back, as compact NumPy columns when many are needed at once.
+"""
+import os
+import sqlite3
+import threading
+
+DEFAULT_HISTORY_PATH = os.environ.get(
+    "MOCKTEST_HISTORY_PATH", os.path.join(os.getcwd(), ".mocktest_data", "practice_history.db"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS practice_sessions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    total_time INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_practice_sessions_user ON practice_sessions(user_id, id);
+CREATE TABLE IF NOT EXISTS practice_attempts (
+    session_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    chosen INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    ms INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_practice_attempts_session ON practice_attempts(session_id);
+"""
+
+# One attempt per row: 23 bytes, against several hundred for the dicts it replaces
+ATTEMPT_DTYPE = [('session_id', 'i8'), ('question_id', 'i8'), ('chosen', 'i2'), ('correct', '?'), ('ms', 'i4')]
+
+# Questions outside the bank have "h:<hex>" content ids; they are stored as negative integers
+CONTENT_ID_PREFIX = "h:"
+
+
+def encode_question_id(question_id):
+    """Integer form of a bank id or content id; other ids would not survive the round trip"""
+    if isinstance(question_id, str) and question_id.startswith(CONTENT_ID_PREFIX):
+        return -int(question_id[len(CONTENT_ID_PREFIX):], 16) - 1
+    if isinstance(question_id, int) and question_id >= 0:
+        return question_id
+    raise ValueError(f"Can't store question id {question_id!r}: expected a bank id or a content id")
+
+
+def decode_question_id(number):
+    if number < 0:
+        return f"{CONTENT_ID_PREFIX}{-number - 1:015x}"
+    return number
+
+
+class PracticeHistoryStore:
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        self._local = threading.local()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record_session(self, user_id, result, questions):
+        """Append a finished session and its attempts; returns the session id.
+
+        ``result`` is shaped like end_practice_session's: answers and
+        question_ms map question positions to the chosen option index and
+        milliseconds spent. Unanswered questions are stored with chosen -1
+        and untimed ones with ms -1.
+        """
+        answers = result['answers']
+        question_ms = result['question_ms']
+        conn = self._conn()
+        with conn:
+            session_id = conn.execute(
+                "INSERT INTO practice_sessions (user_id, date, score, total, total_time) VALUES (?, ?, ?, ?, ?)",
+                (user_id, result['date'], result['score'], result['total'], result['total_time'])).lastrowid
+            conn.executemany(
+                "INSERT INTO practice_attempts (session_id, question_id, chosen, correct, ms) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, encode_question_id(question.id), answers.get(i, -1),
+                  1 if question.is_correct(answers.get(i)) else 0, question_ms.get(i, -1))
+                 for i, question in enumerate(questions)])
+        return session_id
+
+    def count(self, user_id):
+        return self._conn().execute("SELECT COUNT(*) FROM practice_sessions WHERE user_id = ?",
+                                    (user_id,)).fetchone()[0]
+
+    def sessions(self, user_id, limit=None):
+        """Session summaries, oldest first; with ``limit``, only the latest ones"""
+        rows = self._conn().execute(
+            "SELECT id, date, score, total, total_time FROM practice_sessions WHERE user_id = ?"
+            " ORDER BY id DESC LIMIT ?", (user_id, -1 if limit is None else limit)).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def attempts(self, user_id, session_ids=None):
+        """Attempts as a structured array of ATTEMPT_DTYPE, in session and question order"""
+        import numpy as np
+
+        query = ("SELECT a.session_id, a.question_id, a.chosen, a.correct, a.ms FROM practice_attempts a"
+                 " JOIN practice_sessions s ON s.id = a.session_id WHERE s.user_id = ?")
+        params = [user_id]
+        if session_ids is not None:
+            query += f" AND a.session_id IN ({','.join('?' * len(session_ids)) or 'NULL'})"
+            params.extend(session_ids)
+        rows = self._conn().execute(query + " ORDER BY a.session_id, a.rowid", params).fetchall()
+        return np.array([tuple(row) for row in rows], dtype=ATTEMPT_DTYPE)
+
+    def iter_results(self, user_id, session_ids=None):
+        """Full session results (summary plus per-question answers), oldest first"""
+        import numpy as np
+
+        if session_ids is None:
+            summaries = self.sessions(user_id)
+        else:
+            rows = self._conn().execute(
+                "SELECT id, date, score, total, total_time FROM practice_sessions WHERE user_id = ?"
+                f" AND id IN ({','.join('?' * len(session_ids)) or 'NULL'}) ORDER BY id", (user_id, *session_ids))
+            summaries = [dict(row) for row in rows]
+        ids = [summary['id'] for summary in summaries]
+        attempts = self.attempts(user_id, None if session_ids is None else ids)
+        starts = np.searchsorted(attempts['session_id'], ids, side='left')
+        stops = np.searchsorted(attempts['session_id'], ids, side='right')
+        for summary, start, stop in zip(summaries, starts, stops):
+            rows = attempts[start:stop]
+            answered = np.flatnonzero(rows['chosen'] >= 0)
+            timed = np.flatnonzero(rows['ms'] >= 0)
+            yield {
+                **summary,
+                'answers': dict(zip(answered.tolist(), rows['chosen'][answered].tolist())),
+                'question_ids': tuple(decode_question_id(number) for number in rows['question_id'].tolist()),
+                'question_ms': dict(zip(timed.tolist(), rows['ms'][timed].tolist())),
+            }
+
+    def result(self, session_id):
+        row = self._conn().execute("SELECT user_id FROM practice_sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        return next(self.iter_results(row['user_id'], [session_id]), None)
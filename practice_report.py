@@ -0,0 +1,147 @@
+"""Practice session PDF reports, rendered in memory on a worker thread.
+
+Reports are cached by a hash of the session result and the question
+content it was graded against, so asking for the same report again (or
+including it in a batch zip) costs a dictionary lookup.
+"""
+import hashlib
+import json
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+
+REPORT_CACHE_ENTRIES = 64
+REPORT_WORKERS = 2
+
+
+def _latin1(text):
+    # The core PDF fonts only cover latin-1; anything else prints as '?'
+    return str(text).encode('latin-1', 'replace').decode('latin-1')
+
+
+def report_key(result, questions):
+    """Stable hash of everything that ends up in the report"""
+    payload = json.dumps([
+        result['date'], result['score'], result['total'], result['total_time'],
+        sorted(result['answers'].items()),
+        [[q.question, list(q.options), q.correct_index] for q in questions],
+    ], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def report_filename(result):
+    stamp = result['date'].replace('-', '').replace(':', '').replace(' ', '_')
+    return f"practice_report_{stamp}.pdf"
+
+
+def render_practice_report(result, questions):
+    """Build the report PDF and return its bytes; nothing touches the disk"""
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=12)
+
+    # Header
+    accuracy = (result['score'] / result['total']) * 100 if result['total'] else 0.0
+    pdf.cell(200, 10, txt="Practice Session Report", ln=1, align='C')
+    pdf.cell(200, 10, txt=f"Date: {result['date']}", ln=1)
+    pdf.cell(200, 10, txt=f"Score: {result['score']}/{result['total']}", ln=1)
+    pdf.cell(200, 10, txt=f"Accuracy: {accuracy:.1f}%", ln=1)
+    pdf.cell(200, 10, txt=f"Total Time: {result['total_time']} seconds", ln=1)
+    pdf.ln(10)
+
+    # Questions and answers
+    pdf.set_font("Arial", size=10)
+    for i, question in enumerate(questions):
+        pdf.multi_cell(0, 8, txt=_latin1(f"Q{i+1}. {question.question}"))
+
+        user_ans_index = result['answers'].get(i)
+        if user_ans_index is not None and 0 <= user_ans_index < len(question.options):
+            user_ans = question.options[user_ans_index]
+        else:
+            user_ans = "Not attempted"
+        correct_ans = question.correct_option or "Not set"
+
+        pdf.multi_cell(0, 8, txt=_latin1(f"Your answer: {user_ans}"))
+        pdf.multi_cell(0, 8, txt=_latin1(f"Correct answer: {correct_ans}"))
+
+        if question.is_correct(user_ans_index):
+            pdf.set_text_color(0, 128, 0)
+            pdf.cell(0, 8, txt="Status: Correct", ln=1)
+        else:
+            pdf.set_text_color(255, 0, 0)
+            pdf.cell(0, 8, txt="Status: Incorrect", ln=1)
+
+        pdf.set_text_color(0, 0, 0)
+        pdf.ln(5)
+
+    # fpdf 1.7 returns the document as a latin-1 str
+    return pdf.output(dest='S').encode('latin-1')
+
+
+class ReportRenderer:
+    """Renders reports on a small thread pool with an LRU cache of finished PDFs"""
+
+    def __init__(self, workers=REPORT_WORKERS, max_entries=REPORT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report")
+        self._done = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _store(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.exception() is None:
+                self._done[key] = future.result()
+                while len(self._done) > self.max_entries:
+                    self._done.popitem(last=False)
+
+    def submit(self, result, questions):
+        """Future for the report's bytes; finished at once when it is cached"""
+        key = report_key(result, questions)
+        with self._lock:
+            if key in self._done:
+                self._done.move_to_end(key)
+                future = Future()
+                future.set_result(self._done[key])
+                return future
+            future = self._pending.get(key)
+            if future is not None:
+                # Later clicks on the same report wait on the render already running
+                return future
+            future = self._executor.submit(render_practice_report, result, questions)
+            self._pending[key] = future
+        # Outside the lock: a render that already finished runs the callback right here
+        future.add_done_callback(lambda f, key=key: self._store(key, f))
+        return future
+
+    def build_zip(self, sessions):
+        """Zip of reports for ``(result, questions)`` pairs, reusing cached PDFs"""
+        futures = [(report_filename(result), self.submit(result, questions)) for result, questions in sessions]
+        buffer = BytesIO()
+        names = set()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for n, (name, future) in enumerate(futures, 1):
+                # Sessions finished in the same minute would share a name
+                if name in names:
+                    name = name.replace(".pdf", f"_{n}.pdf")
+                names.add(name)
+                archive.writestr(name, future.result())
+        return buffer.getvalue()
+
+    def submit_zip(self, sessions):
+        # Runs on its own thread so it doesn't occupy a render worker while it waits
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self.build_zip(sessions))
+            except BaseException as exc:
+                future.set_exception(exc)
+
+        threading.Thread(target=run, name="report-zip", daemon=True).start()
+        return future
@@ -0,0 +1,539 @@
+"""Persistent question bank backed by SQLite with an FTS5 text index"""
+import itertools
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+from datetime import datetime
+
+from question_model import Question, dedupe_key, letter_to_index
+
+DEFAULT_BANK_PATH = os.environ.get(
+    "MOCKTEST_BANK_PATH", os.path.join(os.getcwd(), ".mocktest_data", "question_bank.db"))
+
+# Every row gets a random key; sampling seeks to a random point in an index
+# ordered by it, so each draw is an index lookup instead of a table scan.
+RAND_RANGE = 2 ** 31
+
+# Hex digits of a PDF's SHA-256 kept in its source name
+SOURCE_DIGEST_LENGTH = 10
+_SOURCE_SUFFIX = re.compile(rf" \[[0-9a-f]{{{SOURCE_DIGEST_LENGTH}}}\]$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    correct_answer TEXT,
+    explanation TEXT,
+    topic TEXT NOT NULL DEFAULT 'General',
+    difficulty TEXT NOT NULL DEFAULT 'Medium',
+    source TEXT,
+    has_answer INTEGER NOT NULL DEFAULT 0,
+    rand_key INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    content_key INTEGER,
+    minhash BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_questions_rand ON questions(rand_key);
+CREATE INDEX IF NOT EXISTS idx_questions_topic ON questions(topic, rand_key);
+CREATE INDEX IF NOT EXISTS idx_questions_difficulty ON questions(difficulty, rand_key);
+CREATE INDEX IF NOT EXISTS idx_questions_topic_difficulty ON questions(topic, difficulty, rand_key);
+CREATE INDEX IF NOT EXISTS idx_questions_source ON questions(source, rand_key);
+CREATE INDEX IF NOT EXISTS idx_questions_answered ON questions(has_answer, rand_key);
+
+-- Inserts are indexed in bulk by add_questions; a per-row trigger is ~3x slower
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    question, options, content='questions', content_rowid='id'
+);
+-- MinHash LSH buckets (see near_duplicates): one row per band of every question's signature
+CREATE TABLE IF NOT EXISTS question_lsh (
+    bucket INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    PRIMARY KEY (bucket, question_id)
+) WITHOUT ROWID;
+
+-- Every distinct indexed term, for fuzzy query expansion (search_index.BankSearch)
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts_vocab USING fts5vocab(questions_fts, 'row');
+CREATE TRIGGER IF NOT EXISTS questions_ad AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts(questions_fts, rowid, question, options)
+    VALUES ('delete', old.id, old.question, old.options);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_au AFTER UPDATE OF question, options ON questions BEGIN
+    INSERT INTO questions_fts(questions_fts, rowid, question, options)
+    VALUES ('delete', old.id, old.question, old.options);
+    INSERT INTO questions_fts(rowid, question, options) VALUES (new.id, new.question, new.options);
+END;
+"""
+
+# Banks created before content_key existed get the column, backfilled, on open
+MIGRATIONS = """
+CREATE INDEX IF NOT EXISTS idx_questions_content_key ON questions(content_key);
+-- Questions still waiting for a MinHash signature (see QuestionBank.sign_in_background)
+CREATE INDEX IF NOT EXISTS idx_questions_unsigned ON questions(id) WHERE minhash IS NULL;
+"""
+
+# Page cache (KiB) used while inserting large batches: every rand_key index
+# takes writes at random positions, so a small cache thrashes
+BULK_CACHE_KIB = 65536
+BULK_ROWS = 10000
+# Questions signed per transaction by the background backfill
+SIGNATURE_BACKFILL_ROWS = 2000
+
+# Column order of the tuples passed to insert_rows
+INSERT_COLUMNS = ('question', 'options', 'correct_answer', 'explanation', 'topic', 'difficulty',
+                  'source', 'has_answer', 'rand_key', 'created_at', 'content_key')
+
+EDITABLE_FIELDS = ('question', 'options', 'correct_answer', 'explanation', 'topic', 'difficulty')
+
+
+def _row_to_question(row):
+    return Question(
+        id=row['id'],
+        question=row['question'],
+        options=tuple(json.loads(row['options'])),
+        correct_index=letter_to_index(row['correct_answer']),
+        explanation=row['explanation'] or '',
+        topic=row['topic'],
+        difficulty=row['difficulty'],
+        source=row['source'],
+    )
+
+
+def pdf_source(file_name, content_digest):
+    """Source name for questions imported from a PDF: two different PDFs that share a file name
+    must not replace each other's questions, so the name carries part of the content hash"""
+    return f"{file_name} [{content_digest[:SOURCE_DIGEST_LENGTH]}]"
+
+
+def source_label(source):
+    """The part of a source name meant for display"""
+    return _SOURCE_SUFFIX.sub("", source) if source else source
+
+
+def _fts_query(groups):
+    """Match every group, where a group is a list of alternative terms"""
+    # Quote every term so user input can't inject FTS5 operators
+    clauses = [" OR ".join('"' + term.replace('"', '""') + '"' for term in group) for group in groups if group]
+    return " AND ".join(f"({clause})" for clause in clauses)
+
+
+class QuestionBank:
+    def __init__(self, path=DEFAULT_BANK_PATH):
+        self.path = path
+        self._local = threading.local()
+        # Bumped by every write made through this object, so in-memory indexes
+        # built from the bank can tell when they are stale
+        self.revision = 0
+        # Background signing of questions inserted without a MinHash signature
+        self._backfill_lock = threading.Lock()
+        self._backfill_requested = threading.Event()
+        self._backfill_thread = None
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+
+    def _conn(self):
+        # SQLite connections can't be shared across threads; Streamlit runs
+        # each session's script on its own thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn):
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(questions)")}
+        if 'content_key' not in columns:
+            with conn:
+                conn.execute("ALTER TABLE questions ADD COLUMN content_key INTEGER")
+                rows = conn.execute("SELECT id, question, options FROM questions").fetchall()
+                conn.executemany("UPDATE questions SET content_key = ? WHERE id = ?",
+                                 [(dedupe_key(row['question'], json.loads(row['options'])), row['id'])
+                                  for row in rows])
+        if 'minhash' not in columns:
+            # Filled in by backfill_signatures the first time near-duplicates are looked up
+            with conn:
+                conn.execute("ALTER TABLE questions ADD COLUMN minhash BLOB")
+        conn.executescript(MIGRATIONS)
+
+    @staticmethod
+    def _where(topic=None, difficulty=None, source=None, answered=None):
+        clauses, params = [], []
+        for column, value in (('topic', topic), ('difficulty', difficulty), ('source', source)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if answered is not None:
+            clauses.append("has_answer = ?")
+            params.append(1 if answered else 0)
+        return (" AND ".join(clauses) or "1"), params
+
+    def add_questions(self, questions, source=None):
+        """Insert Question objects or question dicts and return their new ids"""
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = []
+        for q in questions:
+            if not isinstance(q, Question):
+                q = Question.from_dict(q)
+            rows.append((q.question, json.dumps(list(q.options), ensure_ascii=False), q.correct_answer,
+                         q.explanation, q.topic, q.difficulty, q.source or source,
+                         1 if q.correct_index >= 0 else 0, random.randrange(RAND_RANGE), now,
+                         dedupe_key(q.question, q.options)))
+        return self.insert_rows(rows)
+
+    def insert_rows(self, rows, sign=None):
+        """Insert prepared row tuples (see INSERT_COLUMNS) in one transaction; returns their ids.
+
+        ``sign`` says whether to index the rows' MinHash signatures now. By
+        default only inserts smaller than BULK_ROWS are; bulk ones are left to
+        sign_in_background, so they keep their insert speed.
+        """
+        if not rows:
+            return []
+        from near_duplicates import band_buckets, signature_text, signatures, to_blob
+
+        conn = self._conn()
+        bulk = len(rows) >= BULK_ROWS
+        if sign is None:
+            sign = not bulk
+        if sign:
+            signature_rows = signatures(signature_text(row[0], json.loads(row[1])) for row in rows)
+            blobs = [to_blob(signature) for signature in signature_rows]
+        else:
+            blobs = [None] * len(rows)
+        if bulk:
+            default_cache = conn.execute("PRAGMA cache_size").fetchone()[0]
+            conn.execute(f"PRAGMA cache_size = -{BULK_CACHE_KIB}")
+        try:
+            with conn:
+                # The write lock keeps the new rowids contiguous
+                conn.execute("BEGIN IMMEDIATE")
+                first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM questions").fetchone()[0]
+                conn.executemany(
+                    f"INSERT INTO questions ({', '.join(INSERT_COLUMNS)}, minhash)"
+                    f" VALUES ({', '.join('?' * len(INSERT_COLUMNS))}, ?)",
+                    [(*row, blob) for row, blob in zip(rows, blobs)])
+                conn.execute("INSERT INTO questions_fts(rowid, question, options)"
+                             " SELECT id, question, options FROM questions WHERE id >= ?", (first_id,))
+                if sign:
+                    self._add_buckets(conn, range(first_id, first_id + len(rows)), band_buckets(signature_rows))
+        finally:
+            if bulk:
+                conn.execute(f"PRAGMA cache_size = {default_cache}")
+        self.revision += 1
+        if not sign:
+            self.sign_in_background()
+        return list(range(first_id, first_id + len(rows)))
+
+    @staticmethod
+    def _add_buckets(conn, ids, buckets):
+        import numpy as np
+
+        ids = np.repeat(np.asarray(ids, dtype=np.int64), buckets.shape[1])
+        buckets = buckets.ravel()
+        # Inserted in key order, which keeps B-tree page writes local
+        order = np.lexsort((ids, buckets))
+        conn.executemany("INSERT OR IGNORE INTO question_lsh (bucket, question_id) VALUES (?, ?)",
+                         zip(buckets[order].tolist(), ids[order].tolist()))
+
+    @staticmethod
+    def _drop_buckets(conn, rows):
+        """Remove the LSH rows of (id, minhash) pairs; rows without a signature have none"""
+        from near_duplicates import band_buckets, from_blobs
+
+        rows = [(row[0], row[1]) for row in rows if row[1] is not None]
+        if not rows:
+            return
+        buckets = band_buckets(from_blobs(blob for _, blob in rows))
+        conn.executemany("DELETE FROM question_lsh WHERE bucket = ? AND question_id = ?",
+                         ((bucket, question_id) for (question_id, _), row in zip(rows, buckets.tolist())
+                          for bucket in row))
+
+    def unsigned_count(self):
+        """Questions not yet indexed for near-duplicate lookups"""
+        return self._conn().execute("SELECT COUNT(*) FROM questions WHERE minhash IS NULL").fetchone()[0]
+
+    def backfill_signatures(self, batch_size=SIGNATURE_BACKFILL_ROWS, max_batches=None):
+        """Sign questions stored without a signature, one transaction per batch; returns how many were signed"""
+        from near_duplicates import band_buckets, signature_text, signatures, to_blob
+
+        conn = self._conn()
+        signed = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            rows = conn.execute("SELECT id, question, options FROM questions WHERE minhash IS NULL LIMIT ?",
+                                (batch_size,)).fetchall()
+            if not rows:
+                break
+            signature_rows = signatures(signature_text(row['question'], json.loads(row['options'])) for row in rows)
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                # Rows edited or deleted since they were read are signed by that write, or gone
+                still_unsigned = {row[0] for row in conn.execute(
+                    f"SELECT id FROM questions WHERE minhash IS NULL AND id IN ({','.join('?' * len(rows))})",
+                    [row['id'] for row in rows])}
+                keep = [position for position, row in enumerate(rows) if row['id'] in still_unsigned]
+                ids = [rows[position]['id'] for position in keep]
+                conn.executemany("UPDATE questions SET minhash = ? WHERE id = ?",
+                                 zip(map(to_blob, signature_rows[keep]), ids))
+                self._add_buckets(conn, ids, band_buckets(signature_rows[keep]))
+            signed += len(ids)
+            batches += 1
+        return signed
+
+    def sign_in_background(self):
+        """Sign unsigned questions on a daemon thread; does nothing if that thread is already running"""
+        with self._backfill_lock:
+            self._backfill_requested.set()
+            if self._backfill_thread is None:
+                self._backfill_thread = threading.Thread(target=self._backfill_worker, name="bank-signatures",
+                                                         daemon=True)
+                self._backfill_thread.start()
+
+    def _backfill_worker(self):
+        try:
+            while True:
+                self._backfill_requested.clear()
+                self.backfill_signatures()
+                with self._backfill_lock:
+                    # A request that came in during the pass may have brought new rows
+                    if not self._backfill_requested.is_set():
+                        self._backfill_thread = None
+                        return
+        except Exception:
+            # The next sign_in_background starts over; the thread's excepthook reports the error
+            with self._backfill_lock:
+                self._backfill_thread = None
+            raise
+
+    def similar_questions(self, signature_rows, threshold, exclude_source=None, limit=5):
+        """For each MinHash signature, up to ``limit`` (id, similarity, question, source) bank
+        matches at or above ``threshold``, best first. Only questions sharing an LSH bucket
+        with a signature are compared, so the cost follows the matches, not the bank size.
+        Questions still waiting for a signature (see unsigned_count) are not found.
+        """
+        import numpy as np
+
+        from near_duplicates import MAX_BUCKET_MEMBERS, band_buckets, from_blobs, similarity
+
+        conn = self._conn()
+        buckets = band_buckets(signature_rows)
+        # A bucket shared by a crowd of questions (boilerplate wording) is only sampled; a real
+        # match meets the signature in several other buckets as well
+        members = []
+        for bucket in set(buckets.ravel().tolist()):
+            members += conn.execute("SELECT bucket, question_id FROM question_lsh WHERE bucket = ? LIMIT ?",
+                                    (bucket, MAX_BUCKET_MEMBERS))
+        # Bucket members sorted by bucket, so each bucket is one slice
+        members = np.fromiter(itertools.chain.from_iterable(members), dtype=np.int64,
+                              count=2 * len(members)).reshape(-1, 2)
+        members = members[np.argsort(members[:, 0], kind='stable')]
+        member_buckets, member_ids = members[:, 0], members[:, 1]
+
+        candidate_ids, blobs, sources = [], [], {}
+        ids = np.unique(member_ids).tolist()
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            for question_id, source, blob in conn.execute(
+                    f"SELECT id, source, minhash FROM questions"
+                    f" WHERE id IN ({','.join('?' * len(chunk))}) AND minhash IS NOT NULL", chunk):
+                if exclude_source is None or source != exclude_source:
+                    candidate_ids.append(question_id)
+                    blobs.append(blob)
+        candidate_ids = np.array(candidate_ids, dtype=np.int64)
+        order = np.argsort(candidate_ids)
+        candidate_ids = candidate_ids[order]
+        candidate_signatures = from_blobs(blobs)[order] if blobs else None
+
+        found_matches = []
+        for signature, row_buckets in zip(signature_rows, buckets):
+            lows = np.searchsorted(member_buckets, row_buckets, side='left')
+            highs = np.searchsorted(member_buckets, row_buckets, side='right')
+            found = np.unique(np.concatenate([member_ids[low:high] for low, high in zip(lows, highs)]))
+            matches = []
+            if len(candidate_ids):
+                # Members from the excluded source (or not yet signed) are not candidates
+                positions = np.minimum(np.searchsorted(candidate_ids, found), len(candidate_ids) - 1)
+                positions = positions[candidate_ids[positions] == found]
+                scores = similarity(signature, candidate_signatures[positions])
+                for index in np.argsort(-scores, kind='stable')[:limit]:
+                    if scores[index] < threshold:
+                        break
+                    matches.append((int(candidate_ids[positions[index]]), float(scores[index])))
+            found_matches.append(matches)
+
+        details = {}
+        ids = list({question_id for matches in found_matches for question_id, _ in matches})
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            for row in conn.execute(f"SELECT id, question, source FROM questions"
+                                    f" WHERE id IN ({','.join('?' * len(chunk))})", chunk):
+                details[row['id']] = (row['question'], row['source'])
+        return [[(question_id, score, *details[question_id]) for question_id, score in matches]
+                for matches in found_matches]
+
+    def existing_keys(self, keys):
+        """The subset of ``keys`` (see question_model.dedupe_key) already in the bank"""
+        keys = list(keys)
+        found = set()
+        conn = self._conn()
+        for start in range(0, len(keys), 900):
+            chunk = keys[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(row[0] for row in conn.execute(
+                f"SELECT content_key FROM questions WHERE content_key IN ({placeholders})", chunk))
+        return found
+
+    def update_question(self, question_id, **fields):
+        fields = {key: value for key, value in fields.items() if key in EDITABLE_FIELDS}
+        if not fields:
+            return
+        if 'options' in fields:
+            fields['options'] = json.dumps(list(fields['options']), ensure_ascii=False)
+        if 'correct_answer' in fields:
+            fields['has_answer'] = 1 if fields['correct_answer'] else 0
+        conn = self._conn()
+        signature_rows = None
+        if 'question' in fields or 'options' in fields:
+            from near_duplicates import band_buckets, signature_text, signatures, to_blob
+
+            row = conn.execute("SELECT question, options, minhash FROM questions WHERE id = ?",
+                               (question_id,)).fetchone()
+            if row is None:
+                return
+            text, options = fields.get('question', row['question']), json.loads(fields.get('options', row['options']))
+            fields['content_key'] = dedupe_key(text, options)
+            signature_rows = signatures([signature_text(text, options)])
+            fields['minhash'] = to_blob(signature_rows[0])
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with conn:
+            conn.execute(f"UPDATE questions SET {assignments} WHERE id = ?", (*fields.values(), question_id))
+            if signature_rows is not None:
+                self._drop_buckets(conn, [(question_id, row['minhash'])])
+                self._add_buckets(conn, [question_id], band_buckets(signature_rows))
+        self.revision += 1
+
+    def delete_source(self, source):
+        conn = self._conn()
+        with conn:
+            self._drop_buckets(conn, conn.execute("SELECT id, minhash FROM questions WHERE source = ?", (source,)))
+            deleted = conn.execute("DELETE FROM questions WHERE source = ?", (source,)).rowcount
+        self.revision += 1
+        return deleted
+
+    def get_questions(self, ids):
+        """Fetch questions by id, preserving the order of ``ids``"""
+        ids = list(ids)
+        if not ids:
+            return []
+        by_id = {}
+        conn = self._conn()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 900):
+            chunk = ids[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            for row in conn.execute(f"SELECT * FROM questions WHERE id IN ({placeholders})", chunk):
+                by_id[row['id']] = _row_to_question(row)
+        return [by_id[i] for i in ids if i in by_id]
+
+    def iter_questions(self, source=None, batch_size=1000):
+        """Yield every question (optionally from one source) in id order, a batch at a time"""
+        where, params = self._where(source=source)
+        conn = self._conn()
+        last_id = 0
+        while True:
+            # Keyset paging: each batch is an index seek, not an OFFSET scan
+            rows = conn.execute(f"SELECT * FROM questions WHERE {where} AND id > ? ORDER BY id LIMIT ?",
+                                (*params, last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _row_to_question(row)
+            last_id = rows[-1]['id']
+
+    def max_option_count(self, source=None):
+        where, params = self._where(source=source)
+        return self._conn().execute(f"SELECT COALESCE(MAX(json_array_length(options)), 0) FROM questions"
+                                    f" WHERE {where}", params).fetchone()[0]
+
+    def answerable_rows(self):
+        """(id, topic, difficulty) of every question with a known answer, in id order"""
+        # A rowid-order table scan; going through the has_answer index costs a seek per row
+        return self._conn().execute(
+            "SELECT id, topic, difficulty FROM questions NOT INDEXED WHERE has_answer = 1 ORDER BY id").fetchall()
+
+    def count(self, topic=None, difficulty=None, source=None, answered=None):
+        where, params = self._where(topic, difficulty, source, answered)
+        return self._conn().execute(f"SELECT COUNT(*) FROM questions WHERE {where}", params).fetchone()[0]
+
+    def sample(self, count, topic=None, difficulty=None, source=None, answered_only=True, rng=None):
+        """Draw up to ``count`` distinct random questions matching the filters.
+
+        Each draw seeks to a random ``rand_key`` through an index, so the
+        cost is O(count * log n) regardless of bank size.
+        """
+        rng = rng or random
+        where, params = self._where(topic, difficulty, source, True if answered_only else None)
+        conn = self._conn()
+        seek = f"SELECT * FROM questions WHERE {where} AND rand_key >= ? ORDER BY rand_key LIMIT 1"
+        wrap = f"SELECT * FROM questions WHERE {where} ORDER BY rand_key LIMIT 1"
+        picked = {}
+        for _ in range(count * 3):
+            if len(picked) >= count:
+                break
+            row = conn.execute(seek, (*params, rng.randrange(RAND_RANGE))).fetchone()
+            if row is None:
+                row = conn.execute(wrap, params).fetchone()
+                if row is None:
+                    return []
+            picked.setdefault(row['id'], row)
+        if len(picked) < count:
+            # Small filtered sets collide often; top up from what's left
+            placeholders = ",".join("?" * len(picked)) or "NULL"
+            rows = conn.execute(
+                f"SELECT * FROM questions WHERE {where} AND id NOT IN ({placeholders})"
+                f" ORDER BY random() LIMIT ?", (*params, *picked, count - len(picked)))
+            for row in rows:
+                picked[row['id']] = row
+        return [_row_to_question(row) for row in picked.values()]
+
+    def search(self, text, limit=20, offset=0):
+        """Full-text search over question and option text, best matches first"""
+        return self.match([[term] for term in text.split()], limit, offset)
+
+    def match(self, groups, limit=20, offset=0):
+        """Questions containing a term from every group, best matches first"""
+        query = _fts_query(groups)
+        if not query:
+            return []
+        rows = self._conn().execute(
+            "SELECT q.* FROM questions_fts JOIN questions q ON q.id = questions_fts.rowid"
+            " WHERE questions_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?", (query, limit, offset))
+        return [_row_to_question(row) for row in rows]
+
+    def match_count(self, groups):
+        query = _fts_query(groups)
+        if not query:
+            return 0
+        return self._conn().execute("SELECT COUNT(*) FROM questions_fts WHERE questions_fts MATCH ?",
+                                    (query,)).fetchone()[0]
+
+    def vocabulary(self):
+        """Every term in the full-text index"""
+        return [row[0] for row in self._conn().execute("SELECT term FROM questions_fts_vocab")]
+
+    def facet_counts(self, column):
+        """Question counts grouped by topic, difficulty or source"""
+        if column not in ('topic', 'difficulty', 'source'):
+            raise ValueError(f"Unknown facet: {column}")
+        rows = self._conn().execute(
+            f"SELECT {column} AS value, COUNT(*) AS n FROM questions GROUP BY {column} ORDER BY n DESC")
+        return {row['value']: row['n'] for row in rows}
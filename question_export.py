@@ -0,0 +1,152 @@
+"""Chunked question exports to CSV, JSONL and Parquet.
+
+Exports are written to a binary sink (a file, or a BytesIO) a chunk of
+rows at a time, so no whole-export string or row list is ever built.
+The app hands the raw bytes to ``st.download_button``, which serves them
+from Streamlit's media endpoint instead of a base64 data URI in the page.
+"""
+import csv
+import io
+import json
+from itertools import islice
+
+from question_model import Question
+
+EXPORT_CHUNK_ROWS = 5000
+
+# format -> (mime type, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# The first columns match the CSV the converter has always exported
+CSV_LEADING_COLUMNS = ['ID', 'Question']
+CSV_TRAILING_COLUMNS = ['Answer', 'Explanation', 'Topic', 'Difficulty', 'Source']
+MIN_OPTION_COLUMNS = 4
+
+
+def option_letters(count):
+    return [chr(65 + i) for i in range(max(MIN_OPTION_COLUMNS, count))]
+
+
+def _as_question(question):
+    return question if isinstance(question, Question) else Question.from_dict(question)
+
+
+def _iter_records(questions):
+    """(export id, Question) pairs; questions without a bank id are numbered by position"""
+    for position, question in enumerate(questions, 1):
+        question = _as_question(question)
+        yield (question.id if isinstance(question.id, int) else position), question
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def max_option_count(questions):
+    return max((len(_as_question(q).options) for q in questions), default=0)
+
+
+def _write_csv(records, sink, option_count, chunk_rows):
+    letters = option_letters(option_count)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_LEADING_COLUMNS + letters + CSV_TRAILING_COLUMNS)
+    rows = 0
+    for chunk in _chunks(records, chunk_rows):
+        for export_id, q in chunk:
+            options = list(q.options) + [''] * (len(letters) - len(q.options))
+            writer.writerow([export_id, q.question, *options, q.correct_answer or '',
+                             q.explanation, q.topic, q.difficulty, q.source or ''])
+        sink.write(buffer.getvalue().encode('utf-8'))
+        buffer.seek(0)
+        buffer.truncate()
+        rows += len(chunk)
+    if buffer.tell():
+        sink.write(buffer.getvalue().encode('utf-8'))
+    return rows
+
+
+def _write_jsonl(records, sink, chunk_rows):
+    rows = 0
+    for chunk in _chunks(records, chunk_rows):
+        lines = []
+        for export_id, q in chunk:
+            data = q.to_dict()
+            data['id'] = export_id
+            lines.append(json.dumps(data, ensure_ascii=False))
+        sink.write(("\n".join(lines) + "\n").encode('utf-8'))
+        rows += len(chunk)
+    return rows
+
+
+def parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('id', pa.int64()),
+        ('question', pa.string()),
+        ('options', pa.list_(pa.string())),
+        ('correct_answer', pa.string()),
+        ('explanation', pa.string()),
+        ('topic', pa.string()),
+        ('difficulty', pa.string()),
+        ('source', pa.string()),
+    ])
+
+
+def _write_parquet(records, sink, chunk_rows):
+    # pyarrow is only needed for this format, so it is imported on demand
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    rows = 0
+    # One row group per chunk keeps the writer's memory bounded
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for chunk in _chunks(records, chunk_rows):
+            columns = {
+                'id': [export_id for export_id, _ in chunk],
+                'question': [q.question for _, q in chunk],
+                'options': [list(q.options) for _, q in chunk],
+                'correct_answer': [q.correct_answer for _, q in chunk],
+                'explanation': [q.explanation for _, q in chunk],
+                'topic': [q.topic for _, q in chunk],
+                'difficulty': [q.difficulty for _, q in chunk],
+                'source': [q.source for _, q in chunk],
+            }
+            writer.write_table(pa.table(columns, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def export_questions(questions, fmt, sink, option_count=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write ``questions`` (Question objects or dicts) to a binary ``sink``.
+
+    CSV needs the widest option count up front for its header; pass
+    ``option_count`` when ``questions`` is a one-shot iterator. Returns
+    the number of questions written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'csv':
+        if option_count is None:
+            questions = list(questions)
+            option_count = max_option_count(questions)
+        return _write_csv(_iter_records(questions), sink, option_count, chunk_rows)
+    if fmt == 'jsonl':
+        return _write_jsonl(_iter_records(questions), sink, chunk_rows)
+    return _write_parquet(_iter_records(questions), sink, chunk_rows)
+
+
+def export_bytes(questions, fmt, **kwargs):
+    sink = io.BytesIO()
+    export_questions(questions, fmt, sink, **kwargs)
+    return sink.getvalue()
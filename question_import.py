@@ -0,0 +1,237 @@
+"""Bulk question import from CSV, JSONL, Excel and Parquet files.
+
+The inverse of question_export: files are read a chunk of rows at a
+time, each chunk is validated with column-wise pandas operations, rows
+already in the bank (or repeated within the chunk) are dropped by their
+``dedupe_key`` and the rest go in with one ``insert_rows`` call per chunk.
+Memory stays bounded by the chunk size, whatever the file size.
+"""
+import json
+import os
+import random
+from datetime import datetime
+from itertools import islice
+
+from question_bank import RAND_RANGE
+from question_model import KEY_SEPARATOR, normalize_text, text_key
+
+IMPORT_CHUNK_ROWS = 50000
+IMPORT_FORMATS = ('csv', 'jsonl', 'xlsx', 'parquet')
+VALID_DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+MIN_OPTIONS = 2
+MAX_OPTIONS = 26
+REJECT_SAMPLE_SIZE = 20
+
+# Accepted spellings of each column, after lower-casing the header
+COLUMN_ALIASES = {
+    'question': 'question',
+    'answer': 'answer',
+    'correct_answer': 'answer',
+    'explanation': 'explanation',
+    'topic': 'topic',
+    'difficulty': 'difficulty',
+    'source': 'source',
+}
+LETTERS = [chr(65 + i) for i in range(MAX_OPTIONS)]
+LETTER_INDEX = {letter: i for i, letter in enumerate(LETTERS)}
+
+
+def detect_format(file_name):
+    extension = os.path.splitext(file_name)[1].lower().lstrip('.')
+    fmt = {'ndjson': 'jsonl', 'json': 'jsonl', 'xls': 'xlsx', 'xlsm': 'xlsx', 'pq': 'parquet'}.get(extension, extension)
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import file type: .{extension}")
+    return fmt
+
+
+# Readers: each yields DataFrames of at most chunk_rows raw rows
+
+def _iter_csv(source, chunk_rows):
+    import pandas as pd
+    yield from pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+
+
+def _iter_jsonl(source, chunk_rows):
+    import pandas as pd
+    # Read every field as text; options stay lists
+    yield from pd.read_json(source, lines=True, dtype=False, chunksize=chunk_rows)
+
+
+def _iter_xlsx(source, chunk_rows):
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    # read_only streams rows from the sheet instead of loading the workbook
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else '' for cell in next(rows, ())]
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                return
+            yield pd.DataFrame(chunk, columns=header, dtype=object)
+    finally:
+        workbook.close()
+
+
+def _iter_parquet(source, chunk_rows):
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+        yield batch.to_pandas()
+
+
+READERS = {'csv': _iter_csv, 'jsonl': _iter_jsonl, 'xlsx': _iter_xlsx, 'parquet': _iter_parquet}
+
+
+def _text(series):
+    return series.fillna('').astype(str).str.strip()
+
+
+def _option_list(value, row):
+    """One cell of a list-valued options column; missing cells (None or NaN) have no options"""
+    import pandas as pd
+
+    if isinstance(value, (list, tuple)) or getattr(value, 'ndim', None) == 1:
+        return list(value)
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return []
+    raise ValueError(f"Row {row}: options must be a list, not {type(value).__name__}")
+
+
+def normalize_frame(raw, first_row=0):
+    """Map a raw chunk onto question / A..Z / answer / explanation / topic / difficulty / source.
+
+    ``first_row`` is how many rows came before this chunk, for error messages.
+    """
+    import pandas as pd
+
+    renamed = {}
+    for column in raw.columns:
+        key = str(column).strip()
+        if key.lower() in COLUMN_ALIASES:
+            renamed[column] = COLUMN_ALIASES[key.lower()]
+        elif key.upper() in LETTER_INDEX and len(key) == 1:
+            renamed[column] = key.upper()
+        elif key.lower() == 'options':
+            renamed[column] = 'options'
+    frame = raw[list(renamed)].rename(columns=renamed)
+    if 'question' not in frame.columns:
+        raise ValueError("Import file has no Question column")
+
+    if 'options' in frame.columns:
+        # JSONL/Parquet keep options as one list column; spread it into letter columns
+        lists = [_option_list(value, first_row + position + 1)
+                 for position, value in enumerate(frame.pop('options'))]
+        spread = pd.DataFrame(lists, index=frame.index)
+        spread.columns = LETTERS[:spread.shape[1]]
+        frame = pd.concat([frame, spread[[c for c in spread.columns if c not in frame.columns]]], axis=1)
+
+    letters = [letter for letter in LETTERS if letter in frame.columns]
+    if not letters:
+        raise ValueError("Import file has no option columns (A, B, ... or options)")
+    result = pd.DataFrame({'question': _text(frame['question'])}, index=frame.index)
+    for letter in letters:
+        result[letter] = _text(frame[letter])
+    for column in ('answer', 'explanation', 'topic', 'difficulty', 'source'):
+        result[column] = _text(frame[column]) if column in frame.columns else ''
+    return result, letters
+
+
+def validate_frame(frame, letters):
+    """Column-wise checks; returns (valid mask, option counts, answer indexes, reject reasons)"""
+    import numpy as np
+
+    present = frame[letters].ne('').to_numpy()
+    option_count = present.sum(axis=1)
+    # Options must be packed from A: no blanks before the last option
+    packed = present.cumprod(axis=1).sum(axis=1) == option_count
+    answer = frame['answer'].str.upper().str.strip('().: ')
+    answer_index = answer.map(LETTER_INDEX).fillna(-1).astype(int).to_numpy()
+    has_answer = answer.ne('').to_numpy()
+    difficulty = frame['difficulty'].str.capitalize()
+
+    checks = [
+        (frame['question'].eq('').to_numpy(), 'missing question'),
+        (option_count < MIN_OPTIONS, f'fewer than {MIN_OPTIONS} options'),
+        (~packed, 'blank option before the last one'),
+        (has_answer & (answer_index < 0), 'answer is not a letter'),
+        (has_answer & (answer_index >= option_count), 'answer has no matching option'),
+        (difficulty.ne('').to_numpy() & ~difficulty.isin(VALID_DIFFICULTIES).to_numpy(), 'unknown difficulty'),
+    ]
+    reasons = np.select([mask for mask, _ in checks], [reason for _, reason in checks], default='')
+    return reasons == '', option_count, answer_index, reasons
+
+
+def _dedupe_keys(frame, letters, option_count):
+    """dedupe_key for every row; the question and option columns are joined column-wise"""
+    import numpy as np
+
+    joined = frame['question']
+    for position, letter in enumerate(letters):
+        # Only options that exist are part of the key, as in dedupe_key
+        joined = joined + np.where(option_count > position, KEY_SEPARATOR + frame[letter], '')
+    keys = (text_key(normalize_text(text)) for text in joined)
+    return np.fromiter(keys, dtype=np.int64, count=len(joined))
+
+
+def import_questions(bank, source, file_name, default_source=None, chunk_rows=IMPORT_CHUNK_ROWS, progress=None):
+    """Import a question file into ``bank`` and return a summary dict.
+
+    ``source`` is a path or binary file-like object and ``file_name`` picks
+    the format. Rows without a Source column value are tagged with
+    ``default_source`` (the file name by default). ``progress(rows_read)``
+    is called after every chunk.
+    """
+    import numpy as np
+    import pandas as pd
+
+    fmt = detect_format(file_name)
+    default_source = default_source or os.path.basename(file_name)
+    report = {'read': 0, 'imported': 0, 'duplicate_in_bank': 0, 'duplicate_in_file': 0,
+              'rejected': 0, 'reject_reasons': {}, 'reject_samples': []}
+    now = datetime.now().isoformat(timespec="seconds")
+
+    for raw in READERS[fmt](source, chunk_rows):
+        first_row = report['read']
+        frame, letters = normalize_frame(raw, first_row)
+        report['read'] += len(frame)
+        valid, option_count, answer_index, reasons = validate_frame(frame, letters)
+
+        if not valid.all():
+            rejected = ~valid
+            report['rejected'] += int(rejected.sum())
+            labels, counts = np.unique(reasons[rejected], return_counts=True)
+            for label, count in zip(labels, counts):
+                report['reject_reasons'][label] = report['reject_reasons'].get(label, 0) + int(count)
+            room = REJECT_SAMPLE_SIZE - len(report['reject_samples'])
+            for position in np.flatnonzero(rejected)[:max(0, room)]:
+                report['reject_samples'].append({'row': first_row + int(position) + 1,
+                                                 'reason': reasons[position],
+                                                 'question': frame['question'].iat[position][:100]})
+            frame, option_count, answer_index = frame[valid], option_count[valid], answer_index[valid]
+
+        keys = _dedupe_keys(frame, letters, option_count)
+        first_seen = ~pd.Index(keys).duplicated()
+        report['duplicate_in_file'] += int((~first_seen).sum())
+        in_bank = np.isin(keys, np.fromiter(bank.existing_keys(keys[first_seen].tolist()), dtype=np.int64))
+        report['duplicate_in_bank'] += int((in_bank & first_seen).sum())
+        keep = first_seen & ~in_bank
+
+        if keep.any():
+            frame, option_count, answer_index, keys = frame[keep], option_count[keep], answer_index[keep], keys[keep]
+            options_json = [json.dumps(row[:count].tolist(), ensure_ascii=False)
+                            for row, count in zip(frame[letters].to_numpy(), option_count)]
+            answers = np.where(answer_index >= 0, frame['answer'].str.upper().str.strip('().: ').to_numpy(), None)
+            topics = frame['topic'].where(frame['topic'].ne(''), 'General')
+            difficulties = frame['difficulty'].str.capitalize().where(frame['difficulty'].ne(''), 'Medium')
+            sources = frame['source'].where(frame['source'].ne(''), default_source)
+            rand_keys = [random.randrange(RAND_RANGE) for _ in range(len(frame))]
+            rows = list(zip(frame['question'], options_json, answers, frame['explanation'], topics,
+                            difficulties, sources, (answer_index >= 0).astype(int).tolist(), rand_keys,
+                            [now] * len(frame), keys.tolist()))
+            bank.insert_rows(rows)
+            report['imported'] += len(rows)
+        if progress:
+            progress(report['read'])
+    return report
@@ -0,0 +1,94 @@
+"""Compact, immutable question record used by the bank, sessions and reports"""
+import hashlib
+import sys
+from dataclasses import asdict, dataclass
+
+
+def letter_to_index(letter):
+    """'A' -> 0, 'b' -> 1; missing or non-letter answers -> -1"""
+    if not letter:
+        return -1
+    index = ord(letter[0].upper()) - 65
+    return index if 0 <= index < 26 else -1
+
+
+def index_to_letter(index):
+    return chr(65 + index) if index is not None and index >= 0 else None
+
+
+# Joins question and options before normalising; not whitespace, so it survives
+KEY_SEPARATOR = ' \x00 '
+
+
+def normalize_text(text):
+    """Case- and whitespace-insensitive form of question or option text"""
+    return ' '.join(text.casefold().split())
+
+
+def text_key(normalized):
+    """Signed 64-bit hash of already-normalised text, small enough for an SQLite INTEGER"""
+    digest = hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def dedupe_key(question, options):
+    """Key shared by questions that differ only in case or spacing"""
+    return text_key(normalize_text(KEY_SEPARATOR.join((question, *options))))
+
+
+@dataclass(frozen=True, slots=True)
+class Question:
+    id: object
+    question: str
+    options: tuple
+    correct_index: int = -1
+    explanation: str = ''
+    topic: str = 'General'
+    difficulty: str = 'Medium'
+    source: str = None
+
+    def __post_init__(self):
+        # A few distinct topic/difficulty values are repeated across the whole
+        # bank; interning makes every record point at the same string object.
+        object.__setattr__(self, 'topic', sys.intern(self.topic or 'General'))
+        object.__setattr__(self, 'difficulty', sys.intern(self.difficulty or 'Medium'))
+        if not isinstance(self.options, tuple):
+            object.__setattr__(self, 'options', tuple(self.options))
+
+    @classmethod
+    def from_dict(cls, data, question_id=None):
+        if 'correct_index' in data:
+            correct_index = data['correct_index']
+        else:
+            correct_index = letter_to_index(data.get('correct_answer'))
+        return cls(
+            id=question_id if question_id is not None else data.get('id'),
+            question=data['question'],
+            options=tuple(data.get('options') or ()),
+            correct_index=correct_index,
+            explanation=data.get('explanation') or '',
+            topic=data.get('topic') or 'General',
+            difficulty=data.get('difficulty') or 'Medium',
+            source=data.get('source'),
+        )
+
+    def to_dict(self):
+        data = asdict(self)
+        data['options'] = list(self.options)
+        data['correct_answer'] = self.correct_answer
+        del data['correct_index']
+        return data
+
+    @property
+    def correct_answer(self):
+        """Answer letter, for display and for the letter-based file formats"""
+        return index_to_letter(self.correct_index)
+
+    @property
+    def correct_option(self):
+        if 0 <= self.correct_index < len(self.options):
+            return self.options[self.correct_index]
+        return None
+
+    def is_correct(self, option_index):
+        return self.correct_index >= 0 and option_index == self.correct_index
@@ -0,0 +1,106 @@
+"""Single-pass, line-oriented question parser.
+
+Questions are blocks of non-blank lines separated by blank lines: the
+first line is the question, lines like ``A. ...`` are options and a line
+mentioning "answer" carries the correct letter. The parser walks a stream
+of lines once, keeping only the block being built, so it can run over a
+generator of PDF pages without materialising the whole document.
+"""
+import re
+
+# A block is only considered if its first line looks like a question
+QUESTION_START = re.compile(r'(?:Q\.?|Question|\d+\.|\(?\d+\)?)', re.IGNORECASE)
+ANSWER_LETTER = re.compile(r'[A-D]', re.IGNORECASE)
+OPTION_LETTERS = frozenset('ABCDabcd')
+
+MIN_BLOCK_LINES = 3  # question + 2 options
+MIN_OPTIONS = 2
+
+
+def is_question_line(line):
+    return bool(QUESTION_START.match(line)) or '?' in line or 'which' in line.lower()
+
+
+def is_option_line(line):
+    return len(line) > 1 and line[1] == '.' and line[0] in OPTION_LETTERS
+
+
+class _Block:
+    __slots__ = ('question', 'options', 'answer_line', 'line_count', 'wanted')
+
+    def __init__(self, first_line, wanted):
+        self.question = first_line
+        self.options = []
+        self.answer_line = None
+        self.line_count = 1
+        self.wanted = wanted
+
+    def add(self, line):
+        self.line_count += 1
+        if self.wanted:
+            if is_option_line(line):
+                self.options.append(line)
+            elif 'answer' in line.lower():
+                self.answer_line = line
+
+    def to_question(self):
+        if not self.wanted or self.line_count < MIN_BLOCK_LINES or len(self.options) < MIN_OPTIONS:
+            return None
+        correct_answer = None
+        if self.answer_line:
+            match = ANSWER_LETTER.search(self.answer_line)
+            if match:
+                correct_answer = match.group().upper()
+        return {
+            'question': self.question,
+            'options': self.options,
+            'correct_answer': correct_answer,
+            'explanation': 'Auto-extracted from PDF'
+        }
+
+
+def iter_questions(lines):
+    """Yield question dicts from an iterable of lines as each block closes"""
+    block = None
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            if block is not None:
+                question = block.to_question()
+                if question:
+                    yield question
+                block = None
+        elif block is None:
+            block = _Block(line, is_question_line(line))
+        else:
+            block.add(line)
+    if block is not None:
+        question = block.to_question()
+        if question:
+            yield question
+
+
+def iter_page_lines(pages):
+    """Lines of page texts joined the way the extractor joins them.
+
+    A block that runs off the bottom of one page carries on into the
+    next, because no blank line is inserted between pages.
+    """
+    for page_text in pages:
+        if page_text:
+            yield from page_text.split('\n')
+
+
+def parse_questions(text):
+    return list(iter_questions(text.split('\n')))
+
+
+def parse_block(block):
+    """Parse one question block, ignoring the question-start heuristic"""
+    lines = [line for line in block.split('\n') if line.strip()]
+    if not lines:
+        return None
+    parsed = _Block(lines[0].strip(), True)
+    for line in lines[1:]:
+        parsed.add(line.strip())
+    return parsed.to_question()
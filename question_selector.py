@@ -0,0 +1,287 @@
+"""Adaptive practice question selection over the whole question bank.
+
+Every user has a weight per answerable bank question. Unseen questions
+weigh NEW_WEIGHT; seen ones move through Leitner boxes (a wrong answer
+sends a question back to box 0, each right answer in a row moves it up a
+box, and higher boxes come up less often), scaled up by how often the
+user has got the question wrong.
+
+The weights sit in a Fenwick tree over the bank, ordered so that each
+(topic, difficulty) pair is one contiguous cell with a running total.
+Drawing ``count`` questions without replacement costs
+O(count * (cells + log n)) and recording an answer O(log n), so starting
+a session does not depend on the size of the bank. Weights are rebuilt
+from the practice history when a user is first seen in this process.
+When the bank changes the index is rebuilt, and every cached user's
+counts move onto it by question id.
+"""
+import itertools
+import random
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+NEW_WEIGHT = 1.0
+# Weight by Leitner box, i.e. right answers in a row; the last box holds everything beyond it
+BOX_WEIGHTS = np.array([4.0, 0.5, 0.25, 0.12, 0.06])
+# How much a question's (smoothed) wrong-answer rate multiplies its weight
+WEAKNESS_WEIGHT = 2.0
+# Users whose weights are kept in memory, least recently used dropped first
+MAX_USERS = 32
+
+
+def question_weights(attempts, wrong, streak):
+    """Selection weights from per-question attempt counts, wrong answers and right answers in a row"""
+    box = np.minimum(streak, len(BOX_WEIGHTS) - 1)
+    weakness = 1 + WEAKNESS_WEIGHT * wrong / (attempts + 1)
+    return np.where(attempts > 0, BOX_WEIGHTS[box] * weakness, NEW_WEIGHT)
+
+
+class FenwickTree:
+    """Prefix sums over float weights with O(log n) point updates and weighted search"""
+
+    def __init__(self, weights):
+        size = len(weights)
+        tree = np.zeros(size + 1)
+        tree[1:] = weights
+        # Built a level at a time: the nodes of one level all have distinct parents
+        step = 1
+        while step <= size:
+            children = np.arange(step, size - step + 1, 2 * step)
+            tree[children + step] += tree[children]
+            step *= 2
+        self.size = size
+        self.tree = tree
+        self._top = 1 << (size.bit_length() - 1) if size else 0
+
+    def add(self, index, delta):
+        tree = self.tree
+        i = index + 1
+        while i <= self.size:
+            tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index):
+        """Sum of the first ``index`` weights"""
+        tree = self.tree
+        total = 0.0
+        i = index
+        while i > 0:
+            total += tree[i]
+            i &= i - 1
+        return total
+
+    def search(self, target):
+        """Index of the weight whose cumulative range contains ``target``"""
+        tree = self.tree
+        position = 0
+        step = self._top
+        while step:
+            following = position + step
+            if following <= self.size and tree[following] <= target:
+                position = following
+                target -= tree[following]
+            step >>= 1
+        return position
+
+
+class BankIndex:
+    """Answerable bank questions, ordered so each (topic, difficulty) pair is one contiguous cell"""
+
+    def __init__(self, rows, revision):
+        self.revision = revision
+        count = len(rows)
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+        topics = sorted({row[1] for row in rows})
+        difficulties = sorted({row[2] for row in rows})
+        topic_codes = {topic: code for code, topic in enumerate(topics)}
+        difficulty_codes = {difficulty: code for code, difficulty in enumerate(difficulties)}
+        keys = np.fromiter((topic_codes[row[1]] * len(difficulties) + difficulty_codes[row[2]] for row in rows),
+                           dtype=np.int64, count=count)
+        order = np.argsort(keys, kind='stable')
+        self.ids = ids[order]
+        cell_keys, starts, sizes = np.unique(keys[order], return_index=True, return_counts=True)
+        self.cells = [(topics[key // len(difficulties)], difficulties[key % len(difficulties)])
+                      for key in cell_keys.tolist()]
+        self.cell_starts = starts
+        self.cell_stops = starts + sizes
+        self.cell_of = np.repeat(np.arange(len(self.cells)), sizes)
+        # Rows come in id order, so positions by id are a binary search away
+        self._by_id = np.argsort(self.ids)
+        self._sorted_ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, question_ids):
+        """Index positions of the given bank ids; ids not in the index are dropped"""
+        question_ids = np.asarray(question_ids, dtype=np.int64)
+        found = np.searchsorted(self._sorted_ids, question_ids)
+        found = np.minimum(found, max(len(self.ids) - 1, 0))
+        hit = (self._sorted_ids[found] == question_ids) if len(self.ids) else np.zeros(len(question_ids), bool)
+        return self._by_id[found[hit]], hit
+
+    def matching_cells(self, topic=None, difficulty=None):
+        return np.array([cell for cell, (cell_topic, cell_difficulty) in enumerate(self.cells)
+                         if topic in (None, cell_topic) and difficulty in (None, cell_difficulty)], dtype=np.int64)
+
+
+class UserWeights:
+    """One user's attempt counts and selection weights over a BankIndex.
+
+    The counts come from past ``attempts``, or from ``previous`` weights over
+    an older index of the same bank, matched by question id.
+    """
+
+    def __init__(self, index, attempts=None, previous=None):
+        size = len(index)
+        self.index = index
+        self.attempts = np.zeros(size, dtype=np.int32)
+        self.wrong = np.zeros(size, dtype=np.int32)
+        self.streak = np.zeros(size, dtype=np.int32)
+        if previous is not None:
+            self._carry_over(previous)
+        if attempts is not None:
+            self._fold(attempts)
+        self.weights = question_weights(self.attempts, self.wrong, self.streak).astype(np.float64)
+        self.tree = FenwickTree(self.weights)
+        self.cell_totals = np.bincount(index.cell_of, weights=self.weights, minlength=len(index.cells))
+        self.lock = threading.Lock()
+
+    def _fold(self, attempts):
+        """Counts from past attempts (an ATTEMPT_DTYPE array in chronological order)"""
+        attempts = attempts[(attempts['question_id'] >= 0) & (attempts['chosen'] >= 0)]
+        positions, hit = self.index.positions(attempts['question_id'])
+        if not len(positions):
+            return
+        correct = attempts['correct'][hit]
+        # A stable sort groups each question's attempts and keeps them in order
+        order = np.argsort(positions, kind='stable')
+        positions, correct = positions[order], correct[order]
+        starts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]])
+        stops = np.r_[starts[1:], len(positions)]
+        questions = positions[starts]
+        self.attempts[questions] = stops - starts
+        self.wrong[questions] = np.add.reduceat((~correct).astype(np.int32), starts)
+        last_wrong = np.maximum.reduceat(np.where(correct, -1, np.arange(len(correct))), starts)
+        self.streak[questions] = stops - 1 - np.maximum(last_wrong, starts - 1)
+
+    def _carry_over(self, previous):
+        with previous.lock:
+            positions, hit = self.index.positions(previous.index.ids)
+            self.attempts[positions] = previous.attempts[hit]
+            self.wrong[positions] = previous.wrong[hit]
+            self.streak[positions] = previous.streak[hit]
+
+    def _set(self, position, weight):
+        delta = weight - self.weights[position]
+        self.weights[position] = weight
+        self.tree.add(position, delta)
+        self.cell_totals[self.index.cell_of[position]] += delta
+
+    def record(self, position, correct):
+        with self.lock:
+            self.attempts[position] += 1
+            if correct:
+                self.streak[position] += 1
+            else:
+                self.wrong[position] += 1
+                self.streak[position] = 0
+            weight = question_weights(self.attempts[position], self.wrong[position], self.streak[position])
+            self._set(position, float(weight))
+
+    def draw(self, cells, count, rng):
+        """Positions of up to ``count`` distinct questions from ``cells``, drawn by weight"""
+        index = self.index
+        picked = []
+        with self.lock:
+            try:
+                for _ in range(2 * count):
+                    if len(picked) >= count:
+                        break
+                    totals = np.cumsum(self.cell_totals[cells])
+                    if not len(totals) or totals[-1] <= 0:
+                        break
+                    choice = min(int(np.searchsorted(totals, rng.random() * totals[-1], side='right')),
+                                 len(cells) - 1)
+                    cell = cells[choice]
+                    start, stop = index.cell_starts[cell], index.cell_stops[cell]
+                    target = self.tree.prefix(start) + rng.random() * self.cell_totals[cell]
+                    position = min(max(self.tree.search(target), start), stop - 1)
+                    if self.weights[position] <= 0:
+                        # Rounding left a sliver of weight in the tree; pick directly in the cell
+                        remaining = np.flatnonzero(self.weights[start:stop] > 0)
+                        if not len(remaining):
+                            self.cell_totals[cell] = 0.0
+                            continue
+                        position = start + int(remaining[rng.randrange(len(remaining))])
+                    picked.append((position, self.weights[position]))
+                    # Zeroed until the draw is over, so nothing is picked twice
+                    self._set(position, 0.0)
+            finally:
+                for position, weight in picked:
+                    self._set(position, weight)
+        return [position for position, _ in picked]
+
+
+class QuestionSelector:
+    """Per-user weighted sampling of practice questions, shared by every session in the process"""
+
+    def __init__(self, bank, history, max_users=MAX_USERS):
+        self.bank = bank
+        self.history = history
+        self.max_users = max_users
+        self._index = None
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _user_weights(self, user_id):
+        """``user_id``'s weights over the current bank; call with the lock held"""
+        revision = self.bank.revision
+        if self._index is None or self._index.revision != revision:
+            self._index = BankIndex(self.bank.answerable_rows(), revision)
+            for cached_id, previous in list(self._users.items()):
+                self._users[cached_id] = UserWeights(self._index, previous=previous)
+        weights = self._users.get(user_id)
+        if weights is None:
+            weights = self._users[user_id] = UserWeights(self._index, self.history.attempts(user_id))
+            if len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return weights
+
+    def select(self, user_id, count, topic=None, difficulty=None, rng=None):
+        """Ids of up to ``count`` distinct answerable bank questions, weighted for ``user_id``"""
+        with self._lock:
+            weights = self._user_weights(user_id)
+        cells = weights.index.matching_cells(topic, difficulty)
+        positions = weights.draw(cells, count, rng or random)
+        return weights.index.ids[positions].tolist()
+
+    def record_session(self, user_id, result, questions):
+        """Update the weights with a finished session's answers, the same ones the history stores.
+
+        Call it before PracticeHistoryStore.record_session: weights that aren't
+        cached yet are built from the history and would count the session twice.
+        """
+        answers = result['answers']
+        answered = [(question.id, question.is_correct(answers[i])) for i, question in enumerate(questions)
+                    if answers.get(i) is not None and isinstance(question.id, int)]
+        if not answered:
+            return
+        with self._lock:
+            weights = self._user_weights(user_id)
+            positions, hit = weights.index.positions([question_id for question_id, _ in answered])
+            for position, (_, correct) in zip(positions.tolist(), itertools.compress(answered, hit)):
+                weights.record(position, correct)
+
+    def nbytes(self):
+        with self._lock:
+            users = list(self._users.values())
+        arrays = [array for weights in users
+                  for array in (weights.attempts, weights.wrong, weights.streak, weights.weights, weights.tree.tree)]
+        if self._index is not None:
+            arrays += [self._index.ids, self._index.cell_of, self._index._by_id, self._index._sorted_ids]
+        return sum(array.nbytes for array in arrays)
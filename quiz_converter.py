@@ -0,0 +1,245 @@
+"""PDF to quiz conversion without Streamlit: a library API and a command line.
+
+Library use::
+
+    from quiz_converter import PDFQuizConverter
+    result = PDFQuizConverter().convert("paper.pdf")
+    result.questions  # list of question dicts
+
+Command line: convert every PDF under a directory to JSONL or Parquet,
+one output file per PDF, using every core. Finished files are recorded in
+a manifest in the output directory, so an interrupted run picks up where
+it left off::
+
+    python quiz_converter.py papers/ -o questions/ --format parquet
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from extraction_cache import ExtractionCache
+from pdf_engine import BACKENDS, PDFTextExtractor, read_pdf_bytes
+from question_export import EXPORT_FORMATS, export_questions
+from question_parser import iter_page_lines, iter_questions, parse_block
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.jsonl"
+
+ConversionResult = namedtuple('ConversionResult', ['questions', 'text', 'pages'])
+
+
+class PDFQuizConverter:
+    # Bump whenever extraction or parsing output changes, so cached results are not reused
+    PARSER_VERSION = 2
+
+    def __init__(self, workers=None, backend='pypdf2', fallback='pdfplumber'):
+        self.extractor = PDFTextExtractor(workers=workers, backend=backend, fallback=fallback)
+
+    def cache_version(self):
+        """Parser version plus backend setup, so each setup caches separately"""
+        return f"{self.PARSER_VERSION}-{self.extractor.describe()}"
+
+    def iter_pdf_pages(self, pdf_file, progress=None):
+        """Yield (page_number, text) for each page, in order"""
+        return self.extractor.iter_pages(pdf_file, progress)
+
+    def extract_text_from_pdf(self, pdf_file, progress=None):
+        """Extract text from searchable PDF; errors are logged and give ''"""
+        text = ""
+        try:
+            text = self.extractor.extract_text(pdf_file, progress)
+        except Exception:
+            logger.exception("PDF processing error")
+        return text
+
+    def parse_question_block(self, block):
+        """Parse individual question block in your specific format"""
+        return parse_block(block)
+
+    def smart_question_parser(self, source):
+        """Advanced parser for your specific PDF format.
+
+        Yields each question as soon as its block is complete. ``source`` is
+        either the full text or an iterable of page texts.
+        """
+        lines = source.split('\n') if isinstance(source, str) else iter_page_lines(source)
+        return iter_questions(lines)
+
+    def convert(self, pdf_file, progress=None, cache=None):
+        """Extract and parse a whole PDF (path, bytes or file object).
+
+        With an ExtractionCache, a PDF already converted with the same setup
+        is returned from the cache and new results are stored in it.
+        Extraction errors propagate to the caller.
+        """
+        pdf_bytes = read_pdf_bytes(pdf_file)
+        cache_key = ExtractionCache.make_key(pdf_bytes, self.cache_version()) if cache else None
+        if cache_key:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return ConversionResult(cached['questions'], cached['text'], cached.get('pages', []))
+
+        page_texts = []
+
+        def collect_pages():
+            for _, page_text in self.iter_pdf_pages(pdf_bytes, progress):
+                page_texts.append(page_text)
+                yield page_text
+
+        questions = list(self.smart_question_parser(collect_pages()))
+        text = "".join(page_text + "\n" for page_text in page_texts if page_text)
+        pages = self.extractor.page_report()
+        if cache_key and text:
+            cache.put(cache_key, text, questions, pages)
+        return ConversionResult(questions, text, pages)
+
+
+# Command line
+
+def _output_path(output_dir, relative_path, fmt):
+    stem = os.path.splitext(relative_path)[0].replace(os.sep, "__")
+    return os.path.join(output_dir, f"{stem}.{EXPORT_FORMATS[fmt][1]}")
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_size, int(stat.st_mtime)
+
+
+def find_pdfs(input_dir):
+    """Relative paths of every .pdf under ``input_dir``, sorted"""
+    found = []
+    for root, _, files in os.walk(input_dir):
+        for name in files:
+            if name.lower().endswith(".pdf"):
+                found.append(os.path.relpath(os.path.join(root, name), input_dir))
+    return sorted(found)
+
+
+def load_manifest(output_dir):
+    """{relative path: entry} for files finished by earlier runs"""
+    done = {}
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                done[entry['file']] = entry
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def convert_file(input_dir, relative_path, output_dir, fmt, backend, fallback):
+    """Convert one PDF and write its output file; returns the manifest entry.
+
+    Runs in a worker process. Pages are extracted serially here because
+    the parallelism is across files.
+    """
+    path = os.path.join(input_dir, relative_path)
+    size, mtime = _file_signature(path)
+    start = time.perf_counter()
+    result = PDFQuizConverter(workers=1, backend=backend, fallback=fallback).convert(path)
+    for question in result.questions:
+        question['source'] = relative_path
+    out_path = _output_path(output_dir, relative_path, fmt)
+    tmp_path = out_path + ".tmp"
+    # Written under a temporary name so an interrupted run never leaves a partial file
+    with open(tmp_path, "wb") as sink:
+        export_questions(result.questions, fmt, sink)
+    os.replace(tmp_path, out_path)
+    return {
+        'file': relative_path,
+        'size': size,
+        'mtime': mtime,
+        'output': os.path.basename(out_path),
+        'pages': len(result.pages),
+        'questions': len(result.questions),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def convert_directory(input_dir, output_dir, fmt='jsonl', workers=None, backend='pypdf2',
+                      fallback='pdfplumber', force=False, report=print):
+    """Convert every PDF under ``input_dir``; returns (new manifest entries, failures).
+
+    Files already in the manifest with the same size and mtime are skipped
+    unless ``force`` is set. ``report`` receives one line per file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    done = {} if force else load_manifest(output_dir)
+    all_pdfs = find_pdfs(input_dir)
+    pending = []
+    for relative_path in all_pdfs:
+        entry = done.get(relative_path)
+        size, mtime = _file_signature(os.path.join(input_dir, relative_path))
+        if entry and (entry['size'], entry['mtime']) == (size, mtime) and \
+                os.path.exists(os.path.join(output_dir, entry['output'])):
+            continue
+        pending.append(relative_path)
+    report(f"{len(pending)} PDFs to convert, {len(all_pdfs) - len(pending)} already done")
+    entries = []
+    failures = []
+    if not pending:
+        return entries, failures
+
+    start = time.perf_counter()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending)))
+    with ProcessPoolExecutor(max_workers=workers) as pool, \
+            open(os.path.join(output_dir, MANIFEST_NAME), "a", encoding="utf-8") as manifest:
+        futures = {pool.submit(convert_file, input_dir, relative_path, output_dir, fmt, backend, fallback):
+                   relative_path for relative_path in pending}
+        for future in as_completed(futures):
+            relative_path = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                failures.append((relative_path, str(e)))
+                report(f"FAILED {relative_path}: {e}")
+                continue
+            # One flushed line per file: the manifest is the resume point
+            manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            manifest.flush()
+            entries.append(entry)
+            seconds = max(entry['seconds'], 1e-9)
+            report(f"{relative_path}: {entry['pages']} pages, {entry['questions']} questions in "
+                   f"{entry['seconds']:.2f}s ({entry['pages'] / seconds:.1f} pages/s, "
+                   f"{entry['questions'] / seconds:.1f} questions/s)")
+
+    elapsed = time.perf_counter() - start
+    pages = sum(entry['pages'] for entry in entries)
+    questions = sum(entry['questions'] for entry in entries)
+    report(f"Converted {len(entries)} PDFs ({len(failures)} failed) with {workers} workers in {elapsed:.2f}s: "
+           f"{pages} pages, {questions} questions, {pages / max(elapsed, 1e-9):.1f} pages/s overall")
+    return entries, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert a directory of question PDFs to JSONL or Parquet.")
+    parser.add_argument("input_dir", help="Directory searched recursively for .pdf files")
+    parser.add_argument("-o", "--output-dir", required=True)
+    parser.add_argument("-f", "--format", choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--backend", choices=list(BACKENDS), default='pypdf2')
+    parser.add_argument("--no-fallback", action="store_true", help="Don't re-read poor pages with pdfplumber")
+    parser.add_argument("--force", action="store_true", help="Convert files already in the manifest again")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.input_dir):
+        parser.error(f"not a directory: {args.input_dir}")
+    fallback = None if args.no_fallback or args.backend == 'pdfplumber' else 'pdfplumber'
+    _, failures = convert_directory(args.input_dir, args.output_dir, args.format, args.workers, args.backend,
+                                    fallback, args.force, report=lambda line: print(line, flush=True))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
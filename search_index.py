@@ -0,0 +1,175 @@
+"""Keyword and fuzzy search over question text with inverted n-gram indexes.
+
+Text is split into terms much as SQLite FTS5's default tokenizer does it
+(case-folded runs of letters and digits). Every term is indexed by its
+character trigrams, so a misspelt query word finds the vocabulary terms
+it most resembles (Dice similarity of their trigram sets), and those
+terms find the questions through an inverted term index.
+
+The question bank already keeps term -> question postings in FTS5, so
+``BankSearch`` only adds a trigram index over the bank's vocabulary and
+turns each query word into an OR of its closest terms. ``NgramIndex``
+holds both layers in memory, for small sets such as a session's
+bookmarks.
+"""
+import heapq
+import re
+import threading
+from collections import Counter, defaultdict
+
+TERM_PATTERN = re.compile(r"[^\W_]+")
+NGRAM_SIZE = 3
+# Vocabulary terms at least this similar to a query word also match it
+MIN_SIMILARITY = 0.5
+# Closest vocabulary terms tried per query word
+MAX_EXPANSIONS = 8
+
+
+def terms(text):
+    return TERM_PATTERN.findall(text.casefold())
+
+
+def ngrams(term):
+    """Character n-grams of a term, padded so short terms and word edges count"""
+    padded = f" {term} "
+    return {padded[i:i + NGRAM_SIZE] for i in range(max(1, len(padded) - NGRAM_SIZE + 1))}
+
+
+def question_text(question):
+    """What search sees of a question: its text and options"""
+    return " ".join((question.question, *question.options))
+
+
+class TermMatcher:
+    """Trigram index over a vocabulary, for finding the terms closest to a misspelt word"""
+
+    def __init__(self, vocabulary=()):
+        # Lists rather than sets: a large vocabulary takes a fraction of the memory, and
+        # terms are only ever removed from the small indexes
+        self._grams = defaultdict(list)
+        self._sizes = {}
+        for term in vocabulary:
+            self.add(term)
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def __contains__(self, term):
+        return term in self._sizes
+
+    def add(self, term):
+        if term in self._sizes:
+            return
+        grams = ngrams(term)
+        self._sizes[term] = len(grams)
+        for gram in grams:
+            self._grams[gram].append(term)
+
+    def discard(self, term):
+        if self._sizes.pop(term, None) is None:
+            return
+        for gram in ngrams(term):
+            holders = self._grams[gram]
+            holders.remove(term)
+            if not holders:
+                del self._grams[gram]
+
+    def similar(self, word, limit=MAX_EXPANSIONS, threshold=MIN_SIMILARITY):
+        """(term, similarity) of the closest terms, best first; the word itself scores 1.0"""
+        grams = ngrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        scored = []
+        for term, common in shared.items():
+            similarity = 2 * common / (len(grams) + self._sizes[term])
+            if similarity >= threshold:
+                scored.append((similarity, term))
+        return [(term, similarity) for similarity, term in heapq.nlargest(limit, scored)]
+
+
+class NgramIndex:
+    """In-memory inverted index of documents by term, with fuzzy term lookup"""
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._document_terms = {}
+        self.matcher = TermMatcher()
+
+    def __len__(self):
+        return len(self._document_terms)
+
+    def __contains__(self, key):
+        return key in self._document_terms
+
+    def add(self, key, text):
+        """Index (or re-index) ``text`` under ``key``"""
+        self.remove(key)
+        document_terms = frozenset(terms(text))
+        self._document_terms[key] = document_terms
+        for term in document_terms:
+            self._postings[term].add(key)
+            self.matcher.add(term)
+
+    def remove(self, key):
+        for term in self._document_terms.pop(key, ()):
+            keys = self._postings[term]
+            keys.discard(key)
+            if not keys:
+                del self._postings[term]
+                self.matcher.discard(term)
+
+    def search(self, query, fuzzy=True):
+        """Keys of the documents matching every query word, best matches first"""
+        scores = None
+        for word in terms(query):
+            if fuzzy:
+                matches = self.matcher.similar(word)
+            else:
+                matches = [(word, 1.0)] if word in self._postings else []
+            word_scores = {}
+            for term, similarity in matches:
+                for key in self._postings[term]:
+                    if similarity > word_scores.get(key, 0.0):
+                        word_scores[key] = similarity
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {key: score + word_scores[key] for key, score in scores.items() if key in word_scores}
+            if not scores:
+                return []
+        return sorted(scores, key=scores.get, reverse=True) if scores else []
+
+
+class BankSearch:
+    """Paginated keyword and fuzzy search over a QuestionBank, shared by every session"""
+
+    def __init__(self, bank):
+        self.bank = bank
+        self._matcher = None
+        self._revision = None
+        self._lock = threading.Lock()
+
+    def vocabulary(self):
+        """Trigram index of the bank's terms, rebuilt after the bank changes"""
+        with self._lock:
+            revision = self.bank.revision
+            if self._matcher is None or self._revision != revision:
+                self._matcher = TermMatcher(self.bank.vocabulary())
+                self._revision = revision
+            return self._matcher
+
+    def expand(self, query, fuzzy=True):
+        """One group of alternative terms per query word"""
+        words = terms(query)
+        if not fuzzy:
+            return [[word] for word in words]
+        matcher = self.vocabulary()
+        return [[term for term, _ in matcher.similar(word)] or [word] for word in words]
+
+    def search(self, query, page=1, page_size=20, fuzzy=True):
+        """(total matches, questions on ``page``), best matches first"""
+        groups = self.expand(query, fuzzy)
+        if not groups:
+            return 0, []
+        return self.bank.match_count(groups), self.bank.match(groups, page_size, (page - 1) * page_size)
@@ -0,0 +1,269 @@
+"""Process-wide, read-only question objects shared by every session.
+
+Sessions never hold their own copies of questions. They keep lists of
+question ids and resolve them through one ``SharedQuestionStore`` per
+server process. Anything a session changes (edits, notes, bookmarks)
+lives in a small ``SessionOverlay`` keyed by the same ids.
+
+The store keeps about ``MAX_SHARED_QUESTIONS`` questions. Past that, the
+least recently used bank questions that no live session references are
+evicted; they load from the bank again when next asked for.
+"""
+import hashlib
+import itertools
+import json
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import fields, replace
+
+from question_model import Question
+from search_index import NgramIndex, question_text
+
+QUESTION_FIELDS = frozenset(field.name for field in fields(Question))
+# Topic and difficulty of a stand-in for a question deleted from the bank
+REMOVED_LABEL = "Removed"
+# Bank questions kept in memory before unreferenced ones are evicted
+MAX_SHARED_QUESTIONS = 20000
+
+
+def _deep_size(question):
+    # Topic and difficulty are interned and shared, so they aren't counted
+    size = sys.getsizeof(question) + sys.getsizeof(question.question) + sys.getsizeof(question.explanation)
+    size += sys.getsizeof(question.options) + sum(sys.getsizeof(option) for option in question.options)
+    return size
+
+
+def content_id(question):
+    """Stable id for a question that isn't in the bank, from its content"""
+    payload = json.dumps([question['question'], list(question['options']), question.get('correct_answer')],
+                         ensure_ascii=False)
+    # 15 hex digits (60 bits), so the practice history can store it as an integer
+    return "h:" + hashlib.sha1(payload.encode("utf-8")).hexdigest()[:15]
+
+
+def removed_question(question_id):
+    """Stand-in for a bank question deleted after a session took its id; never counts as correct"""
+    return Question(question_id, "[This question has been removed from the question bank]", (),
+                    topic=REMOVED_LABEL, difficulty=REMOVED_LABEL)
+
+
+def freeze_question(question, question_id):
+    if isinstance(question, Question):
+        return question if question.id == question_id else replace(question, id=question_id)
+    return Question.from_dict(question, question_id)
+
+
+class SharedQuestionStore:
+    def __init__(self, bank, max_questions=MAX_SHARED_QUESTIONS):
+        self.bank = bank
+        self.max_questions = max_questions
+        # Least recently used first
+        self._questions = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._overlays = weakref.WeakSet()
+        self._evict_at = max_questions
+        self.evicted = 0
+
+    def _add(self, question_id, question):
+        frozen = freeze_question(question, question_id)
+        # Another session may have won the race; keep the first object
+        frozen = self._questions.setdefault(question_id, frozen)
+        self._sizes.setdefault(question_id, _deep_size(frozen))
+        return frozen
+
+    def intern(self, question):
+        """Return the shared copy of a Question or question dict, adding it if new"""
+        if isinstance(question, Question):
+            question_id = question.id
+        else:
+            question_id = question.get('id') or content_id(question)
+        with self._lock:
+            existing = self._questions.get(question_id)
+            if existing is not None:
+                self._questions.move_to_end(question_id)
+                return existing
+            frozen = self._add(question_id, question)
+            self._evict()
+            return frozen
+
+    def intern_many(self, questions):
+        return [self.intern(q) for q in questions]
+
+    def get_many(self, ids):
+        """Shared questions for ``ids``, position for position, loading bank rows at most once.
+
+        Ids that no longer resolve (their source was deleted or replaced) give None.
+        """
+        with self._lock:
+            missing = [i for i in ids if i not in self._questions and isinstance(i, int)]
+            if missing:
+                for question in self.bank.get_questions(missing):
+                    self._add(question.id, question)
+            found = [self._questions.get(i) for i in ids]
+            for question_id, question in zip(ids, found):
+                if question is not None:
+                    self._questions.move_to_end(question_id)
+            self._evict()
+        return found
+
+    def get(self, question_id):
+        return self.get_many([question_id])[0]
+
+    def _evict(self):
+        """Drop least recently used bank questions no live session references; call with the lock held.
+
+        Questions from outside the bank can't be loaded again, so they stay.
+        """
+        if len(self._questions) <= self._evict_at:
+            return
+        referenced = set()
+        for overlay in list(self._overlays):
+            referenced.update(overlay.referenced_ids())
+        excess = len(self._questions) - self.max_questions
+        stale = list(itertools.islice(
+            (i for i in self._questions if isinstance(i, int) and i not in referenced), excess))
+        for question_id in stale:
+            del self._questions[question_id]
+            self._sizes.pop(question_id, None)
+        self.evicted += len(stale)
+        # If sessions reference more than max_questions, sweep again only after another tenth is added
+        self._evict_at = max(self.max_questions, len(self._questions) + self.max_questions // 10)
+
+    def drop_source(self, source):
+        """Forget bank questions from a source that was deleted or replaced"""
+        with self._lock:
+            stale = [i for i, q in self._questions.items() if isinstance(i, int) and q.source == source]
+            for question_id in stale:
+                del self._questions[question_id]
+                self._sizes.pop(question_id, None)
+
+    def register_overlay(self, overlay):
+        self._overlays.add(overlay)
+
+    def memory_report(self):
+        """Compare shared memory use with one private copy per session"""
+        overlays = list(self._overlays)
+        referenced = 0
+        per_session_copies = 0
+        overlay_bytes = 0
+        for overlay in overlays:
+            ids = overlay.referenced_ids()
+            referenced += len(ids)
+            per_session_copies += sum(self._sizes.get(i, 0) for i in ids)
+            overlay_bytes += overlay.size()
+        shared_bytes = sum(self._sizes.values())
+        return {
+            'sessions': len(overlays),
+            'shared_questions': len(self._questions),
+            'max_questions': self.max_questions,
+            'evicted': self.evicted,
+            'session_references': referenced,
+            'shared_bytes': shared_bytes,
+            'overlay_bytes': overlay_bytes,
+            'unshared_bytes': per_session_copies,
+            'saved_bytes': max(0, per_session_copies - shared_bytes - overlay_bytes),
+        }
+
+
+class SessionOverlay:
+    """Copy-on-write, per-session layer over the shared store"""
+
+    def __init__(self, store):
+        self.store = store
+        self.edits = {}
+        self.notes = {}
+        self.bookmarks = {}
+        self.in_use = {}
+        # Search index over the bookmarks, built on the first search
+        self._bookmark_index = None
+        store.register_overlay(self)
+
+    def resolve(self, ids):
+        """Shared questions for ``ids``, with this session's edits applied; None where an id is gone"""
+        questions = self.store.get_many(ids)
+        if not self.edits:
+            return questions
+        return [replace(q, **self.edits[q.id]) if q is not None and q.id in self.edits else q for q in questions]
+
+    def resolve_recorded(self, ids):
+        """Like resolve, with a removed_question stand-in for every id that is gone.
+
+        For scoring, history and reports, which must keep one question per position.
+        """
+        return [question if question is not None else removed_question(question_id)
+                for question_id, question in zip(ids, self.resolve(ids))]
+
+    def edit(self, question_id, **changes):
+        unknown = set(changes) - QUESTION_FIELDS
+        if unknown:
+            raise ValueError(f"Not question fields: {sorted(unknown)}")
+        self.edits.setdefault(question_id, {}).update(changes)
+        if question_id in self.bookmarks:
+            self._index_bookmark(question_id)
+
+    def set_note(self, question_id, note):
+        if note:
+            self.notes[question_id] = note
+        else:
+            self.notes.pop(question_id, None)
+
+    def use(self, name, ids):
+        """Record which ids a session structure (practice, exam, ...) holds"""
+        if ids:
+            self.in_use[name] = tuple(ids)
+        else:
+            self.in_use.pop(name, None)
+
+    def bookmark(self, question_id):
+        # dict keeps insertion order for display; membership is O(1)
+        if question_id in self.bookmarks:
+            return False
+        self.bookmarks[question_id] = True
+        self._index_bookmark(question_id)
+        return True
+
+    def unbookmark(self, question_id):
+        self.bookmarks.pop(question_id, None)
+        if self._bookmark_index is not None:
+            self._bookmark_index.remove(question_id)
+
+    def _index_bookmark(self, question_id):
+        if self._bookmark_index is None:
+            return
+        question = self.resolve([question_id])[0]
+        if question is not None:
+            self._bookmark_index.add(question.id, question_text(question))
+
+    def search_bookmarks(self, query, fuzzy=True):
+        """Bookmarked ids matching ``query``, best first; every bookmark for an empty query"""
+        if not query.strip():
+            return list(self.bookmarks)
+        if self._bookmark_index is None:
+            index = NgramIndex()
+            for question in self.resolve(list(self.bookmarks)):
+                if question is not None:
+                    index.add(question.id, question_text(question))
+            self._bookmark_index = index
+        return self._bookmark_index.search(query, fuzzy)
+
+    def is_bookmarked(self, question_id):
+        return question_id in self.bookmarks
+
+    def referenced_ids(self):
+        ids = set(self.bookmarks)
+        ids.update(self.edits)
+        ids.update(self.notes)
+        # The store calls this from other sessions' threads
+        for used in list(self.in_use.values()):
+            ids.update(used)
+        return ids
+
+    def size(self):
+        size = sys.getsizeof(self.edits) + sys.getsizeof(self.notes) + sys.getsizeof(self.bookmarks)
+        size += sum(sys.getsizeof(note) for note in self.notes.values())
+        size += sum(sys.getsizeof(changes) for changes in self.edits.values())
+        size += sum(sys.getsizeof(ids) for ids in self.in_use.values())
+        return size
@@ -0,0 +1,57 @@
+import hashlib
+
+import pytest
+
+from answer_grading import main
+from question_bank import QuestionBank, pdf_source
+
+PAPER = [{'question': f"Question {i}?", 'options': ['1', '2', '3'], 'correct_answer': 'B'} for i in range(3)]
+
+
+def import_pdf(bank, file_name, pdf_bytes):
+    source = pdf_source(file_name, hashlib.sha256(pdf_bytes).hexdigest())
+    bank.add_questions(PAPER, source=source)
+    return source
+
+
+@pytest.fixture
+def sheets(tmp_path):
+    path = tmp_path / "sheets.csv"
+    path.write_text("student_id,Q1,Q2,Q3\ns1,B,B,B\ns2,A,B,\n")
+    return str(path)
+
+
+def grade(tmp_path, bank, sheets, source):
+    return main([sheets, "--source", source, "--bank", bank.path, "-o", str(tmp_path / "results")])
+
+
+def test_source_is_found_by_file_name(tmp_path, sheets):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    import_pdf(bank, "paper.pdf", b"paper")
+
+    assert grade(tmp_path, bank, sheets, "paper.pdf") == 0
+    students = (tmp_path / "results" / "students.csv").read_text().splitlines()
+    assert len(students) == 3
+
+
+def test_ambiguous_file_name_lists_the_sources(tmp_path, sheets, capsys):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    first = import_pdf(bank, "paper.pdf", b"2024 paper")
+    second = import_pdf(bank, "paper.pdf", b"2025 paper")
+
+    with pytest.raises(SystemExit):
+        grade(tmp_path, bank, sheets, "paper.pdf")
+    error = capsys.readouterr().err
+    assert first in error and second in error
+
+    # The full source name picks one of them
+    assert grade(tmp_path, bank, sheets, second) == 0
+
+
+def test_unknown_source_is_an_error(tmp_path, sheets, capsys):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    import_pdf(bank, "paper.pdf", b"paper")
+
+    with pytest.raises(SystemExit):
+        grade(tmp_path, bank, sheets, "other.pdf")
+    assert "no questions from source 'other.pdf'" in capsys.readouterr().err
@@ -0,0 +1,43 @@
+import random
+
+from exam_engine import ANSWERED_MARKED, ExamSession
+
+
+def counted_statuses(session):
+    counts = dict.fromkeys(session.summary(), 0)
+    for index in range(len(session)):
+        counts[session.status(index)] += 1
+    return counts
+
+
+def test_summary_counts_each_question_under_its_palette_status():
+    session = ExamSession(list(range(6)), 600, clock=lambda: 0.0)
+    session.go_to(1)
+    session.answer(1, 2)
+    session.toggle_marked(1)
+    session.go_to(2)
+    session.toggle_marked(2)
+    session.go_to(3)
+    session.answer(3, 0)
+
+    summary = session.summary()
+    assert summary[ANSWERED_MARKED] == 1
+    assert sum(summary.values()) == len(session)
+    assert summary == counted_statuses(session)
+
+
+def test_summary_stays_consistent_through_random_actions():
+    rng = random.Random(0)
+    session = ExamSession(list(range(20)), 600, clock=lambda: 0.0)
+    for _ in range(500):
+        index = rng.randrange(len(session))
+        action = rng.choice(['go_to', 'answer', 'clear', 'mark'])
+        if action == 'go_to':
+            session.go_to(index)
+        elif action == 'answer':
+            session.answer(index, rng.randrange(4))
+        elif action == 'clear':
+            session.clear_answer(index)
+        else:
+            session.toggle_marked(index)
+        assert session.summary() == counted_statuses(session)
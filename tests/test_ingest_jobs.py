@@ -0,0 +1,63 @@
+import hashlib
+import json
+import os
+
+import ingest_jobs
+from extraction_cache import ExtractionCache
+from ingest_jobs import DONE, IngestQueue
+from question_bank import QuestionBank, pdf_source, source_label
+
+
+def finished_job(queue, file_name, pdf_bytes, questions):
+    """A job as the worker leaves it, without converting a real PDF"""
+    pdf_path = os.path.join(queue.jobs_dir, hashlib.sha256(pdf_bytes).hexdigest() + ".pdf")
+    conn = queue._conn()
+    with conn:
+        return conn.execute(
+            "INSERT INTO ingest_jobs (file_name, pdf_path, status, question_count, questions, created_at)"
+            " VALUES (?, ?, ?, ?, ?, '')", (file_name, pdf_path, DONE, len(questions), json.dumps(questions))).lastrowid
+
+
+def paper(name):
+    return [{'question': f"{name} question {i}?", 'options': ['1', '2'], 'correct_answer': 'A'} for i in range(3)]
+
+
+def test_same_file_name_from_different_pdfs_keeps_both(tmp_path):
+    bank = QuestionBank(":memory:")
+    queue = IngestQueue(bank, ExtractionCache(str(tmp_path / "cache")), jobs_dir=str(tmp_path / "jobs"))
+    finished_job(queue, "questions.pdf", b"paper one", paper("first"))
+    finished_job(queue, "questions.pdf", b"paper two", paper("second"))
+    assert queue.collect() == 6
+    assert bank.count() == 6
+
+    sources = [source for source in bank.facet_counts('source') if source]
+    assert len(sources) == 2
+    assert {source_label(source) for source in sources} == {"questions.pdf"}
+
+    # The same PDF again replaces only its own questions
+    finished_job(queue, "questions.pdf", b"paper one", paper("first again"))
+    assert queue.collect() == 3
+    assert bank.count() == 6
+    first = pdf_source("questions.pdf", hashlib.sha256(b"paper one").hexdigest())
+    assert [q.question for q in bank.iter_questions(source=first)][0] == "first again question 0?"
+
+
+def test_spool_survives_a_release_while_the_same_pdf_is_submitted(tmp_path, monkeypatch):
+    queue = IngestQueue(QuestionBank(":memory:"), ExtractionCache(str(tmp_path / "cache")),
+                        jobs_dir=str(tmp_path / "jobs"))
+    monkeypatch.setattr(queue._executor, "submit", lambda *args: None)
+    first = queue.submit("paper.pdf", b"same pdf")
+    queue._update(first, status=DONE)
+    pdf_path = os.path.join(queue.jobs_dir, hashlib.sha256(b"same pdf").hexdigest() + ".pdf")
+
+    exists = os.path.exists
+
+    def finish_first_job_meanwhile(path):
+        found = exists(path)
+        queue._release_spool(pdf_path)
+        return found
+
+    monkeypatch.setattr(ingest_jobs.os.path, "exists", finish_first_job_meanwhile)
+    queue.submit("paper.pdf", b"same pdf")
+    monkeypatch.undo()
+    assert os.path.exists(pdf_path)
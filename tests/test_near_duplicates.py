@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+
+from near_duplicates import (BANDS, NUM_PERM, SHINGLE_BYTES, SIGNATURE_BATCH, band_buckets, find_near_duplicates,
+                             signature_text, signatures, similarity)
+from question_bank import QuestionBank
+
+QUESTIONS = [
+    {'question': "What is 15% of 200?", 'options': ['15', '30', '25', '20'], 'correct_answer': 'B'},
+    {'question': "Which planet is known as the red planet?", 'options': ['Venus', 'Mars', 'Jupiter'],
+     'correct_answer': 'B'},
+]
+REWORDED = [
+    {'question': "What is 15 % of 200", 'options': ['15', '30', '25', '20']},
+    {'question': "Who wrote the play Hamlet?", 'options': ['Marlowe', 'Shakespeare', 'Jonson']},
+]
+
+
+def wait_for_signatures(bank, timeout=10):
+    deadline = time.monotonic() + timeout
+    while bank.unsigned_count() and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def test_small_inserts_are_checked_at_once(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    bank.add_questions(QUESTIONS, source="old.pdf")
+    assert bank.unsigned_count() == 0
+
+    flagged = find_near_duplicates(bank, REWORDED, source="new.pdf")
+    assert [item['position'] for item in flagged] == [0]
+    assert flagged[0]['match_question'] == QUESTIONS[0]['question']
+
+
+def test_deferred_signatures_are_filled_in_the_background(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    question = QUESTIONS[0]
+    rows = [(question['question'], '["15", "30", "25", "20"]', 'B', '', 'General', 'Medium', 'bulk.pdf', 1, 0,
+             '', None)]
+    bank.insert_rows(rows, sign=False)
+    wait_for_signatures(bank)
+
+    assert bank.unsigned_count() == 0
+    assert [item['position'] for item in find_near_duplicates(bank, REWORDED)] == [0]
+
+
+def test_backfill_leaves_questions_edited_meanwhile_alone(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    [question_id] = bank.insert_rows([(QUESTIONS[1]['question'], '["Venus", "Mars"]', 'B', '', 'General',
+                                       'Medium', 'bulk.pdf', 1, 0, '', None)], sign=False)
+    bank.update_question(question_id, question=QUESTIONS[0]['question'])
+    assert bank.backfill_signatures() == 0
+    matches = bank.similar_questions(signatures([signature_text(QUESTIONS[0]['question'], ["Venus", "Mars"])]), 0.8)
+    assert [match[0] for match in matches[0]] == [question_id]
+
+
+def shingles(text):
+    data = text.encode('utf-8').ljust(SHINGLE_BYTES)
+    return {data[i:i + SHINGLE_BYTES] for i in range(len(data) - SHINGLE_BYTES + 1)}
+
+
+def test_signatures_estimate_jaccard_similarity():
+    first = signature_text("Which river flows through the city of Cairo in Egypt?", ["Nile", "Amazon", "Danube"])
+    second = signature_text("Which river flows through Cairo, the capital of Egypt?", ["Nile", "Amazon", "Danube"])
+    rows = signatures([first, second, "", "tiny"])
+    assert rows.shape == (4, NUM_PERM) and rows.dtype == np.uint32
+
+    exact = len(shingles(first) & shingles(second)) / len(shingles(first) | shingles(second))
+    assert abs(similarity(rows[0], rows[1:2])[0] - exact) < 0.2
+    assert similarity(rows[0], rows[:1])[0] == 1.0
+
+
+def test_signatures_do_not_depend_on_batching():
+    texts = [f"question number {i} about topic {i % 7}" for i in range(SIGNATURE_BATCH * 2 + 5)]
+    together = signatures(texts)
+    assert (together == np.vstack([signatures([text]) for text in texts])).all()
+
+
+def test_band_buckets_change_only_with_their_band():
+    rows = signatures(["What is the capital of France? Paris London Rome"] * 2)
+    rows[1, 0] += 1
+    buckets = band_buckets(rows)
+    assert buckets.shape == (2, BANDS) and buckets.dtype == np.int64
+    assert buckets[0, 0] != buckets[1, 0]
+    assert (buckets[0, 1:] == buckets[1, 1:]).all()
+
+    # The band number is part of the key, so equal values in different bands don't collide
+    same_values = np.zeros((1, NUM_PERM), dtype=np.uint32)
+    assert len(set(band_buckets(same_values)[0].tolist())) == BANDS
+
+
+def test_threshold_decides_what_is_flagged(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    bank.add_questions(QUESTIONS, source="old.pdf")
+    original, reworded = QUESTIONS[0], {'question': "What is 15 percent of 200?", 'options': ['15', '30', '25', '20']}
+    rows = signatures(signature_text(q['question'], q['options']) for q in (original, reworded))
+    score = similarity(rows[1], rows[:1])[0]
+    assert 0 < score < 1
+
+    [flagged] = find_near_duplicates(bank, [reworded], threshold=score)
+    assert flagged['similarity'] == score and flagged['match'].startswith("#")
+    assert find_near_duplicates(bank, [reworded], threshold=score + 1 / NUM_PERM) == []
+    # Questions from the source being replaced are not duplicates of it
+    assert find_near_duplicates(bank, [reworded], threshold=score, source="old.pdf") == []
+
+    # Within one file the later copy is flagged against the earlier one
+    [in_file] = find_near_duplicates(bank, [original, reworded], threshold=score, source="old.pdf")
+    assert in_file['position'] == 1 and in_file['match'] == "Q1 in this file"
@@ -0,0 +1,32 @@
+import pytest
+
+from app import SAMPLE_QUESTIONS
+from practice_history import PracticeHistoryStore, decode_question_id, encode_question_id
+from question_bank import QuestionBank
+from shared_bank import SharedQuestionStore
+
+
+def test_sample_question_attempts_round_trip(tmp_path):
+    store = PracticeHistoryStore(str(tmp_path / "history.db"))
+    questions = SharedQuestionStore(QuestionBank(":memory:")).intern_many(SAMPLE_QUESTIONS)
+    result = {'date': "2026-01-01T00:00:00", 'score': 1, 'total': 2, 'total_time': 30,
+              'answers': {0: 1, 1: 0}, 'question_ms': {0: 12000, 1: 18000}}
+    session_id = store.record_session("user", result, questions)
+
+    reloaded = store.result(session_id)
+    assert reloaded['question_ids'] == tuple(q.id for q in questions)
+    assert reloaded['answers'] == {0: 1, 1: 0}
+    assert reloaded['question_ms'] == {0: 12000, 1: 18000}
+    attempts = store.attempts("user")
+    assert attempts['correct'].tolist() == [True, False]
+
+
+def test_question_ids_round_trip():
+    for question_id in (0, 7, 2 ** 40, "h:0123456789abcde", "h:fffffffffffffff"):
+        assert decode_question_id(encode_question_id(question_id)) == question_id
+
+
+@pytest.mark.parametrize("question_id", ["sample:1", -3, None])
+def test_unstorable_question_id_is_rejected(question_id):
+    with pytest.raises(ValueError):
+        encode_question_id(question_id)
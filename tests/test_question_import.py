@@ -0,0 +1,37 @@
+import io
+import json
+
+import pytest
+
+from question_bank import QuestionBank
+from question_import import import_questions
+
+
+def jsonl(rows):
+    return io.BytesIO("\n".join(json.dumps(row) for row in rows).encode())
+
+
+def test_jsonl_rows_without_options_are_rejected():
+    rows = [
+        {'question': "Two plus two?", 'options': ["3", "4", "5"], 'answer': "B"},
+        {'question': "No options here?", 'answer': "A"},
+        {'question': "Capital of France?", 'options': ["Paris", "Rome"], 'answer': "A"},
+        {'question': "Options set to null?", 'options': None},
+    ]
+    bank = QuestionBank(":memory:")
+    report = import_questions(bank, jsonl(rows), "questions.jsonl")
+
+    assert report['read'] == 4
+    assert report['imported'] == 2
+    assert report['rejected'] == 2
+    assert [sample['row'] for sample in report['reject_samples']] == [2, 4]
+    assert bank.count() == 2
+
+
+def test_malformed_options_raise_value_error_with_row():
+    rows = [
+        {'question': "Fine?", 'options': ["yes", "no"]},
+        {'question': "Broken?", 'options': "yes, no"},
+    ]
+    with pytest.raises(ValueError, match="Row 2"):
+        import_questions(QuestionBank(":memory:"), jsonl(rows), "questions.jsonl")
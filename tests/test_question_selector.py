@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+
+from practice_history import ATTEMPT_DTYPE
+from question_bank import QuestionBank
+from question_selector import BOX_WEIGHTS, NEW_WEIGHT, BankIndex, FenwickTree, QuestionSelector, UserWeights
+
+
+def attempts(*rows):
+    """(question id, correct) pairs in the order they were answered"""
+    return np.array([(1, question_id, 0, correct, 0) for question_id, correct in rows], dtype=ATTEMPT_DTYPE)
+
+
+def bank_index(revision=1, ids=range(1, 13)):
+    # Ids 1..12 over 2 topics x 2 difficulties, 3 questions per cell
+    return BankIndex([(i, ("Math", "GK")[i % 2], ("Easy", "Hard")[(i // 2) % 2]) for i in ids], revision)
+
+
+class FakeHistory:
+    def __init__(self):
+        self.rows = attempts()
+
+    def attempts(self, user_id):
+        return self.rows
+
+
+def test_fenwick_search_finds_the_weight_covering_a_target():
+    weights = [1.0, 0.0, 2.0, 3.0, 0.5]
+    tree = FenwickTree(weights)
+    assert [tree.prefix(i) for i in range(6)] == [0.0, 1.0, 1.0, 3.0, 6.0, 6.5]
+    # Zero weights cover no range, so they are never found
+    assert [tree.search(target) for target in (0.0, 0.99, 1.0, 2.99, 3.0, 5.99, 6.0, 6.49)] == [0, 0, 2, 2, 3, 3, 4, 4]
+
+    rng = np.random.default_rng(1)
+    weights = rng.random(1000) * (rng.random(1000) > 0.3)
+    tree = FenwickTree(weights)
+    tree.add(10, 5.0)
+    weights[10] += 5.0
+    cumulative = np.cumsum(weights)
+    for target in rng.random(200) * cumulative[-1]:
+        assert tree.search(target) == int(np.searchsorted(cumulative, target, side='right'))
+
+
+def test_draw_is_without_replacement_across_cells():
+    index = bank_index()
+    weights = UserWeights(index, attempts())
+    total = weights.tree.prefix(len(index))
+    every_cell = index.matching_cells()
+    assert len(every_cell) == 4
+
+    positions = weights.draw(every_cell, 8, random.Random(0))
+    assert len(positions) == len(set(positions)) == 8
+    # Asking for more than there are gives each question once
+    assert sorted(weights.draw(every_cell, 50, random.Random(1))) == list(range(len(index)))
+    # Weights drawn are put back afterwards
+    assert weights.tree.prefix(len(index)) == total
+    assert np.allclose(weights.cell_totals, np.bincount(index.cell_of, weights=weights.weights))
+
+    math = index.matching_cells(topic="Math")
+    picked = weights.draw(math, 50, random.Random(2))
+    assert len(picked) == 6 and {index.cells[index.cell_of[p]][0] for p in picked} == {"Math"}
+
+
+def test_fold_counts_streaks_and_boxes():
+    index = bank_index()
+    history = attempts((1, True), (2, False), (1, True), (2, True), (3, False), (1, False), (1, True),
+                       (2, True), (2, True), (2, True), (2, True), (2, True))
+    weights = UserWeights(index, history)
+    positions, _ = index.positions([1, 2, 3, 4])
+
+    assert weights.attempts[positions].tolist() == [4, 7, 1, 0]
+    assert weights.wrong[positions].tolist() == [1, 1, 1, 0]
+    # Right answers since the last wrong one
+    assert weights.streak[positions].tolist() == [1, 6, 0, 0]
+    expected = [BOX_WEIGHTS[1] * (1 + 2 * 1 / 5), BOX_WEIGHTS[-1] * (1 + 2 * 1 / 8), BOX_WEIGHTS[0] * (1 + 2 * 1 / 2),
+                NEW_WEIGHT]
+    assert np.allclose(weights.weights[positions], expected)
+
+
+def test_session_answers_count_and_survive_bank_changes(tmp_path):
+    bank = QuestionBank(str(tmp_path / "bank.db"))
+    ids = bank.add_questions([{'question': f"Q{i}?", 'options': ['1', '2'], 'correct_answer': 'A'}
+                              for i in range(4)], source="paper.pdf")
+    selector = QuestionSelector(bank, FakeHistory())
+    questions = bank.get_questions(ids[:2])
+    # The final answers are recorded, not the first ones
+    selector.record_session("user", {'answers': {0: 0, 1: 1}}, questions)
+
+    bank.add_questions([{'question': "New?", 'options': ['1', '2'], 'correct_answer': 'A'}], source="other.pdf")
+    with selector._lock:
+        weights = selector._user_weights("user")
+    assert len(weights.index) == 5
+    positions, _ = weights.index.positions(ids[:2])
+    assert weights.attempts[positions].tolist() == [1, 1]
+    assert weights.streak[positions].tolist() == [1, 0]
+    assert weights.wrong[positions].tolist() == [0, 1]
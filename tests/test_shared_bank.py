@@ -0,0 +1,65 @@
+from question_bank import QuestionBank
+from shared_bank import REMOVED_LABEL, SessionOverlay, SharedQuestionStore
+
+QUESTIONS = [{'question': f"Question {i}?", 'options': ['1', '2', '3', '4'], 'correct_answer': 'B'} for i in range(3)]
+
+
+def make_store():
+    bank = QuestionBank(":memory:")
+    kept = bank.add_questions(QUESTIONS[:2], source="kept.pdf")
+    replaced = bank.add_questions(QUESTIONS[2:], source="replaced.pdf")
+    return bank, SharedQuestionStore(bank), kept + replaced
+
+
+def replace_source(bank, store, source):
+    bank.delete_source(source)
+    store.drop_source(source)
+
+
+def test_get_many_keeps_positions_for_deleted_ids():
+    bank, store, ids = make_store()
+    assert [q.id for q in store.get_many(ids)] == ids
+    replace_source(bank, store, "replaced.pdf")
+
+    found = store.get_many([ids[2], ids[0], 10 ** 6])
+    assert found[0] is None and found[2] is None
+    assert found[1].id == ids[0]
+    assert store.get(ids[2]) is None
+
+
+def test_resolve_recorded_stands_in_for_deleted_questions():
+    bank, store, ids = make_store()
+    overlay = SessionOverlay(store)
+    overlay.edit(ids[1], question="Edited?")
+    replace_source(bank, store, "replaced.pdf")
+
+    assert overlay.resolve(ids)[2] is None
+    questions = overlay.resolve_recorded(ids)
+    assert [q.id for q in questions] == ids
+    assert questions[1].question == "Edited?"
+    assert questions[2].topic == REMOVED_LABEL
+    assert not questions[2].is_correct(1)
+
+
+def test_evicts_least_recently_used_unreferenced_bank_questions():
+    bank = QuestionBank(":memory:")
+    ids = bank.add_questions([dict(q, question=f"Question {i}?") for i, q in enumerate(QUESTIONS * 2)],
+                             source="big.pdf")
+    store = SharedQuestionStore(bank, max_questions=3)
+    overlay = SessionOverlay(store)
+    overlay.use('practice', ids[:1])
+    imported = store.intern(dict(QUESTIONS[0], question="Imported?"))
+
+    store.get_many(ids[:4])
+    store.get_many(ids[4:])
+    report = store.memory_report()
+    assert report['evicted'] == 4
+    assert report['shared_questions'] == 3
+    # Referenced and non-bank questions survive; the rest reload on demand
+    assert store.get(imported.id) is imported
+    assert store.get(ids[0]).id == ids[0]
+    assert store.get(ids[1]).id == ids[1]
+
+    del overlay
+    store.get_many(ids[2:])
+    assert ids[0] not in store._questions